@@ -1,6 +1,7 @@
 require "active_support/all"
 require 'nokogiri'
 require 'open-uri'
+require 'time'
 
 module Helpers
   extend ActiveSupport::NumberHelper
@@ -10,6 +11,9 @@ module Jekyll
   class GoogleScholarCitationsTag < Liquid::Tag
     Citations = { }
 
+    # Version of _data/citations.json written by _scripts/update_publications.py
+    CITATIONS_DATA_VERSION = 1
+
     def initialize(tag_name, params, tokens)
       super
       splitted = params.split(" ").map(&:strip)
@@ -36,6 +40,14 @@ module Jekyll
             return GoogleScholarCitationsTag::Citations[article_id]
           end
 
+          # Use the count precomputed by the publications updater unless it is missing or stale
+          cached_count = precomputed_count(context, article_id)
+          unless cached_count.nil?
+            citation_count = format_count(cached_count)
+            GoogleScholarCitationsTag::Citations[article_id] = citation_count
+            return citation_count
+          end
+
           # Sleep for a random amount of time to avoid being blocked
           sleep(rand(1.5..3.5))
 
@@ -66,7 +78,7 @@ module Jekyll
             end
           end
 
-        citation_count = Helpers.number_to_human(citation_count, :format => '%n%u', :precision => 2, :units => { :thousand => 'K', :million => 'M', :billion => 'B' })
+        citation_count = format_count(citation_count)
 
       rescue Exception => e
         # Handle any errors that may occur during fetching
@@ -79,6 +91,27 @@ module Jekyll
       GoogleScholarCitationsTag::Citations[article_id] = citation_count
       return "#{citation_count}"
     end
+
+    private
+
+    def format_count(count)
+      Helpers.number_to_human(count, :format => '%n%u', :precision => 2, :units => { :thousand => 'K', :million => 'M', :billion => 'B' })
+    end
+
+    # Citation count from _data/citations.json, or nil if the article is missing or its count is stale
+    def precomputed_count(context, article_id)
+      data = context.registers[:site].data['citations']
+      return nil unless data.is_a?(Hash) && data['version'] == CITATIONS_DATA_VERSION
+
+      article = (data['articles'] || {})[article_id]
+      return nil unless article.is_a?(Hash) && article['count'].is_a?(Integer)
+
+      fetched_at = Time.iso8601(article['fetched_at'].to_s) rescue nil
+      return nil if fetched_at.nil?
+      return nil if Time.now - fetched_at > data.fetch('max_age_days', 30).to_f * 86400
+
+      article['count']
+    end
   end
 end
 
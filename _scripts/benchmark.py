@@ -0,0 +1,1304 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the publications updater, run against synthetic Scholar pages
+
+Usage:
+    # Compare HTML parser backends on large profile pages and detail pages,
+    # and on the Scholar pages recorded by a --record run
+    python _scripts/benchmark.py parsers --rows 100 1000 5000 --repeat 3
+    python _scripts/benchmark.py parsers --cassette .scholar_cache/cassette
+
+    # Tokenize and index synthetic bibliographies of increasing size
+    python _scripts/benchmark.py bibtex --entries 1000 10000 50000
+
+    # Time every updater stage, save a baseline, compare a later run to it
+    python _scripts/benchmark.py pipeline --rows 100 1000 10000 100000 --save-baseline
+    python _scripts/benchmark.py pipeline --rows 100 1000 10000 100000 --compare
+
+    # Run the whole updater (profile walk, details, papers.bib) and check its memory bound
+    python _scripts/benchmark.py memory --rows 1500 6000
+
+    # Check that runs whose --budget runs out keep the details every entry had
+    python _scripts/benchmark.py budget --rows 300
+
+    # Check the response cache (TTLs, revalidation, 304 refreshes, LRU
+    # eviction) against a local stand-in server
+    python _scripts/benchmark.py cache
+
+    # Check Retry-After handling, the jitter bounds and the circuit breaker
+    # on a fake clock, then time the fetch engine against a local server
+    python _scripts/benchmark.py engine --workers 4 8 --rate 100
+
+    # Check the Crossref/OpenAlex snapshot index on its fixture, then index and
+    # query synthetic snapshots
+    python _scripts/benchmark.py snapshot --works 10000 100000 --rows 1000
+
+    # Check that the offline CLI subcommands start fast and without the
+    # scraping packages
+    python _scripts/benchmark.py startup --repeat 20
+
+Every parser backend's output is first checked against the reference
+BeautifulSoup backend (on synthetic pages, and on the recorded pages of
+--cassette, which must hold at least one), and every bibliography must yield all of its
+entries; the benchmark fails (exit status 1) otherwise. A pipeline
+comparison also fails when a stage got slower than --threshold, and any
+pipeline run when a journal title in ABBREVIATION_EXPECTED is not
+abbreviated as ISO 4 requires. The memory check fails when a run's peak
+memory exceeds that of a warm-up run by more than --max-row-bytes per
+additional publication (plus MEMORY_SLACK), the budget
+check when a run whose time budget is spent changes an entry, the cache
+check when the response cache serves, revalidates, evicts or counts a
+request of its stand-in server other than expected, the engine check when
+a retry, backoff, breaker or token bucket decision differs from the
+expected one or the engine loses a page or outruns its rate, and the
+snapshot check when a fixture publication matches the wrong work or a
+synthetic one is not matched. The startup check fails when importing the
+modules of an offline subcommand of publications.py (OFFLINE_MODULES) loads
+requests, bs4, lxml or selectolax, when a subcommand run without them exits
+with an error, or when it takes more than --max-ms longer to run than an
+empty script.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import BaseAdapter
+
+import update_publications
+from bib_manifest import manifest_path_for
+from cassette import Cassette
+from bibtex_index import BibIndex
+from pipeline import QUEUE_SIZE, SORT_CHUNK
+from pub_store import PublicationStore
+from dedup import normalize_title
+from fetch_engine import FetchEngine, RetryScheduler, TokenBucket, decorrelated_jitter, parse_retry_after
+from http_cache import ResponseCache, install_cache
+from ltwa import load_ltwa
+from scholar_fixtures import (SCHOLAR_USER, bibtex_file, detail_page, parsed_publication, profile_page,
+                              publication, snapshot_line)
+from scholar_parsers import available_parsers, get_parser
+from snapshot_index import open_snapshot_index
+from sort_bibtex import parse_bibtex_entries, sort_bibtex_file
+
+BASELINE_PATH = os.path.join(".benchmarks", "pipeline-baseline.json")
+
+# Slowdowns smaller than this (seconds) are timer noise, not regressions
+NOISE_FLOOR = 0.005
+
+# Peak memory an end-to-end run may add per publication beyond the warm-up
+# run. The streaming updater only keeps per-entry hashes and citation counts
+# (~0.3 KB each); holding the publications themselves costs several KB each.
+MAX_ROW_BYTES = 1024
+
+# The warm-up run fills the external sort's in-memory chunk and the parse
+# queue, so their fixed cost is part of the baseline rather than growth
+MEMORY_WARMUP_ROWS = SORT_CHUNK + QUEUE_SIZE
+
+# How far a run's peak may drift from the baseline regardless of size: the
+# parse thread can be up to QUEUE_SIZE publications (~4 KB each) ahead
+MEMORY_SLACK = QUEUE_SIZE * 4096
+
+# Small Crossref/OpenAlex snapshot and what each lookup must find in it:
+# (publication, fields of the expected record or None, how it matches)
+SNAPSHOT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshot-fixture.jsonl")
+SNAPSHOT_EXPECTED = [
+    ({'title': "Conceptual density functional theory of atoms in molecules", 'year': 2021},
+     {'doi': "10.5555/fixture.2021.001", 'journal': "The Journal of Chemical Physics", 'pages': "104101",
+      'abstract': "Reactivity indicators of atoms in molecules & their partitioning."}, 'title'),
+    ({'title': "Iterative Hirshfeld Partitioning of the Electron Density", 'year': 2019},
+     {'doi': "10.5555/fixture.2019.002", 'pages': "55-67", 'publisher': "Springer Nature",
+      'abstract': "Partitioning the electron density of density iteratively."}, 'title'),
+    # A preprint with the same title and year comes later in the snapshot
+    ({'title': "Machine learning force field parameters for proteins", 'year': 2022},
+     {'doi': "10.5555/fixture.2022.003", 'volume': "18"}, 'title'),
+    # Online in 2022, issued in 2023
+    ({'title': "Kinetic energy density functionals from the promolecule", 'year': 2022},
+     {'doi': "10.5555/fixture.2023.004", 'year': 2023}, 'title'),
+    ({'title': "Editorial", 'year': 2020, 'doi': "https://doi.org/10.5555/FIXTURE.2020.005"},
+     {'journal': "Chemical Science"}, 'doi'),
+    ({'title': "Editorial", 'year': 2020}, None, None),
+    ({'title': "Grid integration of promolecular properties", 'year': 2018},
+     {'journal': "Journal of Computational Chemistry", 'publisher': "Wiley", 'pages': "2035"}, 'title'),
+    ({'title': "A publication that is not in the snapshot", 'year': 2018}, None, None),
+]
+
+# Startup overhead (ms over an empty script) an offline subcommand may have
+# on a small bibliography. render imports the whole updater (~30 ms);
+# requests and bs4 alone would add well over 100 ms.
+MAX_STARTUP_MS = 75
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI_PATH = os.path.join(SCRIPTS_DIR, "publications.py")
+SCRAPING_MODULES = ('requests', 'bs4', 'lxml', 'selectolax')
+# Runs a script with the scraping packages made unimportable
+NO_SCRAPING = ("import os, runpy, sys; "
+               f"sys.modules.update(dict.fromkeys({SCRAPING_MODULES!r})); "
+               "sys.argv = sys.argv[1:]; sys.path.insert(0, os.path.dirname(sys.argv[0])); "
+               "runpy.run_path(sys.argv[0], run_name='__main__')")
+# Modules each offline subcommand imports, including the lazy imports of
+# the functions it runs; none of them may load a scraping package
+OFFLINE_MODULES = {
+    'stats': ('publications', 'bibtex_index', 'update_publications', 'pub_store'),
+    'diff': ('publications', 'bibtex_index'),
+    'sort': ('publications', 'sort_bibtex', 'bibtex_index'),
+    'render': ('publications', 'update_publications', 'pub_store', 'dedup', 'ltwa', 'bib_shards',
+               'bib_manifest', 'bib_patch', 'citations_data'),
+}
+# Imports the modules named in argv in a fresh interpreter and prints the
+# scraping packages that ended up in sys.modules
+IMPORT_CHECK = ("import importlib, json, sys; "
+                "[importlib.import_module(name) for name in sys.argv[1:]]; "
+                f"print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}} & {set(SCRAPING_MODULES)!r})))")
+
+# Journal titles and their ISO 4 abbreviations, checked against the bundled
+# LTWA subset and, if present, the full list
+ABBREVIATION_EXPECTED = [
+    ("Nature Communications", "Nat. Commun."),
+    ("Canadian Journal of Chemistry", "Can. J. Chem."),
+    ("Journal of Open Source Software", "J. Open Source Softw."),
+    ("Chemistry – A European Journal", "Chem. Eur. J."),
+    ("Chemistry - A European Journal", "Chem. Eur. J."),
+    ("Physical Review A", "Phys. Rev. A"),
+    ("Acta Crystallographica Section A", "Acta Crystallogr. Sect. A"),
+    ("The Journal of Physical Chemistry A", "J. Phys. Chem. A"),
+    ("Physical Chemistry Chemical Physics", "Phys. Chem. Chem. Phys."),
+    ("Natural Product Reports", "Nat. Prod. Rep."),
+    ("Nature", "Nature"),
+    # Scholar venues, as iter_basic_publications abbreviates them: volume,
+    # issue and pages follow the title
+    ("Physical Review A 99 (1), 012345", "Phys. Rev. A 99 (1), 012345"),
+    ("The Journal of Physical Chemistry A 125 (3), 1000-1010", "J. Phys. Chem. A 125 (3), 1000-1010"),
+    ("Acta Crystallographica Section A: Foundations and Advances 75",
+     "Acta Crystallogr. Sect. A: Found. Adv. 75"),
+    ("Acta Crystallographica Section A 75, 1-10", "Acta Crystallogr. Sect. A 75, 1-10"),
+    ("Chemistry – A European Journal 26 (5), 100-110", "Chem. Eur. J. 26 (5), 100-110"),
+    ("Physical Review B 99, 104101", "Phys. Rev. B 99, 104101"),
+]
+
+# Pages of the local stand-in server for the cache check: (body, headers).
+# The validators use unusual header spellings on purpose.
+CACHE_PAGES = {
+    '/etag': (b"<html>version 1</html>", {'Etag': '"v1"'}),
+    '/modified': (b"<html>dated</html>", {'last-modified': "Wed, 01 Jan 2025 00:00:00 GMT"}),
+    '/plain': (b"<html>no validators</html>", {}),
+}
+CACHE_TTL = 60  # seconds
+
+# Profile rows are parsed from a pool of real BeautifulSoup rows; a parsed
+# tree costs ~14 MB per 1000 rows, so larger runs cycle through the pool
+ROW_POOL_SIZE = 1000
+
+
+def best_time(func, repeat):
+    """Return the best wall time of `repeat` calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_timings(label, unit_count, unit, timings):
+    """Print one block of backend timings with throughput and speedup vs. the reference"""
+    reference = timings['soup']
+    print(f"\n📊 {label}")
+    print(f"  {'backend':<12} {'seconds':>9} {unit + '/s':>12} {'speedup':>8}")
+    for name, seconds in timings.items():
+        print(f"  {name:<12} {seconds:>9.4f} {unit_count / seconds:>12,.0f} {reference / seconds:>7.1f}x")
+
+
+def recorded_pages(directories):
+    """(kind, url, body) of the Scholar profile and detail pages recorded in cassette directories"""
+    for directory in directories:
+        for exchange in Cassette(directory).exchanges():
+            if exchange['status'] != 200:
+                continue
+            query = parse_qs(urlsplit(exchange['url']).query)
+            if 'citation_for_view' in query:
+                yield 'details', exchange['url'], exchange['body']
+            elif 'user' in query:
+                yield 'profile', exchange['url'], exchange['body']
+
+
+def check_recorded_pages(backends, directories):
+    """Compare every backend with soup on recorded Scholar pages; returns True if all agree"""
+    reference = backends['soup']
+    counts = {'profile': 0, 'details': 0}
+    ok = True
+    for kind, url, body in recorded_pages(directories):
+        counts[kind] += 1
+        parse = 'parse_profile' if kind == 'profile' else 'parse_details'
+        expected = getattr(reference, parse)(body)
+        for name, parser in backends.items():
+            if getattr(parser, parse)(body) != expected:
+                print(f"❌ {name}: {kind} output differs from the reference backend for {url}")
+                ok = False
+    if not any(counts.values()):
+        print(f"❌ No recorded Scholar pages in {', '.join(directories)} (record one with --record DIR)")
+        return False
+    if ok:
+        print(f"✓ {counts['profile']} recorded profile pages and {counts['details']} detail pages parse "
+              f"identically with {', '.join(backends)}")
+    return ok
+
+
+def bench_parsers(args):
+    """Check parser backends for identical output, then time them"""
+    backends = {name: get_parser(name) for name in available_parsers()}
+    reference = backends['soup']
+    ok = True
+    if args.cassette:
+        ok = check_recorded_pages(backends, args.cassette)
+
+    for rows in args.rows:
+        html = profile_page(rows)
+        expected = reference.parse_profile(html)
+        timings = {}
+        for name, parser in backends.items():
+            if parser.parse_profile(html) != expected:
+                print(f"❌ {name}: profile output differs from the reference backend ({rows} rows)")
+                ok = False
+                continue
+            timings[name] = best_time(lambda: parser.parse_profile(html), args.repeat)
+        print_timings(f"Profile page, {rows:,} rows ({len(html) / 1024:,.0f} KiB)", rows, 'rows', timings)
+
+    pages = [detail_page(i) for i in range(args.details)]
+    expected = [reference.parse_details(page) for page in pages]
+    timings = {}
+    for name, parser in backends.items():
+        if [parser.parse_details(page) for page in pages] != expected:
+            print(f"❌ {name}: detail output differs from the reference backend")
+            ok = False
+            continue
+        timings[name] = best_time(lambda: [parser.parse_details(page) for page in pages], args.repeat)
+    print_timings(f"Citation detail pages, {args.details} pages", args.details, 'pages', timings)
+
+    return ok
+
+
+def bench_bibtex(args):
+    """Time the BibTeX tokenizer/index and check that it scales linearly"""
+    ok = True
+    per_entry = []
+
+    print("\n📊 BibTeX tokenizer + index")
+    print(f"  {'entries':>8} {'MiB':>7} {'index s':>9} {'sort parse s':>13} {'entries/s':>11} {'µs/entry':>9}")
+    for count in args.entries:
+        text = bibtex_file(count)
+
+        index = BibIndex(text)
+        if len(index) != count or len(index.by_scholar_id) != count:
+            print(f"❌ Expected {count} entries, indexed {len(index)} ({len(index.by_scholar_id)} scholar ids)")
+            ok = False
+            continue
+
+        index_time = best_time(lambda: BibIndex(text), args.repeat)
+        sort_time = best_time(lambda: parse_bibtex_entries(text), args.repeat)
+        per_entry.append(index_time / count)
+        print(f"  {count:>8,} {len(text) / 2**20:>7.1f} {index_time:>9.3f} {sort_time:>13.3f} "
+              f"{count / index_time:>11,.0f} {index_time / count * 1e6:>9.1f}")
+
+    if len(per_entry) > 1:
+        print(f"  Per-entry cost, largest vs. smallest input: {per_entry[-1] / per_entry[0]:.2f}x "
+              f"(1.0x = linear)")
+
+    return ok
+
+
+def row_pool(rows):
+    """BeautifulSoup <tr> rows of synthetic profile pages, at most ROW_POOL_SIZE of them"""
+    pool = []
+    for start in range(0, min(rows, ROW_POOL_SIZE), 100):
+        soup = BeautifulSoup(profile_page(100, start=start), 'html.parser')
+        pool.extend(soup.find_all('tr', class_='gsc_a_tr'))
+    return pool[:rows]
+
+
+def measure(func, repeat, memory):
+    """Best wall/CPU time of `repeat` runs of func, plus optionally one run under tracemalloc"""
+    result = {'seconds': float('inf'), 'cpu_seconds': float('inf'), 'peak_bytes': None}
+    for _ in range(repeat):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        result['seconds'] = min(result['seconds'], time.perf_counter() - wall)
+        result['cpu_seconds'] = min(result['cpu_seconds'], time.process_time() - cpu)
+
+    if memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def pipeline_stages(rows, workdir):
+    """Build (stage name, callable) pairs operating on `rows` synthetic publications"""
+    u = update_publications
+    pool = row_pool(rows)
+    publications = [parsed_publication(i) for i in range(rows)]
+    venues = [pub['venue'] for pub in publications]
+    authors = [pub['authors'] for pub in publications]
+    bib_path = os.path.join(workdir, "papers.bib")
+
+    def parse_rows():
+        return [u.parse_publication_row(pool[i % len(pool)], None) for i in range(rows)]
+
+    def abbreviate():
+        u.JOURNAL_ABBR_CACHE.clear()  # measure resolution, not cache hits
+        return [u.get_journal_abbreviation(venue) for venue in venues]
+
+    def format_authors():
+        return [u.format_authors_for_bibtex(names) for names in authors]
+
+    def to_bibtex():
+        return [u.publication_to_bibtex(pub) for pub in publications]
+
+    def write_bib():
+        # Start from scratch so every repeat measures a full write, not the unchanged skip
+        for path in (bib_path, manifest_path_for(bib_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        u.update_papers_bib(publications, backup=False, file_path=bib_path)
+
+    def rewrite_unchanged():
+        u.update_papers_bib(publications, backup=False, file_path=bib_path)
+
+    def sort_bib():
+        sort_bibtex_file(bib_path)
+
+    store = PublicationStore(os.path.join(workdir, "publications.sqlite"))
+    entries = list(u.store_entries(publications))
+
+    def store_profile():
+        # The first repeat inserts every row, the best one measures an unchanged upsert
+        store.record_profile(entries, ['bench'])
+
+    def store_query():
+        return list(store.publications(['bench']))
+
+    refreshes = [0]
+
+    def patch_citations():
+        # Every repeat bumps each tenth count, so there is always something to patch
+        refreshes[0] += 1
+        citations = u.citation_counts(publications)
+        for article_id in list(citations)[::10]:
+            citations[article_id] += refreshes[0]
+        u.patch_bib_citations(citations, bib_path, backup=False)
+
+    return [
+        ('parse_publication_row', parse_rows),
+        ('get_journal_abbreviation', abbreviate),
+        ('format_authors_for_bibtex', format_authors),
+        ('publication_to_bibtex', to_bibtex),
+        ('update_papers_bib', write_bib),
+        ('update_papers_bib_unchanged', rewrite_unchanged),
+        ('patch_bib_citations', patch_citations),
+        ('sort_bibtex_file', sort_bib),
+        ('store_record_profile', store_profile),
+        ('store_publications', store_query),
+    ]
+
+
+def run_pipeline(args):
+    """Time every pipeline stage for each size; returns {rows: {stage: measurement}}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            print(f"\n📊 Pipeline, {rows:,} publications")
+            print(f"  {'stage':<27} {'seconds':>9} {'cpu s':>8} {'items/s':>12} {'peak MiB':>9}")
+            results[str(rows)] = {}
+            for stage, func in pipeline_stages(rows, workdir):
+                measured = measure(func, args.repeat, memory=not args.no_memory)
+                measured['per_second'] = rows / measured['seconds'] if measured['seconds'] else None
+                results[str(rows)][stage] = measured
+
+                peak = measured['peak_bytes']
+                peak_text = f"{peak / 2**20:>9.1f}" if peak is not None else f"{'-':>9}"
+                print(f"  {stage:<27} {measured['seconds']:>9.4f} {measured['cpu_seconds']:>8.3f} "
+                      f"{measured['per_second']:>12,.0f} {peak_text}")
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """Print a per-stage comparison against a saved baseline; returns False on regressions"""
+    ok = True
+    print(f"\n📈 Comparison with baseline from {baseline['created']} (threshold +{threshold:.0%})")
+    print(f"  {'rows':>8} {'stage':<27} {'baseline s':>11} {'now s':>9} {'change':>8} {'peak':>8}")
+
+    for rows, stages in results.items():
+        for stage, measured in stages.items():
+            before = baseline['results'].get(rows, {}).get(stage)
+            if before is None:
+                continue
+
+            change = measured['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+            peak_change = ''
+            if measured['peak_bytes'] and before.get('peak_bytes'):
+                peak_change = f"{measured['peak_bytes'] / before['peak_bytes'] - 1:+.0%}"
+
+            marker = ''
+            if change > threshold and measured['seconds'] - before['seconds'] > NOISE_FLOOR:
+                marker = '  ❌ regression'
+                ok = False
+            print(f"  {rows:>8} {stage:<27} {before['seconds']:>11.4f} {measured['seconds']:>9.4f} "
+                  f"{change:>+8.0%} {peak_change:>8}{marker}")
+
+    return ok
+
+
+def check_abbreviations():
+    """Abbreviate ABBREVIATION_EXPECTED with each available LTWA; returns True if all match"""
+    u = update_publications
+    ok = True
+    paths = [path for path in (u.LTWA_SUBSET_PATH, u.LTWA_FILE_PATH) if os.path.exists(path)]
+    for path in paths:
+        ltwa = load_ltwa(path)
+        for title, expected in ABBREVIATION_EXPECTED:
+            abbreviation = ltwa.abbreviate(title)
+            if abbreviation != expected:
+                print(f"❌ {os.path.basename(path)}: '{title}' abbreviated to '{abbreviation}', "
+                      f"expected '{expected}'")
+                ok = False
+    if ok:
+        print(f"✓ {len(ABBREVIATION_EXPECTED)} journal abbreviations match ISO 4 "
+              f"({', '.join(os.path.basename(path) for path in paths)})")
+    return ok
+
+
+def bench_pipeline(args):
+    """Benchmark each pipeline stage, optionally saving or comparing a baseline"""
+    abbreviations_ok = check_abbreviations()
+    results = run_pipeline(args)
+    report = {
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+
+    ok = abbreviations_ok
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\n❌ No baseline at {args.baseline}; run with --save-baseline first")
+            return False
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            ok &= compare_to_baseline(results, json.load(f), args.threshold)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+
+    return ok
+
+
+class FixtureAdapter(BaseAdapter):
+    """Serve a synthetic profile of `rows` publications and their detail pages"""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+
+    def send(self, request, **kwargs):
+        query = parse_qs(urlsplit(request.url).query)
+        if 'citation_for_view' in query:
+            content = detail_page(int(query['citation_for_view'][0].split(':A')[1].split('_')[0]))
+        else:
+            start = int(query['cstart'][0])
+            size = max(0, min(int(query['pagesize'][0]), self.rows - start))
+            content = profile_page(size, start=start, last_page=start + size >= self.rows)
+        response = requests.models.Response()
+        response.status_code = 200
+        response._content = content
+        response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def run_update_offline(rows, workdir, store, options=()):
+    """One --details run of the updater (plus options) in workdir against FixtureAdapter"""
+    u = update_publications
+    make_session = u.make_session
+    settings = (u.CACHE_ENABLED, u.STORE_ENABLED, u.PROFILE_MAX_ROWS)
+
+    def fixture_session(*args, **kwargs):
+        session = make_session(*args, **kwargs)
+        session.mount('https://scholar.google.com/', FixtureAdapter(rows))
+        return session
+
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(workdir, u.BIBLIOGRAPHY_DIR), exist_ok=True)
+    u.make_session = fixture_session
+    u.CACHE_ENABLED, u.STORE_ENABLED, u.PROFILE_MAX_ROWS = False, store, rows + u.PROFILE_PAGE_SIZE
+    os.chdir(workdir)
+    try:
+        return u.run_update(u.parse_args(['--details', '--no-backup', '--rate', '1000000', *options]))
+    finally:
+        os.chdir(cwd)
+        u.make_session = make_session
+        u.CACHE_ENABLED, u.STORE_ENABLED, u.PROFILE_MAX_ROWS = settings
+
+
+def peak_memory(rows, store, options=()):
+    """Peak traced bytes, seconds and papers.bib entry count of one run_update_offline"""
+    with tempfile.TemporaryDirectory() as workdir:
+        gc.collect()
+        start = time.perf_counter()
+        tracemalloc.start()
+        try:
+            # Not a StringIO: the progress output would count against the bound
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                run_update_offline(rows, workdir, store, options)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        seconds = time.perf_counter() - start
+        entries = len(BibIndex.from_file(os.path.join(workdir, update_publications.BIB_FILE_PATH)))
+    return peak, seconds, entries
+
+
+def bench_memory(args):
+    """Peak memory of whole updater runs over a warm-up baseline; fails if it grows too fast"""
+    ok = True
+    # The parser is not what is measured; the fastest one keeps the runs short
+    options = ['--parser', available_parsers()[-1]]
+    print(f"\n📊 Whole update (--details, {options[1]}), peak traced memory over a "
+          f"{MEMORY_WARMUP_ROWS:,}-row warm-up")
+    print(f"  {'store':<6} {'rows':>8} {'seconds':>9} {'peak MiB':>9} {'growth MiB':>11} {'bound MiB':>10}")
+    for store in (False, True):
+        baseline, seconds, _ = peak_memory(MEMORY_WARMUP_ROWS, store, options)
+        print(f"  {'on' if store else 'off':<6} {MEMORY_WARMUP_ROWS:>8,} {seconds:>9.1f} "
+              f"{baseline / 2**20:>9.1f} {'(baseline)':>11}")
+        for rows in args.rows:
+            peak, seconds, entries = peak_memory(rows, store, options)
+            if entries != rows:
+                print(f"❌ Expected {rows} entries in papers.bib, found {entries}")
+                ok = False
+            growth = peak - baseline
+            bound = args.max_row_bytes * max(0, rows - MEMORY_WARMUP_ROWS) + MEMORY_SLACK
+            verdict = "✓" if growth <= bound else "❌"
+            print(f"  {'on' if store else 'off':<6} {rows:>8,} {seconds:>9.1f} {peak / 2**20:>9.1f} "
+                  f"{growth / 2**20:>11.2f} {bound / 2**20:>10.2f}  {verdict}")
+            ok &= growth <= bound
+    print(f"  Bound: {args.max_row_bytes:,} bytes per publication beyond the warm-up, "
+          f"plus {MEMORY_SLACK / 2**20:.0f} MiB")
+    return ok
+
+
+def bibliography_entries(workdir):
+    """Entry texts of the papers.bib in workdir, by google_scholar_id"""
+    index = BibIndex.from_file(os.path.join(workdir, update_publications.BIB_FILE_PATH))
+    return {entry.scholar_id: entry.text for entry in index}
+
+
+def bench_budget(args):
+    """Runs whose --budget is spent before any detail request must keep every entry as it was"""
+    ok = True
+    yearless = sum(publication(i)['year'] is None for i in range(args.rows))
+    print(f"\n📊 Spent time budget ({args.rows:,} publications, {yearless} without a year)")
+    print(f"  {'store':<6} {'run':<30} {'seconds':>8} {'exit':>5} {'changed':>8}")
+    for store in (False, True):
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                run_update_offline(args.rows, workdir, store)
+            expected = bibliography_entries(workdir)
+            for label, options in (("--budget 0.001s", ['--budget', '0.001s']),
+                                   ("--incremental --budget 0.001s", ['--incremental', '--budget', '0.001s'])):
+                start = time.perf_counter()
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    status = run_update_offline(args.rows, workdir, store, options)
+                seconds = time.perf_counter() - start
+                entries = bibliography_entries(workdir)
+                changed = sorted(key for key in expected.keys() | entries.keys()
+                                 if expected.get(key) != entries.get(key))
+                verdict = "✓" if not changed and status == update_publications.EXIT_UNCHANGED else "❌"
+                print(f"  {'on' if store else 'off':<6} {label:<30} {seconds:>8.2f} {status!s:>5} "
+                      f"{len(changed):>8}  {verdict}")
+                if changed:
+                    print(f"    entries that lost or changed details: {', '.join(changed[:5])}")
+                ok &= verdict == "✓"
+    return ok
+
+
+class FakeClock:
+    """Clock that only moves when told to (or when something sleeps on it)"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds, reason=None):
+        self.sleeps.append((reason, seconds))
+        self.now += seconds
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves server.pages with their validators, answering conditional GETs with 304"""
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+        conditional = {name: self.headers[name] for name in ('If-None-Match', 'If-Modified-Since')
+                       if name in self.headers}
+        with server.lock:
+            server.log.append((self.path, conditional))
+            page = server.pages.get(self.path)
+            throttled = server.throttle.pop(self.path, None)
+        if throttled is not None:
+            self.send_response(throttled)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if page is None:
+            self.send_error(404)
+            return
+
+        body, headers = page
+        validators = {name.lower(): value for name, value in headers.items()}
+        not_modified = (conditional.get('If-None-Match') == validators.get('etag')
+                        if 'etag' in validators else
+                        conditional.get('If-Modified-Since') == validators.get('last-modified')
+                        if 'last-modified' in validators else False)
+        self.send_response(304 if not_modified else 200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', '0' if not_modified else str(len(body)))
+        self.end_headers()
+        if not not_modified:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def stand_in_server(pages, latency=0.0):
+    """Local HTTP server for pages ({path: (body, headers)}) on a free port, run on a thread
+
+    server.log lists the (path, conditional headers) of every request;
+    server.throttle maps a path to a status (429/503, with Retry-After: 0)
+    returned once instead of the page.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.pages, server.latency, server.log, server.throttle = dict(pages), latency, [], {}
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def check_cache_revalidation(server, path):
+    """TTL, ETag/Last-Modified revalidation and 304 refreshes; returns the failed checks"""
+    url = server.url
+    clock = FakeClock()
+    cache = ResponseCache(path, default_ttl=CACHE_TTL, clock=clock)
+    session = requests.Session()
+    install_cache(session, cache)
+    failures = []
+
+    def get(page, expected_body, served_by, conditional=None, advance=0):
+        """GET a page after `advance` seconds; served_by: 'cache', 'network' or 'revalidation'"""
+        clock.now += advance
+        requests_before = len(server.log)
+        response = session.get(url + page)
+        sent = server.log[requests_before:]
+        label = f"GET {page} (clock +{advance}s)"
+        if response.content != expected_body:
+            failures.append(f"{label}: body {response.content!r}, expected {expected_body!r}")
+        if served_by == 'cache' and sent:
+            failures.append(f"{label}: expected a cache hit, the server was asked")
+        if served_by != 'cache' and (len(sent) != 1 or sent[0][1] != (conditional or {})):
+            failures.append(f"{label}: expected one request with {conditional or 'no validators'}, got {sent}")
+        if served_by != 'network' and not getattr(response, 'from_cache', False):
+            failures.append(f"{label}: response not served from the cache")
+
+    v1 = CACHE_PAGES['/etag'][0]
+    get('/etag', v1, 'network')
+    get('/etag', v1, 'cache', advance=CACHE_TTL - 1)
+    # Expired: revalidated with the ETag (sent as "Etag"), refreshed by the 304
+    get('/etag', v1, 'revalidation', {'If-None-Match': '"v1"'}, advance=2)
+    get('/etag', v1, 'cache', advance=CACHE_TTL - 1)
+    # Changed on the server: the 200 replaces the stored copy
+    v2 = b"<html>version 2</html>"
+    server.pages['/etag'] = (v2, {'Etag': '"v2"'})
+    get('/etag', v2, 'network', {'If-None-Match': '"v1"'}, advance=CACHE_TTL)
+    get('/etag', v2, 'cache', advance=1)
+    get('/etag', v2, 'revalidation', {'If-None-Match': '"v2"'}, advance=CACHE_TTL)
+
+    dated = CACHE_PAGES['/modified'][0]
+    get('/modified', dated, 'network')
+    get('/modified', dated, 'revalidation', {'If-Modified-Since': "Wed, 01 Jan 2025 00:00:00 GMT"},
+        advance=CACHE_TTL)
+
+    plain = CACHE_PAGES['/plain'][0]
+    get('/plain', plain, 'network')
+    get('/plain', plain, 'network', advance=CACHE_TTL)
+
+    expected = {'hits': 3, 'revalidated': 3, 'misses': 5, 'stored': 5, 'evicted': 0}
+    if cache.stats != expected:
+        failures.append(f"stats {cache.stats}, expected {expected}")
+    session.close()
+    cache.close()
+    return failures
+
+
+def check_cache_eviction(server, path):
+    """The least recently used entries go first once max_bytes is exceeded; returns the failed checks"""
+    clock = FakeClock()
+    bodies = {f"/lru-{name}": os.urandom(4000) for name in 'abc'}  # incompressible
+    server.pages.update((page, (body, {})) for page, body in bodies.items())
+    cache = ResponseCache(path, max_bytes=10000, default_ttl=CACHE_TTL, clock=clock)
+    session = requests.Session()
+    install_cache(session, cache)
+    for page in ('/lru-a', '/lru-b', '/lru-a', '/lru-c'):  # b is now the least recently used
+        clock.now += 1
+        session.get(server.url + page)
+
+    kept = {page: cache.get(server.url + page) is not None for page in bodies}
+    failures = []
+    if kept != {'/lru-a': True, '/lru-b': False, '/lru-c': True} or cache.stats['evicted'] != 1:
+        failures.append(f"kept {kept} ({cache.stats['evicted']} evicted), expected only /lru-b evicted")
+    if cache.total_size() > cache.max_bytes:
+        failures.append(f"{cache.total_size():,} bytes stored over the {cache.max_bytes:,} byte cap")
+    session.close()
+    cache.close()
+    return failures
+
+
+def check_cache_threads(server, path, threads=8, per_thread=200):
+    """Hits counted by concurrent fetch workers must add up; returns the failed checks"""
+    cache = ResponseCache(path, default_ttl=3600)
+    sessions = [requests.Session() for _ in range(threads)]
+    for session in sessions:
+        install_cache(session, cache)
+    sessions[0].get(server.url + '/plain')
+
+    def fetch(session):
+        for _ in range(per_thread):
+            session.get(server.url + '/plain')
+
+    workers = [threading.Thread(target=fetch, args=(session,)) for session in sessions]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for session in sessions:
+        session.close()
+    cache.close()
+    expected = threads * per_thread
+    if cache.stats['hits'] != expected:
+        return [f"{cache.stats['hits']} hits counted by {threads} threads, expected {expected}"]
+    return []
+
+
+def bench_cache(args):
+    """Check the response cache against a local stand-in server, then time hits and revalidations"""
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir, stand_in_server(CACHE_PAGES) as server:
+        for label, check in (("TTL and ETag/Last-Modified revalidation", check_cache_revalidation),
+                             ("LRU eviction under max_bytes", check_cache_eviction),
+                             ("stats under concurrent workers", check_cache_threads)):
+            failures = check(server, os.path.join(workdir, f"{check.__name__}.sqlite"))
+            print(f"{'❌' if failures else '✓'} {label}")
+            for failure in failures:
+                print(f"    {failure}")
+            ok &= not failures
+
+        print(f"\n📊 Response cache, {args.requests:,} requests of a local page")
+        print(f"  {'served by':<14} {'seconds':>9} {'requests/s':>11}")
+        for label, ttl in (("network", None), ("revalidation", 0), ("cache", 3600)):
+            session = requests.Session()
+            if ttl is not None:
+                cache = ResponseCache(os.path.join(workdir, f"timing-{label}.sqlite"), default_ttl=ttl)
+                install_cache(session, cache)
+            seconds = best_time(lambda: [session.get(server.url + '/etag') for _ in range(args.requests)],
+                                args.repeat)
+            session.close()
+            print(f"  {label:<14} {seconds:>9.3f} {args.requests / seconds:>11,.0f}")
+    return ok
+
+
+def fake_response(status, headers=None):
+    """A requests Response with a status and headers, for a fake transport"""
+    response = requests.models.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeTransport:
+    """send(attempt) function answering with scripted statuses; counts the requests sent"""
+
+    def __init__(self, *responses, default=200):
+        self.responses = list(responses)
+        self.default = default
+        self.sent = 0
+
+    def __call__(self, attempt=0):
+        self.sent += 1
+        status, headers = self.responses.pop(0) if self.responses else (self.default, None)
+        return fake_response(status, headers)
+
+
+def check_retry_after():
+    """Retry-After is honored (seconds, HTTP date, shared 429/503 pause, too long a wait); returns failures"""
+    failures = []
+    now = datetime(2026, 10, 21, 7, 27, tzinfo=timezone.utc)
+    for value, expected in (('7', 7.0), ('Wed, 21 Oct 2026 07:28:00 GMT', 60.0),
+                            ('Wed, 21 Oct 2026 07:00:00 GMT', 0.0), ('soon', None), (None, None)):
+        if parse_retry_after(value, now=now) != expected:
+            failures.append(f"Retry-After {value!r}: {parse_retry_after(value, now=now)}, expected {expected}")
+
+    clock = FakeClock()
+    scheduler = RetryScheduler(base=2.0, sleep=clock.sleep, clock=clock, rng=random.Random(1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = scheduler.request(FakeTransport((500, {'Retry-After': '7'})))
+    if response is None or response.status_code != 200 or clock.sleeps != [('retry_after', 7.0)]:
+        failures.append(f"500 with Retry-After: 7 slept {clock.sleeps}, expected [('retry_after', 7.0)]")
+
+    # A 429 pauses every caller of the scheduler, not only the one that got it
+    clock.sleeps.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = scheduler.request(FakeTransport((429, {'Retry-After': '30'})))
+        second = scheduler.request(FakeTransport())
+    if first is None or second is None or clock.sleeps != [('pause', 30.0)]:
+        failures.append(f"429 with Retry-After: 30 slept {clock.sleeps}, expected one shared 30 s pause")
+
+    clock.sleeps.clear()
+    transport = FakeTransport((503, {'Retry-After': '900'}))
+    scheduler = RetryScheduler(max_retry_after=300, sleep=clock.sleep, clock=clock)
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = scheduler.request(transport)
+    if response is not None or transport.sent != 1 or clock.sleeps:
+        failures.append(f"Retry-After: 900 over max_retry_after: {transport.sent} requests, slept {clock.sleeps}")
+    return failures
+
+
+def check_jitter(steps=2000, seed=7):
+    """Backoff delays stay within [base, min(cap, 3 x previous)] and follow the RNG; returns failures"""
+    failures = []
+    base, cap = 2.0, 120.0
+    previous = base
+    rng = random.Random(seed)
+    for _ in range(steps):
+        delay = decorrelated_jitter(previous, base, cap, rng)
+        if not base <= delay <= min(cap, 3 * previous):
+            failures.append(f"delay {delay:.3f} after {previous:.3f} outside [{base}, {min(cap, 3 * previous):.3f}]")
+            break
+        previous = delay
+
+    def backoffs():
+        clock = FakeClock()
+        scheduler = RetryScheduler(max_attempts=8, base=base, cap=cap, failure_threshold=100,
+                                   sleep=clock.sleep, clock=clock, rng=random.Random(seed))
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler.request(FakeTransport(default=500))
+        return clock.sleeps
+
+    sleeps = backoffs()
+    delays = [seconds for _, seconds in sleeps]
+    if len(sleeps) != 7 or {reason for reason, _ in sleeps} != {'backoff'}:
+        failures.append(f"8 failed attempts slept {sleeps}, expected 7 backoffs")
+    for previous, delay in zip([base] + delays, delays):
+        if not base <= delay <= min(cap, 3 * previous):
+            failures.append(f"backoff {delay:.3f} after {previous:.3f} outside the jitter bounds")
+    if backoffs() != sleeps:
+        failures.append("the same RNG seed gave different backoffs")
+    return failures
+
+
+def check_circuit_breaker():
+    """The breaker opens after failure_threshold failures, then half-opens for one probe; returns failures"""
+    failures = []
+    clock = FakeClock()
+    scheduler = RetryScheduler(max_attempts=1, failure_threshold=3, reset_timeout=600,
+                               sleep=clock.sleep, clock=clock, rng=random.Random(1))
+
+    def request(transport, expect_sent, expect_status, label):
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = scheduler.request(transport)
+        status = response and response.status_code
+        if transport.sent != expect_sent or status != expect_status:
+            failures.append(f"{label}: {transport.sent} requests sent and {status} returned, "
+                            f"expected {expect_sent} and {expect_status}")
+
+    for attempt in range(3):
+        request(FakeTransport(default=500), 1, None, f"failure {attempt + 1}")
+    if not scheduler.is_open or scheduler.stats['circuit_trips'] != 1:
+        failures.append("the breaker did not open after 3 consecutive failures")
+    request(FakeTransport(), 0, None, "request while open")
+    clock.now += 599
+    request(FakeTransport(), 0, None, "request just before reset_timeout")
+    # Half-open: one probe goes out; its failure reopens the breaker at once
+    clock.now += 2
+    request(FakeTransport(default=500), 1, None, "failed probe")
+    request(FakeTransport(), 0, None, "request after a failed probe")
+    if scheduler.stats['circuit_trips'] != 2:
+        failures.append(f"a failed probe should reopen the breaker ({scheduler.stats['circuit_trips']} trips)")
+    # A good probe closes it: the next failure starts a new count
+    clock.now += 601
+    request(FakeTransport(), 1, 200, "successful probe")
+    request(FakeTransport(default=500), 1, None, "failure after the breaker closed")
+    if scheduler.is_open:
+        failures.append("one failure after a successful probe reopened the breaker")
+    return failures
+
+
+def check_token_bucket():
+    """Waits of a burst of acquires on a stopped clock; returns failures"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3, sleep=clock.sleep, clock=clock)
+    waits = [bucket.acquire() for _ in range(6)]
+    # The clock moves as callers sleep; each reserved token is 0.5 s after the previous one
+    expected = [0.0, 0.0, 0.0, 0.5, 0.5, 0.5]
+    if waits != expected:
+        return [f"waits {waits}, expected {expected}"]
+    return []
+
+
+def time_engine(server, count, rate, workers):
+    """Fetch `count` pages of the stand-in server through a FetchEngine; returns (seconds, engine, ok)"""
+    session = requests.Session()
+    retry = RetryScheduler(base=0.01, cap=0.1, sleep=lambda seconds, reason: time.sleep(seconds))
+    engine = FetchEngine(session, rate=rate, burst=workers, max_workers=workers, per_host=workers, retry=retry)
+    urls = [f"{server.url}/page-{i}" for i in range(count)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        responses = engine.map(engine.get, urls)
+    seconds = time.perf_counter() - start
+    session.close()
+    ok = all(response is not None and response.status_code == 200 for response in responses)
+    return seconds, engine, ok
+
+
+def bench_engine(args):
+    """Check retries, jitter, the circuit breaker and the token bucket, then time a stand-in server"""
+    ok = True
+    for label, check in (("Retry-After", check_retry_after),
+                         ("decorrelated jitter bounds", check_jitter),
+                         ("circuit breaker opens and half-opens", check_circuit_breaker),
+                         ("token bucket waits", check_token_bucket)):
+        failures = check()
+        print(f"{'❌' if failures else '✓'} {label}")
+        for failure in failures:
+            print(f"    {failure}")
+        ok &= not failures
+
+    pages = {f"/page-{i}": (detail_page(i), {}) for i in range(args.requests)}
+    print(f"\n📊 FetchEngine, {args.requests} pages of a local server answering in "
+          f"{args.latency * 1000:.0f} ms (every tenth throttled once with Retry-After: 0)")
+    print(f"  {'workers':>7} {'rate/s':>7} {'seconds':>8} {'pages/s':>8} {'requests':>9}  bound")
+    for workers, rate in [(1, 1000.0)] + [(workers, args.rate) for workers in args.workers]:
+        with stand_in_server(pages, latency=args.latency) as server:
+            server.throttle.update((f"/page-{i}", 503 if i % 20 else 429) for i in range(0, args.requests, 10))
+            seconds, engine, complete = time_engine(server, args.requests, rate, workers)
+        # The bucket lets `workers` requests through at once, then `rate` per second
+        floor = (engine.stats['requests'] - workers) / rate
+        within = seconds >= floor * 0.95
+        verdict = "✓" if complete and within else "❌"
+        print(f"  {workers:>7} {rate:>7.0f} {seconds:>8.2f} {args.requests / seconds:>8.1f} "
+              f"{engine.stats['requests']:>9}  {verdict}")
+        if not complete:
+            print(f"    {engine.stats['failures']} pages were not fetched")
+        if not within:
+            print(f"    finished in {seconds:.2f} s, faster than the {rate:.0f}/s rate allows ({floor:.2f} s)")
+        ok &= complete and within
+    return ok
+
+
+def check_snapshot_fixture(workdir):
+    """Index the fixture snapshot and check every SNAPSHOT_EXPECTED lookup; returns True if all pass"""
+    index, built = open_snapshot_index(SNAPSHOT_FIXTURE, workdir)
+    ok = True
+    with index:
+        matches = list(index.match([dict(pub) for pub, _, _ in SNAPSHOT_EXPECTED]))
+    for (pub, expected, how), (_, record, matched_by) in zip(SNAPSHOT_EXPECTED, matches):
+        found = record and {field: record.get(field) for field in expected or {}}
+        if (found or None) != expected or matched_by != how:
+            print(f"❌ {pub}: expected {expected} by {how}, got {record} by {matched_by}")
+            ok = False
+    print(f"{'✓' if ok else '❌'} Fixture snapshot: {built['records']} works indexed, {built['skipped']} skipped, "
+          f"{len(SNAPSHOT_EXPECTED)} lookups checked")
+    return ok
+
+
+def bench_snapshot(args):
+    """Index synthetic snapshots and match a profile against them in batches"""
+    with tempfile.TemporaryDirectory() as workdir:
+        ok = check_snapshot_fixture(workdir)
+
+    print(f"\n📊 Snapshot index ({args.rows:,} profile publications)")
+    print(f"  {'works':>9} {'build s':>8} {'match s':>8} {'µs/pub':>7} {'snapshot MiB':>13} "
+          f"{'index MiB':>10} {'matched':>8}")
+    publications = [parsed_publication(i, enriched=False) for i in range(args.rows)]
+    for works in args.works:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "works.jsonl")
+            with open(path, 'w', encoding='utf-8') as f:
+                for i in range(works):
+                    f.write(snapshot_line(i))
+                    f.write('\n')
+
+            start = time.perf_counter()
+            index, _ = open_snapshot_index(path, workdir)
+            build = time.perf_counter() - start
+            with index:
+                start = time.perf_counter()
+                matches = list(index.match(dict(pub) for pub in publications))
+                lookup = time.perf_counter() - start
+            sizes = [os.path.getsize(path), os.path.getsize(index.path)]
+
+        matched = 0
+        for i, (pub, record, _) in enumerate(matches):
+            expected = i < works and 'year' in pub
+            correct = record is not None and normalize_title(record['title']) == normalize_title(pub['title'])
+            if expected and not correct or record is not None and not correct:
+                print(f"❌ Publication {i} matched {record} instead of '{pub['title']}'")
+                ok = False
+            matched += record is not None
+        print(f"  {works:>9,} {build:>8.2f} {lookup:>8.3f} {lookup / args.rows * 1e6:>7.0f} "
+              f"{sizes[0] / 2**20:>13.1f} {sizes[1] / 2**20:>10.1f} {matched:>8,}")
+    return ok
+
+
+def time_commands(commands, workdir, env, repeat):
+    """Best wall time of each (label, command, allowed exit codes) run in workdir
+
+    The commands take turns, so they all see the same machine load. A
+    command that exits with any other code is reported with its output and
+    gets None.
+    """
+    best = {label: float('inf') for label, _, _ in commands}
+    for _ in range(repeat):
+        for label, command, allowed in commands:
+            if best[label] is None:
+                continue
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+            seconds = time.perf_counter() - start
+            if result.returncode not in allowed:
+                print(f"❌ {label} exited with {result.returncode}:\n{result.stdout}{result.stderr}")
+                best[label] = None
+            else:
+                best[label] = min(best[label], seconds)
+    return best
+
+
+def check_offline_imports():
+    """True if no offline subcommand's modules load a scraping package (each imported in a fresh interpreter)"""
+    ok = True
+    for command, modules in OFFLINE_MODULES.items():
+        result = subprocess.run([sys.executable, '-c', IMPORT_CHECK, *modules], cwd=SCRIPTS_DIR,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ {command}: importing {', '.join(modules)} failed:\n{result.stderr}")
+            ok = False
+        elif json.loads(result.stdout):
+            print(f"❌ {command}: importing {', '.join(modules)} loads {', '.join(json.loads(result.stdout))}")
+            ok = False
+    if ok:
+        print(f"✓ {', '.join(OFFLINE_MODULES)}: no module they import loads {', '.join(SCRAPING_MODULES)}")
+    return ok
+
+
+def bench_startup(args):
+    """Wall time of the offline CLI subcommands, run without the scraping packages"""
+    u = update_publications
+    ok = check_offline_imports()
+    with tempfile.TemporaryDirectory() as workdir:
+        bib_dir = os.path.join(workdir, u.BIBLIOGRAPHY_DIR)
+        os.makedirs(bib_dir)
+        with open(os.path.join(bib_dir, u.BIBTEX_FILE), 'w', encoding='utf-8') as f:
+            f.write(bibtex_file(args.entries))
+        with open(os.path.join(bib_dir, u.BIBTEX_FILE + ".backup"), 'w', encoding='utf-8') as f:
+            f.write(bibtex_file(args.entries, seed=1))
+        # The subcommands find the store in workdir/.scholar_cache, whatever SCHOLAR_CACHE_DIR says
+        env = dict(os.environ, SCHOLAR_CACHE_DIR=".scholar_cache", SCHOLAR_STORE="on")
+        store = PublicationStore(os.path.join(workdir, ".scholar_cache", os.path.basename(u.STORE_PATH)))
+        try:
+            store.record_profile(u.store_entries(parsed_publication(i) for i in range(args.entries)),
+                                 [SCHOLAR_USER])
+        finally:
+            store.close()
+        empty = os.path.join(workdir, "empty.py")
+        open(empty, 'w').close()
+
+        no_scraping = [sys.executable, '-c', NO_SCRAPING]
+        cli = no_scraping + [CLI_PATH]
+        offline = [
+            ('stats', cli + ['stats'], (0,)),
+            ('stats --json', cli + ['stats', '--json'], (0,)),
+            ('diff', cli + ['diff', '--limit', '5'], (0, 1)),
+            ('sort', cli + ['sort'], (0,)),
+            ('render', cli + ['render', '--scholar-id', SCHOLAR_USER, '--no-backup'], (0, u.EXIT_UNCHANGED)),
+        ]
+        # For reference: fetch needs the scraping packages
+        reference = ('fetch --help', [sys.executable, CLI_PATH, 'fetch', '--help'], (0,))
+        timings = time_commands([('empty script', no_scraping + [empty], (0,)), *offline, reference],
+                                workdir, env, args.repeat)
+
+    baseline = timings.pop('empty script')
+    if baseline is None:
+        return False
+    print(f"\n📊 CLI startup ({args.entries:,} entries, best of {args.repeat}; "
+          f"empty script: {baseline * 1000:.0f} ms)")
+    print(f"  {'command':<14} {'ms':>7} {'overhead':>9}")
+    for label, seconds in timings.items():
+        if seconds is None:
+            ok = False
+            continue
+        overhead = (seconds - baseline) * 1000
+        if label == reference[0]:
+            verdict = "(imports requests and bs4)"
+        else:
+            verdict = "✓" if overhead <= args.max_ms else "❌"
+            ok &= overhead <= args.max_ms
+        print(f"  {label:<14} {seconds * 1000:>7.0f} {overhead:>8.0f}  {verdict}")
+    print(f"  Bound: {args.max_ms:.0f} ms over an empty script")
+    return ok
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmarks for the publications updater")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parsers = commands.add_parser('parsers', help="compare HTML parser backends")
+    parsers.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 5000],
+                         help="profile table sizes to parse (default: 100 1000 5000)")
+    parsers.add_argument('--details', type=int, default=100,
+                         help="number of citation detail pages to parse (default: 100)")
+    parsers.add_argument('--repeat', type=int, default=3,
+                         help="runs per measurement; the best one is reported (default: 3)")
+    parsers.add_argument('--cassette', nargs='+', metavar='DIR',
+                         help="also compare the backends on the Scholar pages recorded in these cassettes")
+    parsers.set_defaults(func=bench_parsers)
+
+    bibtex = commands.add_parser('bibtex', help="tokenize and index large bibliographies")
+    bibtex.add_argument('--entries', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help="bibliography sizes (default: 1000 10000 50000)")
+    bibtex.add_argument('--repeat', type=int, default=3,
+                        help="runs per measurement; the best one is reported (default: 3)")
+    bibtex.set_defaults(func=bench_bibtex)
+
+    pipeline = commands.add_parser('pipeline', help="time every stage of the updater")
+    pipeline.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000],
+                          help="publication counts (default: 100 1000 10000; up to 100000)")
+    pipeline.add_argument('--repeat', type=int, default=3,
+                          help="timed runs per stage; the best one is reported (default: 3)")
+    pipeline.add_argument('--no-memory', action='store_true',
+                          help="skip the tracemalloc pass that measures peak memory")
+    pipeline.add_argument('--json', help="also write the results to this JSON file")
+    pipeline.add_argument('--baseline', default=BASELINE_PATH,
+                          help=f"baseline file (default: {BASELINE_PATH})")
+    pipeline.add_argument('--save-baseline', action='store_true',
+                          help="store these results as the new baseline")
+    pipeline.add_argument('--compare', action='store_true',
+                          help="compare against the baseline and fail on regressions")
+    pipeline.add_argument('--threshold', type=float, default=0.25,
+                          help="allowed slowdown before a stage counts as a regression (default: 0.25)")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    memory = commands.add_parser('memory', help="check the peak memory of whole updater runs")
+    memory.add_argument('--rows', type=int, nargs='+', default=[1500, 6000],
+                        help="profile sizes, smallest first (default: 1500 6000)")
+    memory.add_argument('--max-row-bytes', type=int, default=MAX_ROW_BYTES,
+                        help=f"allowed peak growth per publication beyond the warm-up (default: {MAX_ROW_BYTES})")
+    memory.set_defaults(func=bench_memory)
+
+    budget = commands.add_parser('budget', help="check that runs out of time budget keep entry details")
+    budget.add_argument('--rows', type=int, default=300,
+                        help="publications in the synthetic profile (default: 300)")
+    budget.set_defaults(func=bench_budget)
+
+    cache = commands.add_parser('cache', help="check the response cache against a local stand-in server")
+    cache.add_argument('--requests', type=int, default=200,
+                       help="requests per timing (default: 200)")
+    cache.add_argument('--repeat', type=int, default=3,
+                       help="runs per measurement; the best one is reported (default: 3)")
+    cache.set_defaults(func=bench_cache)
+
+    engine = commands.add_parser('engine', help="check the fetch engine's retries and time it on a local server")
+    engine.add_argument('--requests', type=int, default=200,
+                        help="pages fetched per timing (default: 200)")
+    engine.add_argument('--workers', type=int, nargs='+', default=[4, 8],
+                        help="thread pool sizes to time (default: 4 8)")
+    engine.add_argument('--rate', type=float, default=100.0,
+                        help="token bucket rate for the timings, requests/s (default: 100)")
+    engine.add_argument('--latency', type=float, default=0.02,
+                        help="seconds the local server takes per page (default: 0.02)")
+    engine.set_defaults(func=bench_engine)
+
+    snapshot = commands.add_parser('snapshot', help="check and time the Crossref/OpenAlex snapshot index")
+    snapshot.add_argument('--works', type=int, nargs='+', default=[10000, 100000],
+                          help="synthetic snapshot sizes (default: 10000 100000)")
+    snapshot.add_argument('--rows', type=int, default=1000,
+                          help="profile publications looked up (default: 1000)")
+    snapshot.set_defaults(func=bench_snapshot)
+
+    startup = commands.add_parser('startup', help="check the startup time of the offline CLI subcommands")
+    startup.add_argument('--entries', type=int, default=10,
+                         help="entries in the bibliography and the store (default: 10)")
+    startup.add_argument('--repeat', type=int, default=20,
+                         help="runs per command; the best one is reported (default: 20)")
+    startup.add_argument('--max-ms', type=float, default=MAX_STARTUP_MS,
+                         help=f"allowed startup overhead in ms (default: {MAX_STARTUP_MS})")
+    startup.set_defaults(func=bench_startup)
+
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+    ok = args.func(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
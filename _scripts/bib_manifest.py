@@ -0,0 +1,140 @@
+"""
+Content hashes of generated BibTeX entries, kept in a sidecar manifest
+
+The manifest next to papers.bib (papers.bib.manifest.json) records a hash
+of every entry, a hash of the whole entry set and a hash of the file as
+written. A run that would produce the same entries can then skip the write
+entirely, and a run that does change something can say which keys were
+added, removed or modified. The manifest holds no timestamps, so it only
+changes when the bibliography does.
+
+If papers.bib no longer matches the manifest (it was re-sorted or edited),
+the entry hashes are taken from the file itself instead.
+
+Usage:
+    previous = previous_entry_hashes("_bibliography/papers.bib")
+    hashes = {}
+    add_entry_hash(hashes, entry_text)          # for each generated entry
+    added, removed, modified = diff_entry_hashes(previous, hashes)
+    write_manifest("_bibliography/papers.bib", hashes)
+"""
+
+import hashlib
+import json
+import os
+
+from bib_writer import atomic_write
+from bibtex_index import BibIndex, BibSyntaxError, ENTRY_START_RE, KEY_RE
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(bib_path):
+    """Path of the manifest belonging to a .bib file"""
+    return f"{bib_path}.manifest.json"
+
+
+def content_hash(text):
+    """SHA-256 hex digest of a string"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a file's bytes, or None if it does not exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def entry_key(text):
+    """Citation key of a single BibTeX entry string"""
+    match = ENTRY_START_RE.match(text, text.find('@'))
+    if match is None:
+        return ''
+    return KEY_RE.match(text, match.end()).group(1)
+
+
+def add_entry_hash(hashes, text, key=None):
+    """Record the hash of one entry; repeated keys are stored as key#2, key#3, ..."""
+    key = key if key is not None else entry_key(text)
+    unique = key
+    copy = 1
+    while unique in hashes:
+        copy += 1
+        unique = f"{key}#{copy}"
+    hashes[unique] = content_hash(text)
+
+
+def set_hash(hashes):
+    """Hash of a whole entry set (independent of entry order)"""
+    return content_hash(''.join(f"{key}\0{value}\n" for key, value in sorted(hashes.items())))
+
+
+def load_manifest(bib_path):
+    """The manifest of a .bib file, or None if missing or unreadable"""
+    try:
+        with open(manifest_path_for(bib_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def file_entry_hashes(bib_path):
+    """Entry hashes computed from the entries currently in a .bib file"""
+    try:
+        index = BibIndex.from_file(bib_path)
+    except FileNotFoundError:
+        return {}
+    except BibSyntaxError as e:
+        print(f"⚠️  Could not index {bib_path}: {e}")
+        return {}
+    hashes = {}
+    for entry in index:
+        add_entry_hash(hashes, entry.text, entry.key)
+    return hashes
+
+
+def previous_entry_hashes(bib_path):
+    """Entry hashes of the bibliography as it is now: from the manifest if it still matches the file"""
+    manifest = load_manifest(bib_path)
+    if manifest is not None and manifest.get('file_sha256') == file_hash(bib_path):
+        return manifest.get('entries', {})
+    return file_entry_hashes(bib_path)
+
+
+def diff_entry_hashes(old, new):
+    """Sorted lists of (added, removed, modified) keys between two hash maps"""
+    added = sorted(key for key in new if key not in old)
+    removed = sorted(key for key in old if key not in new)
+    modified = sorted(key for key in new if key in old and old[key] != new[key])
+    return added, removed, modified
+
+
+def write_manifest(bib_path, hashes):
+    """Write the manifest for the current contents of bib_path (skipped if identical)"""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'file': os.path.basename(bib_path),
+        'file_sha256': file_hash(bib_path),
+        'entry_count': len(hashes),
+        'set_sha256': set_hash(hashes),
+        'entries': dict(sorted(hashes.items())),
+    }
+    text = json.dumps(manifest, indent=1) + '\n'
+    path = manifest_path_for(bib_path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, [text])
+    return True
@@ -0,0 +1,167 @@
+"""
+In-place citation refresh for generated BibTeX files
+
+Most runs only change citation counts. patch_citations() indexes the
+character offsets of the few lines that depend on the count (note,
+selected, plus bibtex_show and google_scholar_id as anchors) with a single
+line-oriented scan, looks each profile publication up by its
+google_scholar_id and rewrites just those spans: the "Cited by N" text
+inside note={...} and the selected={true} line. Everything else in the
+file, including fields enriched or corrected by hand, is left exactly as
+it is, and nothing else is parsed.
+
+The scan relies on the one-field-per-line layout update_publications.py
+writes; a field written differently is simply not found and left alone.
+
+Usage:
+    text, stats, entries = patch_citations(text, {"SeFeTyx0c_EC": 12}, selected_threshold=50)
+"""
+
+import re
+
+from bibtex_index import CITED_BY_RE, tokenize_bibtex
+
+# An entry's opening line, or one of the fields the patch reads or writes
+LINE_RE = re.compile(
+    r'^(?:@(?P<type>\w+)[ \t]*[{(][ \t]*(?P<key>[^,\s]*)'
+    r'|[ \t]*(?P<name>google_scholar_id|note|selected|bibtex_show)[ \t]*=[ \t]*\{(?P<value>.*)\},?[ \t]*$)',
+    re.MULTILINE,
+)
+SPECIAL_TYPES = {'comment', 'preamble', 'string'}
+LAST_UPDATED_RE = re.compile(r'(Last updated: )[^\n]*')
+INDENT = '  '
+
+
+def line_end(text, offset):
+    """Offset just past the newline ending the line that holds offset"""
+    end = text.find('\n', offset)
+    return len(text) if end < 0 else end + 1
+
+
+def index_citation_fields(text):
+    """Offsets of the citation-related fields of every entry, by google_scholar_id
+
+    Each record holds the entry's 'start' and 'end' (start of the next
+    entry), 'head_end' (end of its opening line), its manifest 'key'
+    (key#2, key#3, ... for repeated keys, as bib_manifest numbers them) and,
+    per field name, a (line start, line end, value start, value end) tuple.
+    The first entry with a given ID wins.
+    """
+    by_scholar_id = {}
+    key_counts = {}
+    current = None
+    for match in LINE_RE.finditer(text):
+        if match.group('type'):
+            if current is not None:
+                current['end'] = match.start()
+            key = match.group('key')
+            if match.group('type').lower() not in SPECIAL_TYPES:
+                key_counts[key] = key_counts.get(key, 0) + 1
+                key = key if key_counts[key] == 1 else f"{key}#{key_counts[key]}"
+            current = {'start': match.start(), 'head_end': line_end(text, match.end()),
+                       'key': key, 'fields': {}}
+            continue
+        if current is None:
+            continue
+        name = match.group('name')
+        if name in current['fields']:
+            continue
+        # The pattern stops at the end of the line, just before its newline
+        current['fields'][name] = (match.start(), min(match.end() + 1, len(text)),
+                                   match.start('value'), match.end('value'))
+        if name == 'google_scholar_id':
+            by_scholar_id.setdefault(match.group('value').strip(), current)
+    if current is not None:
+        current['end'] = len(text)
+    return by_scholar_id
+
+
+def apply_edits(text, edits, offset=0):
+    """Apply non-overlapping (start, end, replacement) edits in one pass
+
+    Edit offsets are relative to the string text was sliced from at offset.
+    """
+    parts = []
+    position = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        start -= offset
+        end -= offset
+        if start < position:
+            raise ValueError(f"Overlapping edit at offset {start + offset}")
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def citation_edits(text, entry, citations, selected_threshold):
+    """Edits bringing one entry's note and selected line in line with a citation count
+
+    Returns (edits, selected change) where the change is +1, -1 or 0.
+    """
+    edits = []
+    fields = entry['fields']
+
+    note = fields.get('note')
+    match = CITED_BY_RE.search(text, note[2], note[3]) if note else None
+    if match is not None:
+        if citations and int(match.group(1)) != citations:
+            edits.append((match.start(1), match.end(1), str(citations)))
+        elif not citations and (match.start(), match.end()) == note[2:]:
+            edits.append((note[0], note[1], ''))  # generated entries have no note without citations
+    elif citations and note is None:
+        # Generated entries carry the note just before google_scholar_id
+        anchor = fields['google_scholar_id'][0]
+        edits.append((anchor, anchor, f"{INDENT}note={{Cited by {citations}}},\n"))
+
+    selected = fields.get('selected')
+    is_selected = selected is not None and text[selected[2]:selected[3]].strip().lower() == 'true'
+    change = 0
+    if citations > selected_threshold and selected is None:
+        anchor = fields.get('bibtex_show', (None, entry['head_end']))[1]
+        edits.append((anchor, anchor, f"{INDENT}selected={{true}},\n"))
+        change = 1
+    elif citations <= selected_threshold and is_selected:
+        edits.append((selected[0], selected[1], ''))
+        change = -1
+    return edits, change
+
+
+def patch_citations(text, citations, selected_threshold, timestamp=None):
+    """Patch the citation notes of a BibTeX string
+
+    citations maps google_scholar_id -> count. Returns (new text, stats,
+    patched entries): stats counts the IDs found in the file, the entries
+    updated and the selected flags added or removed; patched entries maps
+    the manifest key of every entry that changed to its new text. If timestamp is given and
+    anything changed, the header's 'Last updated:' line is set to it.
+    """
+    by_scholar_id = index_citation_fields(text)
+    stats = {'matched': 0, 'updated': 0, 'selected_added': 0, 'selected_removed': 0}
+    replacements = []
+    patched_entries = {}
+
+    for scholar_id, count in citations.items():
+        entry = by_scholar_id.get(scholar_id)
+        if entry is None:
+            continue
+        stats['matched'] += 1
+        edits, change = citation_edits(text, entry, count or 0, selected_threshold)
+        if not edits:
+            continue
+        stats['updated'] += 1
+        stats['selected_added'] += change > 0
+        stats['selected_removed'] += change < 0
+        start, end = entry['start'], entry['end']
+        chunk = apply_edits(text[start:end], edits, offset=start)
+        replacements.append((start, end, chunk))
+        patched_entries[entry['key']] = next(tokenize_bibtex(chunk)).text
+
+    if replacements and timestamp:
+        header_end = min(start for start, _, _ in replacements)
+        match = LAST_UPDATED_RE.search(text, 0, header_end)
+        if match:
+            replacements.append((match.start(), match.end(), match.group(1) + timestamp))
+
+    return apply_edits(text, replacements), stats, patched_entries
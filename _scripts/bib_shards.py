@@ -0,0 +1,114 @@
+"""
+Per-year shards of the generated bibliography
+
+In shard mode the bibliography is written as one file per year
+(papers-2025.bib, papers-2024.bib, ..., papers-undated.bib) plus an index,
+papers.shards.json, listing every shard with its entry count and content
+hash. Each shard has its own manifest (see bib_manifest.py), so a run only
+rewrites the years whose entries changed; the other shards keep their
+modification time and site builds can skip them.
+
+Usage:
+    for year, year_publications in iter_year_groups(publications):
+        ... write year_publications to shard_path(directory, year) ...
+    write_shard_index(directory, [shard_summary(directory, year) for year in years])
+"""
+
+import itertools
+import json
+import os
+
+from bib_manifest import load_manifest, manifest_path_for
+from bib_writer import atomic_write, rotate_backups
+
+SHARD_INDEX_NAME = "papers.shards.json"
+SHARD_NAME = "papers-{year}.bib"
+UNDATED = "undated"
+SHARD_INDEX_VERSION = 1
+
+
+def shard_path(directory, year):
+    """Path of the shard holding a year's publications"""
+    return os.path.join(directory, SHARD_NAME.format(year=year or UNDATED))
+
+
+def index_path_for(directory):
+    """Path of the shard index in a bibliography directory"""
+    return os.path.join(directory, SHARD_INDEX_NAME)
+
+
+def iter_year_groups(publications):
+    """Yield (year, publications) for a stream sorted newest year first (undated last)
+
+    Each group is a lazy iterator over the stream and must be consumed
+    before the next one is requested. A year that shows up again after
+    another year means the stream was not sorted, which raises ValueError.
+    """
+    seen = set()
+    for year, group in itertools.groupby(publications, key=lambda pub: pub.get('year') or None):
+        if year in seen:
+            raise ValueError(f"Publications are not sorted by year ({year or UNDATED} appears twice)")
+        seen.add(year)
+        yield year, group
+
+
+def load_shard_index(directory):
+    """The shard index of a directory, or None if there is none"""
+    try:
+        with open(index_path_for(directory), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == SHARD_INDEX_VERSION else None
+
+
+def shard_paths(directory):
+    """Paths of the shards listed in a directory's index (empty without an index)"""
+    index = load_shard_index(directory)
+    if index is None:
+        return []
+    return [os.path.join(directory, shard['file']) for shard in index['shards']]
+
+
+def shard_summary(directory, year):
+    """Index record of a written shard, taken from its manifest"""
+    path = shard_path(directory, year)
+    manifest = load_manifest(path) or {}
+    return {
+        'year': year,
+        'file': os.path.basename(path),
+        'entries': manifest.get('entry_count', 0),
+        'set_sha256': manifest.get('set_sha256'),
+    }
+
+
+def write_shard_index(directory, shards):
+    """Write the shard index; returns True if it changed"""
+    index = {'version': SHARD_INDEX_VERSION, 'shards': shards}
+    text = json.dumps(index, indent=1) + '\n'
+    path = index_path_for(directory)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, [text])
+    return True
+
+
+def remove_stale_shards(directory, years, backup=True):
+    """Delete shards (and their manifests) of years no longer present; returns the removed paths"""
+    keep = {os.path.basename(shard_path(directory, year)) for year in years}
+    removed = []
+    for path in shard_paths(directory):
+        if os.path.basename(path) in keep or not os.path.exists(path):
+            continue
+        if backup:
+            rotate_backups(path, f"{path}.backup", 1)
+        os.remove(path)
+        manifest = manifest_path_for(path)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        removed.append(path)
+    return removed
@@ -0,0 +1,100 @@
+"""
+Crash-safe file writing for the generated bibliography
+
+atomic_write() streams text chunks into a temporary file next to the target,
+fsyncs it and renames it over the target, so readers (and an interrupted
+run) only ever see the old file or the complete new one. The previous
+version can be kept as a rotated backup; backups are hardlinks/renames of
+the old file, not copies.
+
+Usage:
+    atomic_write("papers.bib", generate_chunks(), backup_path="papers.bib.backup")
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def fsync_directory(directory):
+    """Persist a rename in a directory (no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def rotate_backups(path, backup_path, keep=1):
+    """Keep the current file as backup_path, shifting older backups to .1, .2, ...
+
+    The current file is hardlinked (or copied, where hardlinks are not
+    supported) so it stays in place until the caller replaces it.
+    """
+    if keep < 1 or not os.path.exists(path):
+        return
+
+    # backup.{keep-1} is dropped, backup.{n} -> backup.{n+1}, backup -> backup.1
+    names = [backup_path] + [f"{backup_path}.{n}" for n in range(1, keep)]
+    for older, newer in reversed(list(zip(names, names[1:]))):
+        if os.path.exists(older):
+            os.replace(older, newer)
+
+    link_path = f"{backup_path}.tmp"
+    if os.path.exists(link_path):
+        os.remove(link_path)
+    try:
+        os.link(path, link_path)
+    except OSError:
+        shutil.copy2(path, link_path)
+    os.replace(link_path, backup_path)
+
+
+def atomic_write(path, chunks, backup_path=None, keep_backups=1, encoding='utf-8', replace_if=None):
+    """Stream text chunks to path atomically; returns the number of characters written
+
+    replace_if: optional callable checked once every chunk is written; if it
+    returns False the new file is discarded, path is left untouched and
+    None is returned.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+
+    try:
+        # mkstemp creates 0600 files; keep the target's mode (or the usual umask default)
+        if os.path.exists(path):
+            mode = os.stat(path).st_mode & 0o777
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+
+        written = 0
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if replace_if is not None and not replace_if():
+            os.remove(tmp_path)
+            return None
+
+        if backup_path:
+            rotate_backups(path, backup_path, keep_backups)
+
+        os.replace(tmp_path, path)
+        fsync_directory(directory)
+        return written
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
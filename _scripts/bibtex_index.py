@@ -0,0 +1,282 @@
+"""
+Single-pass BibTeX tokenizer and indexed entry store
+
+tokenize_bibtex() walks a .bib file once, left to right, and yields every
+@-block it finds: regular entries of any type (@article, @misc, @book,
+@phdthesis, ...) as well as @comment, @string and @preamble blocks. Braces
+are matched, so nested braces and "quoted {values}" never split an entry.
+Each entry keeps its source span and the span of every field value, so
+callers can rewrite files without re-serializing entries.
+
+BibIndex builds lookups by key, year and google_scholar_id on top of it.
+
+Usage:
+    index = BibIndex.from_file("_bibliography/papers.bib")
+    entry = index.by_scholar_id["SeFeTyx0c_EC"]
+    entry.fields['title'], entry.year, entry.citations, entry.text
+"""
+
+import re
+
+# Blocks that are not bibliography entries
+SPECIAL_TYPES = {'comment', 'string', 'preamble'}
+
+ENTRY_START_RE = re.compile(r'@[ \t]*([A-Za-z][\w-]*)[ \t\r\n]*([{(])')
+KEY_RE = re.compile(r'[ \t\r\n]*([^,\s{}()]*)[ \t\r\n]*')
+FIELD_NAME_RE = re.compile(r'[\s,]*([A-Za-z_][\w:.+/-]*)\s*=\s*')
+BARE_VALUE_RE = re.compile(r'[^\s,#{}()"]+')
+SPACE_RE = re.compile(r'\s*')
+BRACE_RE = re.compile(r'[{}]')
+BRACE_OR_PAREN_RE = re.compile(r'[{})]')
+QUOTE_OR_BRACE_RE = re.compile(r'["{}]')
+CITED_BY_RE = re.compile(r'Cited by (\d+)')
+
+
+class BibSyntaxError(ValueError):
+    """Raised for an unterminated block or value"""
+
+
+class BibEntry:
+    """One @-block of a BibTeX file"""
+
+    __slots__ = ('type', 'key', 'fields', 'spans', 'start', 'end', 'source')
+
+    def __init__(self, entry_type, key, fields, spans, start, end, source):
+        self.type = entry_type          # lower-cased entry type, e.g. 'article'
+        self.key = key                  # citation key ('' for special blocks)
+        self.fields = fields            # field name (lower-cased) -> raw value
+        self.spans = spans              # field name -> (start, end) of the raw value in source
+        self.start = start              # offset of the '@'
+        self.end = end                  # offset just past the closing brace
+        self.source = source
+
+    @property
+    def text(self):
+        """The entry exactly as it appears in the source"""
+        return self.source[self.start:self.end]
+
+    @property
+    def is_special(self):
+        """True for @comment, @string and @preamble blocks"""
+        return self.type in SPECIAL_TYPES
+
+    @property
+    def year(self):
+        """Publication year as an int (0 if missing or not numeric)"""
+        year = self.fields.get('year', '').strip()
+        return int(year) if year.isdigit() else 0
+
+    @property
+    def citations(self):
+        """Citation count from a 'Cited by N' note (0 if absent)"""
+        match = CITED_BY_RE.search(self.fields.get('note', ''))
+        return int(match.group(1)) if match else 0
+
+    @property
+    def scholar_id(self):
+        """The entry's google_scholar_id field, if any"""
+        return self.fields.get('google_scholar_id')
+
+    def __repr__(self):
+        return f"BibEntry(@{self.type}{{{self.key}}}, {len(self.fields)} fields)"
+
+
+def _skip_group(text, pos, close):
+    """Return the offset just past the delimiter closing a block opened before pos"""
+    depth = 0
+    pattern = BRACE_RE if close == '}' else BRACE_OR_PAREN_RE
+    while True:
+        match = pattern.search(text, pos)
+        if match is None:
+            raise BibSyntaxError(f"Unterminated block starting before offset {pos}")
+        char = match.group()
+        pos = match.end()
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            if depth == 0 and close == '}':
+                return pos
+            depth -= 1
+        elif depth == 0:  # ')' closing a parenthesised block
+            return pos
+
+
+def _read_braced(text, pos):
+    """Read a {braced} value whose opening brace is at pos; returns (start, end, next_pos)"""
+    depth = 1
+    start = pos + 1
+    search_pos = start
+    while True:
+        match = BRACE_RE.search(text, search_pos)
+        if match is None:
+            raise BibSyntaxError(f"Unterminated braced value at offset {pos}")
+        search_pos = match.end()
+        if match.group() == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return start, match.start(), search_pos
+
+
+def _read_quoted(text, pos):
+    """Read a "quoted" value whose opening quote is at pos; braces may nest inside"""
+    depth = 0
+    start = pos + 1
+    search_pos = start
+    while True:
+        match = QUOTE_OR_BRACE_RE.search(text, search_pos)
+        if match is None:
+            raise BibSyntaxError(f"Unterminated quoted value at offset {pos}")
+        search_pos = match.end()
+        char = match.group()
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth == 0:
+            return start, match.start(), search_pos
+
+
+def _read_value(text, pos):
+    """Read a value (possibly a '#' concatenation); returns (raw value, span, next_pos)"""
+    parts = []
+    span_start = None
+    span_end = pos
+    while True:
+        pos = SPACE_RE.match(text, pos).end()
+        char = text[pos:pos + 1]
+        if char == '{':
+            start, end, pos = _read_braced(text, pos)
+        elif char == '"':
+            start, end, pos = _read_quoted(text, pos)
+        else:
+            match = BARE_VALUE_RE.match(text, pos)
+            if match is None:
+                break
+            start, end, pos = match.start(), match.end(), match.end()
+
+        parts.append(text[start:end])
+        span_start = start if span_start is None else span_start
+        span_end = end
+
+        pos = SPACE_RE.match(text, pos).end()
+        if text[pos:pos + 1] != '#':
+            break
+        pos += 1
+
+    if span_start is None:
+        span_start = span_end
+    return ''.join(parts), (span_start, span_end), pos
+
+
+def _parse_entry_body(text, pos, close):
+    """Parse 'key, name = value, ...' up to the closing delimiter; returns (key, fields, spans, end)"""
+    match = KEY_RE.match(text, pos)
+    key = match.group(1)
+    pos = match.end()
+
+    fields = {}
+    spans = {}
+    while True:
+        pos = SPACE_RE.match(text, pos).end()
+        char = text[pos:pos + 1]
+        if char == ',':
+            pos += 1
+            continue
+        if char == close:
+            return key, fields, spans, pos + 1
+        if not char:
+            raise BibSyntaxError(f"Unterminated entry '{key}'")
+
+        match = FIELD_NAME_RE.match(text, pos)
+        if match is None:
+            # Malformed field: skip to the next separator so one typo cannot eat the file
+            next_sep = re.compile(r'[,' + re.escape(close) + ']').search(text, pos)
+            if next_sep is None:
+                raise BibSyntaxError(f"Unterminated entry '{key}'")
+            pos = next_sep.start()
+            if text[pos] == ',':
+                pos += 1
+            continue
+
+        name = match.group(1).lower()
+        value, span, pos = _read_value(text, match.end())
+        fields[name] = value
+        spans[name] = span
+
+
+def tokenize_bibtex(text):
+    """Yield every @-block of a BibTeX string as a BibEntry, in source order"""
+    pos = 0
+    while True:
+        at = text.find('@', pos)
+        if at < 0:
+            return
+
+        match = ENTRY_START_RE.match(text, at)
+        if match is None:
+            # A stray '@' in free text between entries (BibTeX treats it as a comment)
+            pos = at + 1
+            continue
+
+        entry_type = match.group(1).lower()
+        close = '}' if match.group(2) == '{' else ')'
+
+        if entry_type in SPECIAL_TYPES:
+            end = _skip_group(text, match.end(), close)
+            yield BibEntry(entry_type, '', {}, {}, at, end, text)
+        else:
+            key, fields, spans, end = _parse_entry_body(text, match.end(), close)
+            yield BibEntry(entry_type, key, fields, spans, at, end, text)
+
+        pos = end
+
+
+class BibIndex:
+    """All entries of a BibTeX source, indexed by key, year and google_scholar_id"""
+
+    def __init__(self, text):
+        self.text = text
+        self.blocks = list(tokenize_bibtex(text))
+        self.entries = [block for block in self.blocks if not block.is_special]
+
+        self.by_key = {}
+        self.by_scholar_id = {}
+        self.by_year = {}
+        for entry in self.entries:
+            self.by_key.setdefault(entry.key, entry)
+            if entry.scholar_id:
+                self.by_scholar_id.setdefault(entry.scholar_id, entry)
+            self.by_year.setdefault(entry.year, []).append(entry)
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Read and index a .bib file"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    @property
+    def header(self):
+        """Everything before the first regular entry (front matter, @comment blocks)"""
+        if not self.entries:
+            return self.text
+        return self.text[:self.entries[0].start]
+
+    def get(self, key):
+        """Look up an entry by citation key"""
+        return self.by_key.get(key)
+
+    def in_year(self, year):
+        """Entries published in a given year, in file order"""
+        return self.by_year.get(year, [])
+
+    def years(self):
+        """Years with at least one entry, newest first"""
+        return sorted(self.by_year, reverse=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
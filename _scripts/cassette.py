@@ -0,0 +1,153 @@
+"""
+Record/replay of HTTP exchanges for offline runs of the Scholar scrapers
+
+In record mode every response a session receives is saved to a cassette
+directory, one JSON file per URL. In replay mode the same session path
+(requests.Session -> transport adapter) answers from those files instead of
+the network, so parsing and BibTeX generation can be re-run in well under a
+second. A request missing from the cassette fails like a connection error.
+
+Usage:
+    cassette = Cassette("_scripts/cassettes/profile")
+    install_cassette(session, cassette, mode='record')   # or 'replay'
+    session.get(url)
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from http_cache import UNCACHED_HEADERS
+
+CASSETTE_VERSION = 1
+MODES = ('record', 'replay')
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class Cassette:
+    """A directory of recorded HTTP exchanges keyed by method and URL"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.stats = {'recorded': 0, 'replayed': 0, 'missing': 0}
+        self._lock = threading.Lock()
+
+    def path_for(self, method, url):
+        """File holding the exchange for a request"""
+        digest = hashlib.sha1(f"{method.upper()} {url}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest[:20]}.json")
+
+    def load(self, method, url):
+        """Return the recorded exchange for a request, or None"""
+        try:
+            return self._read(self.path_for(method, url))
+        except FileNotFoundError:
+            return None
+
+    def exchanges(self):
+        """Yield every recorded exchange, in file name order"""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith('.json'):
+                yield self._read(os.path.join(self.directory, name))
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            exchange = json.load(f)
+        if 'body_base64' in exchange:
+            exchange['body'] = base64.b64decode(exchange.pop('body_base64'))
+        else:
+            exchange['body'] = exchange['body'].encode('utf-8')
+        return exchange
+
+    def save(self, method, url, status, reason, headers, body):
+        """Record one exchange (a later response for the same URL replaces it)"""
+        exchange = {
+            'version': CASSETTE_VERSION,
+            'method': method.upper(),
+            'url': url,
+            'status': status,
+            'reason': reason,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in UNCACHED_HEADERS},
+        }
+        try:
+            exchange['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            exchange['body_base64'] = base64.b64encode(body).decode('ascii')
+
+        path = self.path_for(method, url)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(exchange, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.stats['recorded'] += 1
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that saves every response to a Cassette"""
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.cassette.save(request.method, request.url, response.status_code,
+                           response.reason, response.headers, response.content)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that answers every request from a Cassette"""
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        exchange = self.cassette.load(request.method, request.url)
+        if exchange is None:
+            with self.cassette._lock:
+                self.cassette.stats['missing'] += 1
+            raise CassetteMiss(f"Not in cassette {self.cassette.directory}: {request.url}", request=request)
+
+        with self.cassette._lock:
+            self.cassette.stats['replayed'] += 1
+        response = Response()
+        response.status_code = exchange['status']
+        response.reason = exchange.get('reason') or ''
+        response.headers = CaseInsensitiveDict(exchange['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = exchange['body']
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+def install_cassette(session, cassette, mode):
+    """Route every HTTP(S) request of a session through a cassette in 'record' or 'replay' mode"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode {mode!r} (expected one of {', '.join(MODES)})")
+    adapter = RecordingAdapter(cassette) if mode == 'record' else ReplayAdapter(cassette)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
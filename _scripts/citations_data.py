@@ -0,0 +1,103 @@
+"""
+Precomputed citation counts for the site build (_data/citations.json)
+
+The profile table already carries every article's citation count, so the
+updater writes them to _data/citations.json. At build time,
+_plugins/google-scholar-citations.rb reads that file (Jekyll loads it as
+site.data.citations) and scrapes Scholar only for articles that are missing
+from it or whose count is older than max_age_days.
+
+Each article keeps the time its count was last confirmed. An unchanged
+count keeps its old timestamp until it is within REFRESH_MARGIN_DAYS of
+max_age_days, so scheduled runs that change nothing leave the file alone
+(and exit as unchanged) for weeks at a time. The margin is several run
+intervals wide, so a count is refreshed before it goes stale even when a
+scheduled run is skipped or fails.
+
+Usage:
+    data = build_citations_data({"SeFeTyx0c_EC": 12}, ["JlIWcccAAAAJ"], previous=load_citations_data(path))
+    write_citations_data(path, data)
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from bib_writer import atomic_write
+
+CITATIONS_DATA_VERSION = 1
+MAX_AGE_DAYS = 30  # counts older than this are scraped again at build time
+# Unchanged counts are restamped once they are older than
+# MAX_AGE_DAYS - REFRESH_MARGIN_DAYS (20 days)
+REFRESH_MARGIN_DAYS = 10
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def format_timestamp(moment):
+    """UTC ISO 8601 timestamp with second precision"""
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(text):
+    """Inverse of format_timestamp; None if text is not a valid timestamp"""
+    try:
+        return datetime.strptime(text, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_citations_data(path):
+    """The current citation data file, or None if missing, unreadable or of another version"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != CITATIONS_DATA_VERSION:
+        return None
+    return data
+
+
+def build_citations_data(citations, scholar_ids, previous=None, max_age_days=MAX_AGE_DAYS, now=None,
+                         refresh_margin_days=REFRESH_MARGIN_DAYS):
+    """Citation data for a map of article ID -> count, reusing unchanged entries of previous"""
+    now = now or datetime.now(timezone.utc)
+    refresh_before = now - timedelta(days=max(0, max_age_days - refresh_margin_days))
+    previous_articles = (previous or {}).get('articles', {})
+    stamp = format_timestamp(now)
+
+    articles = {}
+    for article_id, count in sorted(citations.items()):
+        count = count or 0
+        old = previous_articles.get(article_id) or {}
+        fetched_at = parse_timestamp(old.get('fetched_at'))
+        if old.get('count') == count and fetched_at and fetched_at > refresh_before:
+            articles[article_id] = old
+        else:
+            articles[article_id] = {'count': count, 'fetched_at': stamp}
+
+    if (previous and previous_articles == articles and previous.get('scholar_ids') == list(scholar_ids)
+            and previous.get('max_age_days') == max_age_days):
+        return previous
+
+    return {
+        'version': CITATIONS_DATA_VERSION,
+        'generated_at': stamp,
+        'max_age_days': max_age_days,
+        'scholar_ids': list(scholar_ids),
+        'articles': articles,
+    }
+
+
+def write_citations_data(path, data):
+    """Write the citation data file; returns True if it changed"""
+    text = json.dumps(data, indent=1, sort_keys=True) + '\n'
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write(path, [text])
+    return True
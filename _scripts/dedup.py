@@ -0,0 +1,338 @@
+"""
+Duplicate detection for publications gathered from several Scholar profiles
+
+A co-authored paper shows up once on every member's profile, each time with
+a different Scholar article ID. Publications are matched on their DOI or on
+their normalized title plus year; each group of duplicates is merged into
+the first one seen, which keeps the list of profiles ('members') it came
+from and the highest citation count.
+
+Within one profile, preprint and published versions of a paper are found
+by title similarity (MinHash/LSH, see plan_versions) and merged into the
+published one, and BibTeX keys that would still collide get stable suffixes.
+
+Usage:
+    merged, duplicates = merge_duplicates(publications)
+
+    plan = plan_versions(publications, identify=article_id, bibtex_key=key_of)
+    publications = MergedVersions(publications, plan, article_id, sort_key)
+"""
+
+import hashlib
+import itertools
+import random
+import re
+import unicodedata
+from operator import itemgetter
+
+from pipeline import external_sort
+
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+DOI_PREFIX_RE = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalize_title(title):
+    """Lower-case ASCII words of a title: accents, markup and punctuation removed"""
+    title = unicodedata.normalize('NFKD', title or '')
+    title = title.encode('ascii', 'ignore').decode('ascii').lower()
+    return NON_WORD_RE.sub(' ', title).strip()
+
+
+def normalize_doi(doi):
+    """Bare lower-case DOI ('10.xxxx/...') or None"""
+    if not doi:
+        return None
+    doi = DOI_PREFIX_RE.sub('', doi.strip()).lower()
+    return doi or None
+
+
+def publication_keys(pub):
+    """Identity keys of a publication: its DOI and its (title, year)"""
+    keys = []
+    doi = normalize_doi(pub.get('doi'))
+    if doi:
+        keys.append(('doi', doi))
+    title = normalize_title(pub.get('title'))
+    if title:
+        keys.append(('title', title, pub.get('year')))
+    return keys
+
+
+def merge_into(primary, duplicate):
+    """Fold a duplicate publication into the one that is kept"""
+    for member in duplicate.get('members', []):
+        if member not in primary.setdefault('members', []):
+            primary['members'].append(member)
+    if duplicate.get('citations', 0) > primary.get('citations', 0):
+        primary['citations'] = duplicate['citations']
+    for field, value in duplicate.items():
+        if value and not primary.get(field):
+            primary[field] = value
+
+
+def merge_duplicates(publications):
+    """Merge duplicate publications, keeping the first of each group in input order
+
+    Returns (unique publications, number of duplicates merged away).
+    """
+    unique = []
+    seen = {}
+    duplicates = 0
+    for pub in publications:
+        keys = publication_keys(pub)
+        primary = next((seen[key] for key in keys if key in seen), None)
+        if primary is None:
+            unique.append(pub)
+            primary = pub
+        else:
+            merge_into(primary, pub)
+            duplicates += 1
+        # Register the keys of both so a DOI learned from either side matches later copies
+        for key in keys + publication_keys(primary):
+            seen.setdefault(key, primary)
+    return unique, duplicates
+
+
+# -- Preprint / published versions -------------------------------------------
+#
+# Within one profile, Scholar often lists a preprint (arXiv, ChemRxiv, ...)
+# and the published paper as separate rows with slightly different titles.
+# plan_versions() finds them with MinHash signatures of the normalized
+# titles' character shingles and LSH banding: every publication gets one
+# block key per band (plus one for its exact normalized title), the keys
+# are sorted with pipeline.external_sort(), and only publications sharing
+# a block are compared. That keeps memory bounded and the work close to
+# linear. A pair is merged when the titles are similar enough, carry the
+# same numbers ("Part II") and at least one of them is a preprint, or when
+# the titles are identical and the years agree (a repeated row).
+
+SHINGLE_SIZE = 3  # characters per title shingle
+LSH_BANDS = 6
+LSH_ROWS = 6  # MinHash values per band; title similarity 0.9 becomes a candidate ~97% of the time
+VERSION_SIMILARITY = 0.8  # Jaccard similarity of shingle sets for different titles to match
+MIN_TITLE_WORDS = 3  # shorter titles ("Editorial") are never merged
+MAX_YEAR_GAP = 2  # years between a preprint and its publication
+MAX_BLOCK = 64  # publications compared per block; larger blocks are generic titles
+MINHASH_SEED = 20240601
+
+PREPRINT_RE = re.compile(r'\b(?:arxiv|chemrxiv|biorxiv|medrxiv|preprints?|research square|ssrn)\b',
+                         re.IGNORECASE)
+PREPRINT_DOI_PREFIXES = ('10.48550/', '10.26434/', '10.1101/', '10.21203/', '10.2139/')
+NUMBER_RE = re.compile(r'\b(?:\d+|[ivx]+)\b')
+
+# Fields a merged publication takes from its other versions when it lacks them
+VERSION_FIELDS = ('authors_raw', 'authors', 'abstract', 'arxiv', 'pdf')
+
+# One 30-bit hash per shingle (a single-digit Python int, so min() stays fast),
+# XORed with a random mask per MinHash value
+MINHASH_BITS = 30
+MINHASH_MASKS = [random.Random(MINHASH_SEED + i).getrandbits(MINHASH_BITS)
+                 for i in range(LSH_BANDS * LSH_ROWS)]
+
+
+def is_preprint(pub):
+    """Check whether a publication is a preprint (by venue or DOI prefix)"""
+    venue = f"{pub.get('journal') or ''} {pub.get('venue') or ''}"
+    doi = normalize_doi(pub.get('doi')) or ''
+    return bool(PREPRINT_RE.search(venue)) or doi.startswith(PREPRINT_DOI_PREFIXES)
+
+
+def shingles(title):
+    """Character shingles of a normalized title"""
+    padded = f" {title} "
+    return {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title):
+    """MinHash signature (LSH_BANDS * LSH_ROWS values) of a normalized title"""
+    hashed = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+              >> (32 - MINHASH_BITS) for shingle in shingles(title)]
+    return [min(map(mask.__xor__, hashed)) for mask in MINHASH_MASKS]
+
+
+def lsh_blocks(title):
+    """Block keys of a normalized title: its exact text plus one per LSH band"""
+    signature = minhash(title)
+    blocks = [f"t:{title}"]
+    for band in range(LSH_BANDS):
+        blocks.append(f"b{band}:{hash(tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))}")
+    return blocks
+
+
+def jaccard(first, second):
+    """Jaccard similarity of two sets"""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def are_versions(first, second):
+    """Check whether two candidates (see plan_versions) are versions of one paper"""
+    _, title, year, doi, preprint, _ = first
+    _, other_title, other_year, other_doi, other_preprint, _ = second
+    if year and other_year and abs(year - other_year) > MAX_YEAR_GAP:
+        return False
+    if not (preprint or other_preprint):
+        # Two published papers: only a repeated row (e.g. a conference and a journal paper differ)
+        return title == other_title and (not year or not other_year or year == other_year) and (
+            not doi or not other_doi or doi == other_doi)
+    if title == other_title:
+        return True
+    return (set(NUMBER_RE.findall(title)) == set(NUMBER_RE.findall(other_title))
+            and jaccard(shingles(title), shingles(other_title)) >= VERSION_SIMILARITY)
+
+
+def version_rank(candidate):
+    """Sort key choosing the version that is kept: published first, then most cited, then by ID"""
+    identifier, _, _, _, preprint, citations = candidate
+    return preprint, -citations, identifier
+
+
+class VersionPlan:
+    """Result of plan_versions(): version groups and disambiguated BibTeX keys"""
+
+    def __init__(self, groups, keys):
+        self.groups = groups  # lists of publication IDs, the kept version first
+        self.keys = keys  # publication ID -> BibTeX key, for keys shared by several publications
+        self.group_of = {identifier: group for group in groups for identifier in group}
+        self.merged = sum(len(group) - 1 for group in groups)
+
+    def __bool__(self):
+        return bool(self.groups or self.keys)
+
+
+def plan_versions(publications, identify, bibtex_key=None):
+    """Find the version groups of a publication source in one pass; returns a VersionPlan
+
+    identify(pub) gives a publication's stable ID (publications without one
+    are left alone). If bibtex_key(pub) is given, publications that would
+    still share a key after merging get suffixes b, c, ... in ID order, so
+    the keys do not depend on the output order.
+    """
+    def blocks():
+        for pub in publications:
+            identifier = identify(pub)
+            if not identifier:
+                continue
+            title = normalize_title(pub.get('title'))
+            if len(title.split()) >= MIN_TITLE_WORDS:
+                year = pub.get('year')
+                candidate = [identifier, title, int(year) if year else None, normalize_doi(pub.get('doi')),
+                             is_preprint(pub), pub.get('citations') or 0]
+                for block in lsh_blocks(title):
+                    yield [0, block, candidate]
+            if bibtex_key is not None:
+                yield [1, bibtex_key(pub), identifier]
+
+    parent = {}
+    candidates = {}
+
+    def find(identifier):
+        while parent[identifier] != identifier:
+            parent[identifier] = parent[parent[identifier]]
+            identifier = parent[identifier]
+        return identifier
+
+    shared_keys = []
+    with external_sort(blocks(), key=itemgetter(0, 1)) as records:
+        for (kind, block), group in itertools.groupby(records, key=itemgetter(0, 1)):
+            if kind == 1:
+                # Key records sort after every block, so the groups are complete here
+                identifiers = [record[2] for record in group]
+                if len(identifiers) > 1:
+                    shared_keys.append((block, identifiers))
+                continue
+            bucket = [record[2] for record in itertools.islice(group, MAX_BLOCK)]
+            for i, first in enumerate(bucket):
+                for second in bucket[i + 1:]:
+                    if are_versions(first, second):
+                        for candidate in (first, second):
+                            candidates[candidate[0]] = candidate
+                            parent.setdefault(candidate[0], candidate[0])
+                        parent[find(first[0])] = find(second[0])
+
+    members = {}
+    for identifier in parent:
+        members.setdefault(find(identifier), []).append(candidates[identifier])
+    groups = sorted(
+        [candidate[0] for candidate in sorted(group, key=version_rank)] for group in members.values()
+    )
+
+    merged_away = {identifier for group in groups for identifier in group[1:]}
+    keys = {}
+    for key, identifiers in shared_keys:
+        kept = sorted(identifier for identifier in identifiers if identifier not in merged_away)
+        for position, identifier in enumerate(kept[1:], start=1):
+            keys[identifier] = f"{key}{chr(ord('a') + position)}"
+    return VersionPlan(groups, keys)
+
+
+def merge_versions(versions):
+    """One publication from its versions (the kept one first); citation counts are summed
+
+    Each row is a separate Scholar cluster, so its citations are distinct.
+    The versions are not modified.
+    """
+    merged = dict(versions[0])
+    merged['members'] = list(merged.get('members', []))
+    for other in versions[1:]:
+        for member in other.get('members', []):
+            if member not in merged['members']:
+                merged['members'].append(member)
+        for field in VERSION_FIELDS:
+            if other.get(field) and not merged.get(field):
+                merged[field] = other[field]
+    if not merged['members']:
+        del merged['members']
+    merged['citations'] = sum(version.get('citations') or 0 for version in versions)
+    return merged
+
+
+class MergedVersions:
+    """Sized, re-iterable view of an ordered publication source with a VersionPlan applied
+
+    Every pass reads the source twice: once for the versions of each group,
+    then to stream the other publications, with each merged publication
+    placed where sort_key puts it. Disambiguated keys are set as 'bibtex_key'.
+    """
+
+    def __init__(self, source, plan, identify, sort_key):
+        self.source = source
+        self.plan = plan
+        self.identify = identify
+        self.sort_key = sort_key
+
+    def __len__(self):
+        return len(self.source) - self.plan.merged
+
+    def __iter__(self):
+        versions = {}
+        if self.plan.groups:
+            for pub in self.source:
+                identifier = self.identify(pub)
+                if identifier in self.plan.group_of:
+                    versions[identifier] = pub
+        merged = []
+        for group in self.plan.groups:
+            found = [versions[identifier] for identifier in group if identifier in versions]
+            if found:
+                merged.append(self._with_key(merge_versions(found)))
+        merged.sort(key=self.sort_key)
+
+        position = 0
+        for pub in self.source:
+            identifier = self.identify(pub)
+            if identifier in self.plan.group_of:
+                continue
+            pub = self._with_key(pub)
+            while position < len(merged) and self.sort_key(merged[position]) <= self.sort_key(pub):
+                yield merged[position]
+                position += 1
+            yield pub
+        yield from merged[position:]
+
+    def _with_key(self, pub):
+        key = self.plan.keys.get(self.identify(pub))
+        if key is not None:
+            pub['bibtex_key'] = key
+        return pub
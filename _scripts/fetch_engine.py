@@ -0,0 +1,345 @@
+"""
+Concurrent, rate-limited fetching for the Google Scholar scrapers
+
+A FetchEngine runs requests on a thread pool while a shared token bucket
+keeps the overall request rate within a fixed budget and a per-host cap
+bounds how many requests are in flight against any one server.
+
+Failed requests (429, 5xx, connection errors) are retried by a
+RetryScheduler, which can be shared between callers (the profile walk and
+the detail fetches use the same one). It never waits before a first
+attempt; after a failure it honors Retry-After, otherwise backs off with
+decorrelated jitter. Throttling responses (429/503) pause every caller of
+the scheduler, and a run of consecutive failures opens a circuit breaker
+so remaining requests give up at once instead of waiting out their
+retries. An engine given a deadline (a time.monotonic() value) sends
+nothing after it and starts no retry whose wait would run past it.
+
+Usage:
+    engine = FetchEngine(session, rate=0.5, burst=2, max_workers=4)
+    results = engine.map(lambda url: engine.get(url), urls)
+    for response in engine.imap(lambda url: engine.get(url), iter_urls()):  # lazy, bounded
+        ...
+
+    scheduler = RetryScheduler(max_attempts=5)
+    response = scheduler.request(lambda attempt: session.get(url), label=url)
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from pipeline import bounded_map
+
+# Status codes worth retrying; anything else is returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses meaning "slow down": they pause every caller of a scheduler
+THROTTLE_STATUSES = {429, 503}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` saved up"""
+
+    def __init__(self, rate, capacity=1, sleep=time.sleep, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._sleep = sleep
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, blocking until one is available; returns the time waited"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now so concurrent callers queue up behind us
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests per host"""
+
+    def __init__(self, per_host=2):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots for the duration of the block"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            yield
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def decorrelated_jitter(previous, base=2.0, cap=60.0, rng=random):
+    """Next backoff delay: uniform in [base, 3 * previous], capped (rng: a random.Random)"""
+    return min(cap, rng.uniform(base, max(base, previous * 3)))
+
+
+class CircuitOpen(requests.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class RetryScheduler:
+    """Retry policy shared by every request path of a run
+
+    Nothing waits on the happy path. A failed attempt is retried after the
+    server's Retry-After, or after a decorrelated-jitter backoff. Throttling
+    responses set a pause that every caller honors before its next request.
+    After failure_threshold consecutive failed attempts the breaker opens
+    and requests fail immediately; after reset_timeout one request is let
+    through again to probe the server.
+    """
+
+    def __init__(self, max_attempts=4, base=2.0, cap=120.0, max_retry_after=300.0,
+                 failure_threshold=8, reset_timeout=600.0, sleep=None, on_retry=None,
+                 clock=time.monotonic, rng=None):
+        """
+        max_attempts: attempts per request, including the first
+        base / cap: bounds of the jittered backoff, in seconds
+        max_retry_after: longest Retry-After honored; a longer one fails the request
+        failure_threshold: consecutive failed attempts that open the breaker
+        reset_timeout: seconds the breaker stays open before a probe request
+        sleep: sleep(seconds, reason) function (reasons: retry_after, backoff, pause)
+        on_retry: optional callable(kind) called for every retry
+        clock / rng: time.monotonic() and random.Random replacements
+        """
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._sleep = sleep or (lambda seconds, reason: time.sleep(seconds))
+        self.on_retry = on_retry
+        self._clock = clock
+        self._rng = rng or random
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self.stats = {'attempts': 0, 'retries': 0, 'failures': 0, 'throttled': 0, 'circuit_trips': 0}
+
+    @property
+    def is_open(self):
+        """True while the breaker refuses requests"""
+        with self._lock:
+            return self._opened_at is not None and self._clock() - self._opened_at < self.reset_timeout
+
+    def before_attempt(self):
+        """Wait out a shared pause; raise CircuitOpen while the breaker is open"""
+        with self._lock:
+            now = self._clock()
+            if self._opened_at is not None:
+                if now - self._opened_at < self.reset_timeout:
+                    raise CircuitOpen("Too many consecutive failures; not sending more requests")
+                self._opened_at = None  # half-open: let this request probe the server
+                self._consecutive_failures = self.failure_threshold - 1
+            wait = self._paused_until - now
+            self.stats['attempts'] += 1
+        if wait > 0:
+            self._sleep(wait, 'pause')
+
+    def record_success(self):
+        """Close the breaker after a good response"""
+        with self._lock:
+            self._consecutive_failures = 0
+
+    def record_failure(self, response=None, previous_delay=None):
+        """Account for a failed attempt; returns (delay before retrying, reason), or None to give up
+
+        reason is 'retry_after' or 'backoff' for a wait the caller sleeps
+        itself, 'pause' for a shared pause that before_attempt() waits out.
+        """
+        retry_after = None
+        throttled = response is not None and response.status_code in THROTTLE_STATUSES
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = self._clock()
+                self.stats['circuit_trips'] += 1
+                print(f"  ❌ {self._consecutive_failures} failures in a row; giving up on further requests")
+                return None
+
+            if retry_after is not None and retry_after > self.max_retry_after:
+                print(f"  ❌ Server asked to wait {retry_after:.0f} seconds; giving up")
+                return None
+
+            delay = decorrelated_jitter(previous_delay or self.base, self.base, self.cap, self._rng)
+            reason = 'backoff'
+            if retry_after is not None:
+                delay, reason = max(retry_after, self.base / 2), 'retry_after'
+
+            if throttled:
+                # Everyone slows down, not just the caller that hit the limit;
+                # the wait happens in before_attempt() of the next attempt
+                self.stats['throttled'] += 1
+                self._paused_until = max(self._paused_until, self._clock() + delay)
+                reason = 'pause'
+        return delay, reason
+
+    def request(self, send, label='request', kind='request', attempts=None, deadline=None):
+        """Call send(attempt) until it returns a non-retryable response
+
+        attempts overrides max_attempts for this request; no retry is
+        started whose wait would end after deadline (a clock() value).
+        Returns the response, or None when every attempt failed, the server
+        asked for too long a wait, the deadline came or the breaker is open.
+        """
+        attempts = attempts or self.max_attempts
+        delay = None
+        for attempt in range(attempts):
+            try:
+                self.before_attempt()
+                response = send(attempt)
+            except CircuitOpen as e:
+                print(f"  ❌ {label}: {e}")
+                break
+            except requests.RequestException as e:
+                print(f"  ⚠️  Request failed (attempt {attempt + 1}): {e}")
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.record_success()
+                    return response
+                print(f"  ⚠️  HTTP {response.status_code} for {label}")
+
+            if attempt == attempts - 1:
+                self.record_failure(response, delay)
+                break
+            decision = self.record_failure(response, delay)
+            if decision is None:
+                break
+
+            delay, reason = decision
+            if deadline is not None and self._clock() + delay >= deadline:
+                print(f"  ⏱️  {label}: no time left to retry before the deadline")
+                break
+            with self._lock:
+                self.stats['retries'] += 1
+            if self.on_retry:
+                self.on_retry(kind)
+            print(f"  ⚠️  Retrying in {delay:.1f} seconds...")
+            if reason != 'pause':
+                self._sleep(delay, reason)
+
+        with self._lock:
+            self.stats['failures'] += 1
+        return None
+
+
+class FetchEngine:
+    """Thread pool + token bucket + per-host caps around a requests session"""
+
+    def __init__(self, session, rate=0.5, burst=2, max_workers=4, per_host=2,
+                 retry=None, max_attempts=None, exempt=None, throttle_sleep=time.sleep,
+                 deadline=None, clock=time.monotonic):
+        """
+        rate: sustained requests per second across all workers
+        burst: requests allowed back-to-back before the rate applies
+        max_workers: size of the thread pool used by map()
+        per_host: concurrent requests allowed against a single host
+        retry: RetryScheduler to use (e.g. one shared with other fetchers);
+               a private one with the defaults if omitted
+        max_attempts: attempts per request (default: the scheduler's)
+        exempt: optional callable(url) -> True when the request will not hit
+                the network (e.g. a fresh cache entry) and needs no token
+        throttle_sleep: sleep function for rate-limit waits
+        deadline: optional time.monotonic() value after which get() sends nothing
+        clock: time.monotonic() replacement for the deadline and the token bucket
+        """
+        self.session = session
+        self.max_workers = max_workers
+        self.retry = retry or RetryScheduler()
+        self.max_attempts = max_attempts
+        self.exempt = exempt
+        self.bucket = TokenBucket(rate, burst, sleep=throttle_sleep, clock=clock)
+        self.hosts = HostLimiter(per_host)
+        self.deadline = deadline
+        self._clock = clock
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'throttled_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    @property
+    def expired(self):
+        """True once the deadline has passed"""
+        return self.deadline is not None and self._clock() >= self.deadline
+
+    def get(self, url, label=None, **kwargs):
+        """GET a URL within the rate budget, retrying transient failures
+
+        Returns the response (which may carry a non-retryable error status),
+        or None if every attempt failed or the deadline has passed.
+        """
+        def send(attempt):
+            if attempt:
+                self._count('retries')
+            if not (self.exempt and self.exempt(url)):
+                self._count('throttled_seconds', self.bucket.acquire())
+            with self.hosts.slot(url):
+                self._count('requests')
+                return self.session.get(url, **kwargs)
+
+        if self.expired:
+            return None
+        response = self.retry.request(send, label=label or url, kind='details', attempts=self.max_attempts,
+                                      deadline=self.deadline)
+        if response is None:
+            self._count('failures')
+        return response
+
+    def map(self, func, items):
+        """Apply func to every item on the thread pool; results keep the input order"""
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(func, items))
+
+    def imap(self, func, items, window=None):
+        """Lazy map(): yield results in input order with at most window items in flight"""
+        return bounded_map(func, items, self.max_workers, window)
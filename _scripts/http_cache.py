@@ -0,0 +1,255 @@
+"""
+Persistent HTTP response cache for the Google Scholar scrapers
+
+Responses are stored in a small SQLite database keyed by URL, with the bodies
+zlib-compressed. Entries younger than their TTL are served without touching
+the network; older entries are revalidated with If-None-Match /
+If-Modified-Since, so an unchanged page costs a 304 instead of a full
+download. The total stored size is capped and the least recently used
+entries are evicted first.
+
+Usage:
+    cache = ResponseCache(".scholar_cache/responses.sqlite", default_ttl=3600)
+    install_cache(session, cache)
+    session.get(url)  # served from / stored in the cache transparently
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB of compressed bodies
+
+# Headers describing the wire encoding; they do not apply to the stored body
+UNCACHED_HEADERS = {
+    'connection',
+    'content-encoding',
+    'content-length',
+    'keep-alive',
+    'set-cookie',
+    'transfer-encoding',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class ResponseCache:
+    """URL-keyed store of compressed response bodies with TTLs and LRU eviction"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, default_ttl=0, ttl_rules=None, clock=time.time):
+        """
+        path: SQLite file (parent directories are created)
+        max_bytes: cap on the total compressed body size
+        default_ttl: seconds an entry is served without revalidation
+        ttl_rules: list of (url substring, ttl seconds); the first match wins
+        clock: time.time() replacement for entry ages and access times
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_rules = list(ttl_rules or [])
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._clock = clock
+
+        # Fetch workers share the cache: one lock for the database, one for stats
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def count(self, key, amount=1):
+        """Add to one of the stats counters (safe to call from any thread)"""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def ttl_for(self, url):
+        """Return the TTL in seconds that applies to a URL"""
+        for pattern, ttl in self.ttl_rules:
+            if pattern in url:
+                return ttl
+        return self.default_ttl
+
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, fetched_at "
+                "FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?", (self._clock(), url)
+            )
+            self._conn.commit()
+
+        status, headers, body, etag, last_modified, fetched_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at,
+        }
+
+    def is_fresh(self, entry, now=None):
+        """Check whether an entry can be served without revalidation"""
+        now = self._clock() if now is None else now
+        return now - entry['fetched_at'] < self.ttl_for(entry['url'])
+
+    def put(self, url, status, headers, body):
+        """Store a response body and its validators, then enforce the size cap"""
+        # Header names are case-insensitive: servers send ETag, Etag or etag
+        headers = CaseInsensitiveDict({k: v for k, v in headers.items() if k.lower() not in UNCACHED_HEADERS})
+        compressed = zlib.compress(body, 6)
+        now = self._clock()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, status, headers, body, size, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url, status, json.dumps(dict(headers)), compressed, len(compressed),
+                    headers.get('ETag'), headers.get('Last-Modified'), now, now,
+                ),
+            )
+            self._conn.commit()
+            self.count('stored')
+            self._evict_locked()
+
+    def mark_revalidated(self, url, headers=None):
+        """Reset the age of an entry after a 304, picking up any new validators"""
+        headers = CaseInsensitiveDict(headers or {})
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        now = self._clock()
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url = ?",
+                (now, now, etag, last_modified, url),
+            )
+            self._conn.commit()
+
+    def total_size(self):
+        """Return the total compressed size of all stored bodies"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict_locked(self):
+        """Drop least recently used entries until the cache fits under max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        victims = []
+        for url, size in self._conn.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((url,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self._conn.commit()
+        self.count('evicted', len(victims))
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that answers GET requests from a ResponseCache"""
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry and self.cache.is_fresh(entry):
+            self.cache.count('hits')
+            return self._build_cached_response(request, entry)
+
+        if entry:
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.count('revalidated')
+            self.cache.mark_revalidated(request.url, response.headers)
+            response.close()
+            return self._build_cached_response(request, entry)
+
+        self.cache.count('misses')
+        if response.status_code == 200:
+            self.cache.put(request.url, response.status_code, response.headers, response.content)
+        return response
+
+    def _build_cached_response(self, request, entry):
+        """Build a requests Response from a cache entry"""
+        response = Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry['body']
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK'
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+def install_cache(session, cache, **adapter_kwargs):
+    """Route every HTTP(S) request of a session through a ResponseCache"""
+    adapter = CachingAdapter(cache, **adapter_kwargs)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
@@ -0,0 +1,270 @@
+"""
+ISO 4 journal title abbreviation from the LTWA (List of Title Word Abbreviations)
+
+The LTWA is read from its published CSV form (WORDS;ABBREVIATIONS;LANGUAGES,
+';'-separated) and compiled into two character tries: one for whole words,
+word prefixes ("chemi-") and multi-word patterns ("united states"), one
+(reversed) for word endings ("-ology"). Abbreviating a title walks each
+word once through the trie and takes the longest pattern that matches, so
+the cost does not depend on the size of the list.
+
+ISO 4 rules applied on top of the list: articles, prepositions,
+conjunctions and dashes between title parts are dropped (a section letter
+such as the A of "Physical Review A", at the end of the title or before
+':', ',' or a volume number, is kept), words not in the list (or marked
+"n.a.") are kept in full, and single-word titles are not abbreviated.
+
+The compiled tries can be pickled next to a cache directory, and resolved
+abbreviations can be kept between runs in a small JSON file.
+
+Usage:
+    ltwa = load_ltwa("_scripts/data/ltwa.csv")     # the full LTWA from issn.org
+    ltwa.abbreviate("The Journal of Chemical Physics")  # 'J. Chem. Phys.'
+"""
+
+import csv
+import hashlib
+import json
+import os
+import pickle
+import re
+import unicodedata
+
+from bib_writer import atomic_write
+
+NOT_ABBREVIATED = 'n.a.'
+END = '\0'  # trie key holding the pattern that ends at a node
+CACHE_VERSION = 2  # bumped when abbreviate() changes, so cached abbreviations are redone
+
+# Articles, prepositions and conjunctions omitted by ISO 4 (folded to ASCII)
+STOP_WORDS = {
+    'a', 'an', 'the', 'and', '&', 'of', 'for', 'in', 'on', 'at', 'to', 'with', 'by', 'from',
+    'der', 'die', 'das', 'des', 'und', 'fur', 'le', 'la', 'les', 'du', 'de', 'et',
+    'del', 'della', 'di',
+}
+
+# A word split into leading punctuation, the word itself and trailing punctuation
+WORD_PARTS_RE = re.compile(r'^([^\w&]*)(.*?)([^\w&]*)$')
+# A dash between parts of a title ("Chemistry – A European Journal"), omitted by ISO 4
+DASH_RE = re.compile(r'^[-\u2010-\u2015]+$')
+LETTER_RE = re.compile(r'[^\W\d_]')
+
+
+def fold(text):
+    """Lower-case ASCII form of a word, used for matching against the list"""
+    text = unicodedata.normalize('NFKD', text)
+    return text.encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def match_case(abbreviation, word):
+    """Capitalize an (lower-case) abbreviation like the word it replaces"""
+    if word[:1].isupper():
+        return ' '.join(part[:1].upper() + part[1:] for part in abbreviation.split(' '))
+    return abbreviation
+
+
+class LTWA:
+    """Compiled LTWA tries and the ISO 4 title abbreviation rules"""
+
+    def __init__(self, entries, fingerprint=None):
+        """entries: iterable of (pattern, abbreviation) pairs in LTWA notation"""
+        self.words = {}
+        self.suffixes = {}
+        self.max_words = 1
+        self.fingerprint = fingerprint
+        for pattern, abbreviation in entries:
+            self.add(pattern, abbreviation)
+
+    def add(self, pattern, abbreviation):
+        """Add one LTWA pattern ('word', 'prefix-', '-suffix' or 'multi word')"""
+        pattern = fold(pattern.strip())
+        abbreviation = abbreviation.strip().lower()
+        if not pattern or pattern == '-':
+            return
+        if abbreviation == NOT_ABBREVIATED:
+            abbreviation = None
+
+        if pattern.startswith('-'):
+            node = self.suffixes
+            for char in reversed(pattern[1:]):
+                node = node.setdefault(char, {})
+            node[END] = abbreviation.lstrip('-') if abbreviation else None
+            return
+
+        is_prefix = pattern.endswith('-')
+        pattern = pattern.rstrip('-')
+        self.max_words = max(self.max_words, pattern.count(' ') + 1)
+        node = self.words
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[END] = (abbreviation, is_prefix)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Compile an LTWA CSV file (WORDS;ABBREVIATIONS;LANGUAGES)"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        fingerprint = hashlib.sha1(data).hexdigest()
+        rows = csv.reader(data.decode('utf-8-sig').splitlines(), delimiter=';')
+        entries = [
+            (row[0], row[1]) for row in rows
+            if len(row) >= 2 and row[0].strip() and row[0].strip().upper() != 'WORDS'
+        ]
+        return cls(entries, fingerprint)
+
+    def match(self, words):
+        """Longest pattern matching the start of a list of folded words
+
+        Returns (abbreviation, number of words covered); abbreviation is None
+        for an "n.a." pattern, and (None, 0) means no pattern matched.
+        """
+        text = ' '.join(words[:self.max_words])
+        node = self.words
+        best = (None, 0)
+        for position, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            entry = node.get(END)
+            if entry is None:
+                continue
+            abbreviation, is_prefix = entry
+            at_word_end = position + 1 == len(text) or text[position + 1] == ' '
+            word_end = text.find(' ', position + 1)
+            if word_end < 0:
+                word_end = len(text)
+            # A prefix pattern covers the rest of the word it ends in (but not across a hyphen)
+            if at_word_end or (is_prefix and '-' not in text[position + 1:word_end]):
+                covered = text.count(' ', 0, word_end) + 1
+                best = (abbreviation or NOT_ABBREVIATED, covered)
+        abbreviation, covered = best
+        return (None if abbreviation == NOT_ABBREVIATED else abbreviation), covered
+
+    def match_suffix(self, word):
+        """Abbreviate a word by its longest listed ending (e.g. -ology -> -ol.), or None"""
+        folded = fold(word)
+        node = self.suffixes
+        best = None
+        for length, char in enumerate(reversed(folded), 1):
+            node = node.get(char)
+            if node is None:
+                break
+            if END in node and length < len(folded):
+                best = (length, node[END])
+        if best is None or best[1] is None:
+            return None
+        length, ending = best
+        return word[:len(word) - length] + ending
+
+    def abbreviate_word(self, word):
+        """Abbreviate a single word on its own (hyphenated parts separately)"""
+        abbreviation, covered = self.match([fold(word)])
+        if covered:
+            return match_case(abbreviation, word) if abbreviation else word
+        if '-' in word:
+            return '-'.join(self.abbreviate_word(part) if part else part for part in word.split('-'))
+        return self.match_suffix(word) or word
+
+    def abbreviate(self, title):
+        """ISO 4 abbreviation of a journal title"""
+        words = [word for word in title.split() if not DASH_RE.match(word)]
+        tokens = []
+        for index, token in enumerate(words):
+            lead, core, trail = WORD_PARTS_RE.match(token).groups()
+            folded = fold(core)
+            # A capital 'A' after a word is a section letter (Phys. Rev. A), not
+            # an article ("Chemistry – A European Journal"), when it ends the
+            # title or is followed by ':', ',' or the volume of a Scholar venue
+            # ("Physical Review A 99 (1), 012345")
+            is_section = (core == 'A' and index > 0 and LETTER_RE.search(words[index - 1]) is not None
+                          and (index == len(words) - 1 or trail[:1] in (':', ',')
+                               or words[index + 1][:1].isdigit()))
+            is_stop = folded in STOP_WORDS and not is_section
+            tokens.append((lead, core, trail, folded, is_stop))
+
+        significant = [t for t in tokens if not t[4] and LETTER_RE.search(t[1])]
+        if len(significant) <= 1:
+            return title  # single-word titles are not abbreviated
+
+        tokens = [t for t in tokens if not t[4]]
+        result = []
+        i = 0
+        while i < len(tokens):
+            lead, core, trail, folded, _ = tokens[i]
+            if not LETTER_RE.search(core):
+                result.append(lead + core + trail)
+                i += 1
+                continue
+
+            # Multi-word patterns may only span plain words (no punctuation in between)
+            span = [folded]
+            for _, next_core, next_trail, next_folded, _ in tokens[i + 1:i + self.max_words]:
+                if trail or not LETTER_RE.search(next_core):
+                    break
+                span.append(next_folded)
+                if next_trail:
+                    break
+
+            abbreviation, covered = self.match(span)
+            if covered > 1:
+                last_trail = tokens[i + covered - 1][2]
+                words = ' '.join(t[1] for t in tokens[i:i + covered])
+                text = match_case(abbreviation, core) if abbreviation else words
+                result.append(lead + text + (last_trail.lstrip('.') if abbreviation else last_trail))
+                i += covered
+                continue
+
+            text = self.abbreviate_word(core)
+            if text != core and text.endswith('.'):
+                trail = trail.lstrip('.')
+            result.append(lead + text + trail)
+            i += 1
+
+        return ' '.join(result)
+
+
+def load_ltwa(path, cache_dir=None):
+    """Load an LTWA CSV file, reusing a pickled compiled copy from cache_dir if present"""
+    if not cache_dir:
+        return LTWA.from_csv(path)
+
+    with open(path, 'rb') as f:
+        fingerprint = hashlib.sha1(f.read()).hexdigest()
+    pickle_path = os.path.join(cache_dir, f"ltwa-{fingerprint[:16]}.pickle")
+    try:
+        with open(pickle_path, 'rb') as f:
+            ltwa = pickle.load(f)
+        if ltwa.fingerprint == fingerprint:
+            return ltwa
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    ltwa = LTWA.from_csv(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{pickle_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(ltwa, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pickle_path)
+    except OSError as e:
+        print(f"⚠️  Could not cache the compiled LTWA: {e}")
+    return ltwa
+
+
+def load_abbreviation_cache(path, fingerprint):
+    """Resolved abbreviations saved by a previous run, if made with the same rules"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION or data.get('fingerprint') != fingerprint:
+        return {}
+    return data.get('abbreviations', {})
+
+
+def save_abbreviation_cache(path, fingerprint, abbreviations):
+    """Persist resolved abbreviations for the next run"""
+    data = {'version': CACHE_VERSION, 'fingerprint': fingerprint, 'abbreviations': abbreviations}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write(path, [json.dumps(data, indent=1, ensure_ascii=False, sort_keys=True), '\n'])
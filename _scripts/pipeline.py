@@ -0,0 +1,206 @@
+"""
+Bounded-memory building blocks for the update pipeline
+
+The updater streams publications from the profile pages to the BibTeX
+writer as a chain of generators (fetch -> parse -> enrich -> convert ->
+write) and never holds the whole profile in memory:
+
+- buffered() runs a producer stage on its own thread behind a bounded
+  queue, so parsing the next profile page overlaps the work downstream
+  without running arbitrarily far ahead of it;
+- bounded_map() applies a function on a thread pool with at most `window`
+  items in flight and yields the results in input order;
+- external_sort() sorts a stream in chunks of SORT_CHUNK items, spills
+  each sorted chunk to a temporary JSON-lines run file and merges the runs
+  lazily. The result can be iterated any number of times (one pass per
+  output file) and knows its length; with value=, the items are sorted on
+  a key they carry (e.g. [item, position]) and handed out without it.
+
+Items that go through external_sort() must be JSON-serializable.
+
+Usage:
+    publications = external_sort(buffered(iter_publications()), key=publication_sort_key)
+    for pub in bounded_map(fetch_details, publications, workers=4):
+        ...
+    publications.close()
+"""
+
+import heapq
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import deque
+
+SORT_CHUNK = 1000  # items sorted in memory before a run is spilled to disk
+QUEUE_SIZE = 256  # items a buffered() producer may run ahead of its consumer
+PUT_TIMEOUT = 0.1  # seconds between checks whether a buffered() consumer has gone away
+
+_ITEM, _ERROR, _DONE = range(3)
+
+
+def read_run(path):
+    """Yield the items of a spilled run file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class SortedRuns:
+    """Result of external_sort(): sized, iterable any number of times, closeable"""
+
+    def __init__(self, key, directory=None, value=None):
+        """key: the sort key; directory: where the run files' temporary directory is created
+
+        value: optional function applied to every item as it is handed out
+        """
+        self.key = key
+        self.value = value
+        self.runs = 0
+        self._count = 0
+        self._memory = None
+        self._parent = directory
+        self._directory = None
+        self._cleanup = None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        if self._memory is not None:
+            items = iter(self._memory)
+        else:
+            paths = [self._run_path(index) for index in range(self.runs)]
+            items = heapq.merge(*(read_run(path) for path in paths), key=self.key)
+        return items if self.value is None else map(self.value, items)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run_path(self, index):
+        return os.path.join(self._directory, f"run-{index:05d}.jsonl")
+
+    def _spill(self, chunk):
+        """Sort a chunk and write it as the next run file"""
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix='scholar-sort-', dir=self._parent)
+            # Removed with the object (or at exit) even if close() is never called
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self._directory, True)
+        chunk.sort(key=self.key)
+        with open(self._run_path(self.runs), 'w', encoding='utf-8') as f:
+            for item in chunk:
+                f.write(json.dumps(item, ensure_ascii=False))
+                f.write('\n')
+        self.runs += 1
+
+    def close(self):
+        """Delete the run files"""
+        if self._cleanup is not None:
+            self._cleanup()
+        self.runs = self._count = 0
+        self._memory = []
+
+
+def external_sort(items, key, chunk_size=SORT_CHUNK, directory=None, value=None):
+    """Stable sort of a stream of any length, holding at most chunk_size items in memory
+
+    A stream that fits in one chunk is kept in memory; longer ones are
+    spilled to sorted run files under directory (default: the system
+    temporary directory) and merged whenever the result is iterated.
+    value: optional function applied to every item of the result as it is
+    iterated (the sort still sees the whole item).
+    """
+    result = SortedRuns(key, directory, value)
+    chunk = []
+    try:
+        for item in items:
+            chunk.append(item)
+            result._count += 1
+            if len(chunk) >= chunk_size:
+                result._spill(chunk)
+                chunk = []
+        if result.runs == 0:
+            chunk.sort(key=key)
+            result._memory = chunk
+        elif chunk:
+            result._spill(chunk)
+    except BaseException:
+        result.close()
+        raise
+    return result
+
+
+def bounded_map(func, items, workers, window=None):
+    """Yield func(item) for every item, in order, with at most window items in flight
+
+    Items are pulled from the input only as results are consumed, so a lazy
+    input stays lazy. window defaults to twice the number of workers.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    window = max(1, window or 2 * workers)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def buffered(items, maxsize=QUEUE_SIZE):
+    """Iterate items produced on a background thread through a queue of at most maxsize
+
+    An exception raised by the producer is re-raised in the consumer. If the
+    consumer stops early, the producer stops at its next item.
+    """
+    channel = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(message):
+        while not stop.is_set():
+            try:
+                channel.put(message, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_ERROR, e))
+
+    producer = threading.Thread(target=produce, name='pipeline-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = channel.get()
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        producer.join()
@@ -0,0 +1,454 @@
+"""
+Local SQLite store of publications, the canonical state behind papers.bib
+
+Profile rows and citation details are upserted as they are fetched, keyed
+by the Scholar article ID, into normalized tables: publications, authors,
+venues (journal and abbreviation), group membership, citation history and
+profile fetch metadata. Upserts only write what changed: an unchanged row
+costs a lookup, a new citation count appends one history row, and a
+change of title, year or venue clears the stored details (they may
+describe another paper) so only that publication needs its citation page
+fetched again. A profile fetch is committed QUERY_CHUNK rows at a time;
+group membership is only replaced once the whole fetch is in.
+
+papers.bib is generated from publications() (ordered by year and citation
+count through the year index), and duplicates, details and citation
+history are indexed lookups instead of passes over the BibTeX file.
+
+Both record methods consume their entries lazily, QUERY_CHUNK at a time,
+and publications() returns a view that streams its rows on every pass, so
+neither side needs the whole profile in memory; SQLite's sorter spills to
+its temporary files when the result does not fit in its cache.
+
+Usage:
+    store = PublicationStore(".scholar_cache/publications.sqlite")
+    store.record_profile(((article_id, pub) for ...), ["JlIWcccAAAAJ"])
+    store.record_details(((article_id, pub) for ...))
+    for pub in store.publications(["JlIWcccAAAAJ"]):
+        ...
+"""
+
+import itertools
+import os
+import sqlite3
+import time
+
+from dedup import normalize_doi, normalize_title
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS venues (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    abbreviation TEXT
+);
+CREATE TABLE IF NOT EXISTS authors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS publications (
+    id INTEGER PRIMARY KEY,
+    scholar_id TEXT NOT NULL UNIQUE,
+    scholar_url TEXT,
+    title TEXT NOT NULL,
+    normalized_title TEXT NOT NULL,
+    year INTEGER,
+    citations INTEGER,
+    authors_raw TEXT,
+    authors TEXT,
+    venue TEXT,
+    venue_id INTEGER REFERENCES venues (id),
+    volume TEXT,
+    number TEXT,
+    pages TEXT,
+    publisher TEXT,
+    doi TEXT,
+    normalized_doi TEXT,
+    arxiv TEXT,
+    pdf TEXT,
+    abstract TEXT,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    details_fetched_at REAL
+);
+CREATE INDEX IF NOT EXISTS publications_doi ON publications (normalized_doi);
+CREATE INDEX IF NOT EXISTS publications_title ON publications (normalized_title);
+CREATE INDEX IF NOT EXISTS publications_year ON publications (year, citations);
+CREATE TABLE IF NOT EXISTS publication_authors (
+    publication_id INTEGER NOT NULL REFERENCES publications (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    author_id INTEGER NOT NULL REFERENCES authors (id),
+    PRIMARY KEY (publication_id, position)
+);
+CREATE INDEX IF NOT EXISTS publication_authors_author ON publication_authors (author_id);
+CREATE TABLE IF NOT EXISTS members (
+    scholar_user TEXT NOT NULL,
+    publication_id INTEGER NOT NULL REFERENCES publications (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (scholar_user, publication_id)
+);
+CREATE INDEX IF NOT EXISTS members_publication ON members (publication_id);
+CREATE TABLE IF NOT EXISTS citation_history (
+    publication_id INTEGER NOT NULL REFERENCES publications (id) ON DELETE CASCADE,
+    fetched_at REAL NOT NULL,
+    citations INTEGER NOT NULL,
+    PRIMARY KEY (publication_id, fetched_at)
+);
+CREATE TABLE IF NOT EXISTS profile_fetches (
+    scholar_user TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    publications INTEGER NOT NULL,
+    PRIMARY KEY (scholar_user, fetched_at)
+);
+"""
+
+# Memberships of the profile fetch in progress; they replace the members
+# rows once the fetch is complete
+TEMP_SCHEMA = """
+CREATE TEMP TABLE fetched_members (
+    scholar_user TEXT NOT NULL,
+    publication_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (scholar_user, publication_id)
+);
+"""
+
+# Fields taken from the profile table
+PROFILE_FIELDS = ('scholar_url', 'title', 'authors_raw', 'authors', 'venue', 'year', 'citations')
+# A change in any of these means the stored citation details may describe another paper
+IDENTITY_FIELDS = ('title', 'year', 'venue')
+# Fields taken from the citation page (journal and abbr live in venues)
+DETAIL_FIELDS = ('volume', 'number', 'pages', 'publisher', 'doi', 'arxiv', 'pdf', 'abstract')
+
+# SQLite's default limit on bound parameters is 999
+QUERY_CHUNK = 500
+
+
+def split_authors(authors):
+    """Individual author names of a profile author string ('A Author, B Author, ...')"""
+    return [name.strip() for name in (authors or '').split(',') if name.strip() and name.strip() != '...']
+
+
+def chunked(items, size=QUERY_CHUNK):
+    """Consecutive lists of up to size items of any iterable"""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StoredPublications:
+    """Lazy result of PublicationStore.publications(): sized and iterable any number of times
+
+    Every pass runs the query again and streams its rows.
+    """
+
+    def __init__(self, store, scholar_users, year=None, needs_details=False):
+        self._store = store
+        self._args = (list(scholar_users), year, needs_details)
+
+    def __len__(self):
+        return self._store._count_publications(*self._args)
+
+    def __iter__(self):
+        return self._store._iter_publications(*self._args)
+
+
+class PublicationStore:
+    """SQLite-backed publications, authors, venues, membership and citation history"""
+
+    def __init__(self, path):
+        """path: SQLite file (parent directories are created)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'details': 0, 'history': 0}
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise sqlite3.DatabaseError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+        self._conn.executescript(TEMP_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+    def _rows(self, scholar_ids):
+        """Stored publication rows by Scholar article ID"""
+        rows = {}
+        for chunk in chunked(scholar_ids):
+            placeholders = ','.join('?' * len(chunk))
+            for row in self._conn.execute(
+                f"SELECT * FROM publications WHERE scholar_id IN ({placeholders})", chunk
+            ):
+                rows[row['scholar_id']] = row
+        return rows
+
+    def _id_for(self, table, name):
+        """Row ID of a venue or author name, inserting it if new"""
+        row = self._conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self._conn.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,)).lastrowid
+
+    def _set_venue(self, publication_id, pub):
+        """Point a publication at the venue (journal, else profile venue) of a parsed publication"""
+        name = pub.get('journal') or pub.get('venue')
+        if not name:
+            self._conn.execute("UPDATE publications SET venue_id = NULL WHERE id = ?", (publication_id,))
+            return
+        venue_id = self._id_for('venues', name)
+        if pub.get('abbr'):
+            self._conn.execute("UPDATE venues SET abbreviation = ? WHERE id = ?", (pub['abbr'], venue_id))
+        self._conn.execute("UPDATE publications SET venue_id = ? WHERE id = ?", (venue_id, publication_id))
+
+    def _set_authors(self, publication_id, authors):
+        """Replace the author list of a publication"""
+        self._conn.execute("DELETE FROM publication_authors WHERE publication_id = ?", (publication_id,))
+        self._conn.executemany(
+            "INSERT INTO publication_authors (publication_id, position, author_id) VALUES (?, ?, ?)",
+            [(publication_id, position, self._id_for('authors', name))
+             for position, name in enumerate(split_authors(authors))],
+        )
+
+    def record_profile(self, entries, scholar_users, fetched_at=None):
+        """Upsert the rows of a complete profile fetch, in profile order; returns the number of rows
+
+        entries: iterable of (article ID, publication dict), consumed and
+        committed QUERY_CHUNK at a time, so the rows of an interrupted
+        fetch are kept; each publication's 'members' lists the profiles it
+        is on (default: all scholar_users). Membership of scholar_users is
+        replaced in one transaction once entries is exhausted: if iterating
+        entries raises, or yields nothing, the current membership is kept.
+        """
+        now = fetched_at or time.time()
+        position = 0
+        with self._conn:
+            self._conn.execute("DELETE FROM fetched_members")
+        for batch in chunked(entries):
+            with self._conn:
+                memberships = self._record_profile_batch(batch, scholar_users, position, now)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO fetched_members (scholar_user, publication_id, position) "
+                    "VALUES (?, ?, ?)", memberships,
+                )
+            position += len(batch)
+
+        if position:
+            placeholders = ','.join('?' * len(scholar_users))
+            with self._conn:
+                self._conn.execute(f"DELETE FROM members WHERE scholar_user IN ({placeholders})",
+                                   list(scholar_users))
+                self._conn.execute("INSERT INTO members (scholar_user, publication_id, position) "
+                                   "SELECT scholar_user, publication_id, position FROM fetched_members")
+                for member in scholar_users:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO profile_fetches (scholar_user, fetched_at, publications) "
+                        "VALUES (?, ?, (SELECT COUNT(*) FROM fetched_members WHERE scholar_user = ?))",
+                        (member, now, member),
+                    )
+                self._conn.execute("DELETE FROM fetched_members")
+        return position
+
+    def _record_profile_batch(self, batch, scholar_users, start, now):
+        """Upsert one batch of profile rows; returns its (member, publication ID, position) rows"""
+        existing = self._rows(article_id for article_id, _ in batch)
+        memberships = []
+        for position, (article_id, pub) in enumerate(batch, start):
+            values = {field: pub.get(field) for field in PROFILE_FIELDS}
+            row = existing.get(article_id)
+
+            if row is None:
+                publication_id = self._conn.execute(
+                    f"INSERT INTO publications (scholar_id, normalized_title, first_seen, updated_at, "
+                    f"{', '.join(PROFILE_FIELDS)}) VALUES (?, ?, ?, ?{', ?' * len(PROFILE_FIELDS)})",
+                    (article_id, normalize_title(values['title']), now, now, *values.values()),
+                ).lastrowid
+                self._set_authors(publication_id, values['authors'])
+                self._set_venue(publication_id, pub)
+                self._add_history(publication_id, now, values['citations'])
+                self.stats['inserted'] += 1
+            else:
+                publication_id = row['id']
+                changed = [field for field in PROFILE_FIELDS if row[field] != values[field]]
+                if changed:
+                    assignments = [f"{field} = ?" for field in changed] + ["updated_at = ?"]
+                    params = [values[field] for field in changed] + [now]
+                    if 'title' in changed:
+                        assignments.append("normalized_title = ?")
+                        params.append(normalize_title(values['title']))
+                    if set(changed) & set(IDENTITY_FIELDS):
+                        # The stored details may belong to another paper
+                        assignments += [f"{field} = NULL" for field in DETAIL_FIELDS]
+                        assignments += ["normalized_doi = NULL", "details_fetched_at = NULL"]
+                    self._conn.execute(
+                        f"UPDATE publications SET {', '.join(assignments)} WHERE id = ?",
+                        (*params, publication_id),
+                    )
+                    if 'authors' in changed:
+                        self._set_authors(publication_id, values['authors'])
+                    if 'citations' in changed:
+                        self._add_history(publication_id, now, values['citations'])
+                    self.stats['updated'] += 1
+                else:
+                    self.stats['unchanged'] += 1
+                if row['details_fetched_at'] is None or set(changed) & set(IDENTITY_FIELDS):
+                    self._set_venue(publication_id, pub)
+
+            for member in pub.get('members') or scholar_users:
+                if member in scholar_users:
+                    memberships.append((member, publication_id, position))
+        return memberships
+
+    def _add_history(self, publication_id, fetched_at, citations):
+        """Append a citation count snapshot"""
+        if citations is None:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO citation_history (publication_id, fetched_at, citations) VALUES (?, ?, ?)",
+            (publication_id, fetched_at, citations),
+        )
+        self.stats['history'] += 1
+
+    def record_details(self, entries, fetched_at=None):
+        """Store the citation-page details of already recorded publications
+
+        entries: iterable of (article ID, publication dict), committed
+        QUERY_CHUNK at a time. Detail fields the publication no longer has
+        are cleared. Returns the number of publications updated.
+        """
+        now = fetched_at or time.time()
+        count = 0
+        for batch in chunked(entries):
+            existing = self._rows(article_id for article_id, _ in batch)
+            with self._conn:
+                for article_id, pub in batch:
+                    row = existing.get(article_id)
+                    if row is None:
+                        continue
+                    values = [pub.get(field) for field in DETAIL_FIELDS]
+                    self._conn.execute(
+                        f"UPDATE publications SET {', '.join(f'{field} = ?' for field in DETAIL_FIELDS)}, "
+                        "normalized_doi = ?, details_fetched_at = ?, updated_at = ? WHERE id = ?",
+                        (*values, normalize_doi(pub.get('doi')), now, now, row['id']),
+                    )
+                    self._set_venue(row['id'], pub)
+                    self.stats['details'] += 1
+                    count += 1
+        return count
+
+    def has_details(self, scholar_ids):
+        """The subset of article IDs whose stored details are current"""
+        found = set()
+        for chunk in chunked(scholar_ids):
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT scholar_id FROM publications WHERE scholar_id IN ({placeholders}) "
+                "AND details_fetched_at IS NOT NULL", chunk,
+            ))
+        return found
+
+    def _to_publication(self, row, members):
+        """Publication dict (as the updater builds it) for a joined publications row
+
+        details_stored_at is when the stored details were fetched; it and
+        the DETAIL_FIELDS are absent if the details are missing or stale.
+        """
+        current = row['details_fetched_at'] is not None
+        fields = PROFILE_FIELDS + DETAIL_FIELDS if current else PROFILE_FIELDS
+        pub = {field: row[field] for field in fields if row[field] is not None}
+        if current:
+            pub['details_stored_at'] = row['details_fetched_at']
+        if row['venue_name'] is not None:
+            pub['journal'] = row['venue_name']
+        if row['venue_abbreviation'] is not None:
+            pub['abbr'] = row['venue_abbreviation']
+        pub['members'] = members
+        return pub
+
+    def publications(self, scholar_users, year=None, needs_details=False):
+        """Current publications of some profiles, newest year first, then most cited
+
+        Ties keep the order of the last profile fetch. Returns a lazy view
+        (StoredPublications); with needs_details, only the publications
+        whose details are missing or stale.
+        """
+        return StoredPublications(self, scholar_users, year, needs_details)
+
+    def _publication_filter(self, scholar_users, year, needs_details):
+        """WHERE clause and parameters selecting publications() rows"""
+        placeholders = ','.join('?' * len(scholar_users))
+        params = list(scholar_users)
+        where = f"m.scholar_user IN ({placeholders})"
+        if year is not None:
+            where += " AND p.year = ?"
+            params.append(year)
+        if needs_details:
+            where += " AND p.details_fetched_at IS NULL"
+        return where, params
+
+    def _count_publications(self, scholar_users, year, needs_details):
+        """Number of publications() rows"""
+        where, params = self._publication_filter(scholar_users, year, needs_details)
+        return self._conn.execute(
+            "SELECT COUNT(DISTINCT m.publication_id) FROM members m "
+            f"JOIN publications p ON p.id = m.publication_id WHERE {where}",
+            params,
+        ).fetchone()[0]
+
+    def _iter_publications(self, scholar_users, year, needs_details):
+        """Yield publications() rows as publication dicts"""
+        where, params = self._publication_filter(scholar_users, year, needs_details)
+        rows = self._conn.execute(
+            "SELECT p.*, v.name AS venue_name, v.abbreviation AS venue_abbreviation, "
+            "MIN(m.position) AS position, GROUP_CONCAT(m.scholar_user, ' ') AS member_list "
+            "FROM members m JOIN publications p ON p.id = m.publication_id "
+            "LEFT JOIN venues v ON v.id = p.venue_id "
+            f"WHERE {where} GROUP BY p.id "
+            "ORDER BY COALESCE(p.year, 0) DESC, COALESCE(p.citations, 0) DESC, position",
+            params,
+        )
+        order = {user: index for index, user in enumerate(scholar_users)}
+        for row in rows:
+            yield self._to_publication(row, sorted(row['member_list'].split(' '), key=order.get))
+
+    def find_duplicates(self, doi=None, title=None, year=None):
+        """Article IDs of stored publications with the same DOI, or the same normalized title and year"""
+        if normalize_doi(doi):
+            rows = self._conn.execute(
+                "SELECT scholar_id FROM publications WHERE normalized_doi = ?", (normalize_doi(doi),)
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT scholar_id FROM publications WHERE normalized_title = ? AND year IS ?",
+                (normalize_title(title), year),
+            )
+        return [row[0] for row in rows]
+
+    def citation_history(self, scholar_id):
+        """(fetched_at, citations) snapshots of one publication, oldest first"""
+        return [tuple(row) for row in self._conn.execute(
+            "SELECT h.fetched_at, h.citations FROM citation_history h "
+            "JOIN publications p ON p.id = h.publication_id WHERE p.scholar_id = ? ORDER BY h.fetched_at",
+            (scholar_id,),
+        )]
+
+    def summary(self):
+        """Row counts of the main tables"""
+        count = lambda sql: self._conn.execute(sql).fetchone()[0]
+        return {
+            'publications': count("SELECT COUNT(*) FROM publications"),
+            'with_details': count("SELECT COUNT(*) FROM publications WHERE details_fetched_at IS NOT NULL"),
+            'authors': count("SELECT COUNT(*) FROM authors"),
+            'venues': count("SELECT COUNT(*) FROM venues"),
+            'citation_snapshots': count("SELECT COUNT(*) FROM citation_history"),
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Command line for the publications bibliography: fetch, render, sort, diff and stats
+
+Only `fetch` talks to Google Scholar and needs requests and beautifulsoup4;
+the other subcommands work on papers.bib and the publication store alone,
+start in tens of milliseconds and run without the scraping packages
+installed (every module is imported by the subcommand that uses it).
+
+Usage:
+    # Fetch from Google Scholar and update papers.bib (takes every
+    # update_publications.py option):
+    python _scripts/publications.py fetch --incremental --budget 10m
+
+    # Rewrite papers.bib (or per-member files, or per-year shards) from the
+    # publication store, without any requests:
+    python _scripts/publications.py render [--per-member | --shard-by-year]
+
+    # Sort papers.bib, or another file, by year and citations:
+    python _scripts/publications.py sort [path/to/file.bib]
+
+    # What changed since the previous run (papers.bib.backup -> papers.bib):
+    python _scripts/publications.py diff [OLD NEW]
+
+    # Entry counts, citations, h-index and metadata coverage:
+    python _scripts/publications.py stats [path/to/file.bib] [--json]
+
+Exit status: 0 on success; `fetch` and `render` exit with 3 when the
+bibliography did not change, `diff` with 1 when the files differ, and
+every subcommand with 1 (`diff` with 2) on an error.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+BIB_FILE_PATH = os.path.join("_bibliography", "papers.bib")
+BACKUP_FILE_PATH = BIB_FILE_PATH + ".backup"
+# Fields whose coverage `stats` reports
+COVERAGE_FIELDS = ('doi', 'abstract', 'pages', 'volume', 'pdf')
+
+
+def read_index(path):
+    """Index a .bib file, or None (with a message) if it cannot be read"""
+    from bibtex_index import BibIndex, BibSyntaxError
+
+    try:
+        return BibIndex.from_file(path)
+    except OSError as e:
+        print(f"❌ Cannot read {path}: {e.strerror}")
+    except BibSyntaxError as e:
+        print(f"❌ Cannot parse {path}: {e}")
+    return None
+
+
+def h_index(citations):
+    """Largest h such that h entries have at least h citations each"""
+    h = 0
+    for rank, count in enumerate(sorted(citations, reverse=True), 1):
+        if count < rank:
+            break
+        h = rank
+    return h
+
+
+def entry_identity(entry):
+    """Key that matches an entry across two versions of a file: Scholar ID, else citation key"""
+    return ('id', entry.scholar_id) if entry.scholar_id else ('key', entry.key)
+
+
+def changed_fields(old, new):
+    """Names of the fields that differ between two versions of an entry, in sorted order"""
+    names = set(old.fields) | set(new.fields)
+    changed = sorted(name for name in names if old.fields.get(name) != new.fields.get(name))
+    if old.key != new.key:
+        changed.insert(0, 'key')
+    return changed
+
+
+def describe_change(old, new):
+    """One line describing how an entry changed (citation counts spelled out)"""
+    parts = []
+    for name in changed_fields(old, new):
+        if name == 'note' and old.citations != new.citations:
+            parts.append(f"citations {old.citations} → {new.citations}")
+        elif name == 'key':
+            parts.append(f"key {old.key} → {new.key}")
+        else:
+            parts.append(name)
+    return ", ".join(parts) or "formatting"
+
+
+def entry_title(entry, width=70):
+    """The entry's title without BibTeX braces, shortened to width"""
+    title = entry.fields.get('title', '').replace('{', '').replace('}', '').strip()
+    return title if len(title) <= width else title[:width - 1] + "…"
+
+
+def run_fetch(args, rest):
+    """Fetch from Google Scholar (update_publications.py with the remaining options)"""
+    import update_publications
+
+    return update_publications.main(rest, prog=f"{args.prog} fetch")
+
+
+def run_render(args, rest):
+    """Write the bibliography from the publication store"""
+    import update_publications
+
+    args.scholar_ids = args.scholar_ids or update_publications.SCHOLAR_IDS
+    return update_publications.render_from_store(args)
+
+
+def run_sort(args, rest):
+    """Sort a bibliography (sort_bibtex.py with the remaining options)"""
+    import sort_bibtex
+
+    return sort_bibtex.main(rest, prog=f"{args.prog} sort")
+
+
+def run_diff(args, rest):
+    """Report the entries added, removed and modified between two .bib files"""
+    old_index = read_index(args.old)
+    new_index = read_index(args.new)
+    if old_index is None or new_index is None:
+        return 2
+
+    old_entries = {}
+    for entry in old_index:
+        old_entries.setdefault(entry_identity(entry), entry)
+    added, modified = [], []
+    for entry in new_index:
+        previous = old_entries.pop(entry_identity(entry), None)
+        if previous is None:
+            added.append(entry)
+        elif previous.text != entry.text:
+            modified.append((previous, entry))
+    removed = list(old_entries.values())
+
+    if not (added or removed or modified):
+        print(f"✅ {args.new} has the same entries as {args.old}")
+        return 0
+
+    print(f"📝 {args.old} → {args.new}: {len(added)} added, {len(removed)} removed, "
+          f"{len(modified)} modified")
+    for sign, entries in (('+', added), ('-', removed)):
+        for entry in entries[:args.limit]:
+            print(f"  {sign} {entry.key} ({entry.year or 'n.d.'}) {entry_title(entry)}")
+        if len(entries) > args.limit:
+            print(f"    ... and {len(entries) - args.limit} more")
+    for old, new in modified[:args.limit]:
+        print(f"  ~ {new.key}: {describe_change(old, new)}")
+    if len(modified) > args.limit:
+        print(f"    ... and {len(modified) - args.limit} more")
+    return 1
+
+
+def bibliography_stats(index):
+    """Counts, citation totals and field coverage of an indexed bibliography"""
+    entries = index.entries
+    citations = [entry.citations for entry in entries]
+    years = [year for year in index.years() if year]
+    return {
+        'entries': len(entries),
+        'years': {str(year): len(index.in_year(year)) for year in years},
+        'undated': len(index.in_year(0)),
+        'citations': sum(citations),
+        'h_index': h_index(citations),
+        'selected': sum(entry.fields.get('selected', '').strip().lower() == 'true' for entry in entries),
+        'coverage': {
+            name: sum(bool(entry.fields.get(name, '').strip()) for entry in entries)
+            for name in COVERAGE_FIELDS
+        },
+    }
+
+
+def store_stats():
+    """Row counts of the publication store, or None if there is none"""
+    import update_publications
+
+    path = update_publications.STORE_PATH
+    if not update_publications.STORE_ENABLED or not os.path.exists(path):
+        return None
+    store = update_publications.open_store(path)
+    if store is None:
+        return None
+    try:
+        return dict(store.summary(), path=path)
+    finally:
+        store.close()
+
+
+def run_stats(args, rest):
+    """Print statistics about a bibliography (and the publication store)"""
+    index = read_index(args.path)
+    if index is None:
+        return 1
+    stats = bibliography_stats(index)
+    store = store_stats()
+    if store is not None:
+        stats['store'] = store
+
+    if args.json:
+        json.dump(dict(stats, file=args.path), sys.stdout, indent=2)
+        print()
+        return 0
+
+    total = stats['entries']
+    years = list(stats['years'])
+    print(f"📚 {args.path}: {total} entries", end="")
+    print(f", {years[-1]}–{years[0]}" if years else "")
+    for year, count in stats['years'].items():
+        print(f"  {year}: {count}")
+    if stats['undated']:
+        print(f"  no year: {stats['undated']}")
+    print(f"📈 {stats['citations']:,} citations, h-index {stats['h_index']}, "
+          f"{stats['selected']} selected")
+    coverage = ", ".join(f"{name} {count}/{total}" for name, count in stats['coverage'].items())
+    print(f"🔎 Coverage: {coverage}")
+    if store is not None:
+        print(f"🗄️  Store {store['path']}: {store['publications']} publications "
+              f"({store['with_details']} with details), {store['citation_snapshots']} citation snapshots")
+    return 0
+
+
+def parse_args(argv=None):
+    """Parse the subcommand and its options; returns (args, options left for fetch/sort)"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.set_defaults(prog=parser.prog)
+    commands = parser.add_subparsers(dest='command', required=True, metavar='COMMAND')
+
+    # fetch and sort take the options of their scripts, which parse (and explain) them
+    fetch = commands.add_parser('fetch', add_help=False,
+                                help="fetch from Google Scholar and update papers.bib "
+                                     "(options: fetch --help)")
+    fetch.set_defaults(func=run_fetch)
+
+    render = commands.add_parser('render', help="write the bibliography from the publication store")
+    render.add_argument('--scholar-id', dest='scholar_ids', action='append', metavar='ID',
+                        help="Scholar ID to render (repeat for several; default: SCHOLAR_IDS)")
+    layout = render.add_mutually_exclusive_group()
+    layout.add_argument('--per-member', action='store_true',
+                        help="write one file per member under _bibliography/members/")
+    layout.add_argument('--shard-by-year', action='store_true',
+                        help="write one file per year plus a shard index")
+    render.add_argument('--no-backup', action='store_true',
+                        help="do not keep the previous file(s) as a backup")
+    render.set_defaults(func=run_render)
+
+    sort = commands.add_parser('sort', add_help=False,
+                               help="sort a bibliography by year and citations (options: sort --help)")
+    sort.set_defaults(func=run_sort)
+
+    diff = commands.add_parser('diff', help="list the entries that changed between two .bib files")
+    diff.add_argument('old', nargs='?', default=BACKUP_FILE_PATH,
+                      help=f"previous file (default: {BACKUP_FILE_PATH})")
+    diff.add_argument('new', nargs='?', default=BIB_FILE_PATH,
+                      help=f"current file (default: {BIB_FILE_PATH})")
+    diff.add_argument('--limit', type=int, default=20,
+                      help="entries listed per kind of change (default: 20)")
+    diff.set_defaults(func=run_diff)
+
+    stats = commands.add_parser('stats', help="entry counts, citations and metadata coverage")
+    stats.add_argument('path', nargs='?', default=BIB_FILE_PATH,
+                       help=f"bibliography (default: {BIB_FILE_PATH})")
+    stats.add_argument('--json', action='store_true', help="print the statistics as JSON")
+    stats.set_defaults(func=run_stats)
+
+    args, rest = parser.parse_known_args(argv)
+    if rest and args.command not in ('fetch', 'sort'):
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    return args, rest
+
+
+def main(argv=None):
+    """Run a subcommand; returns its exit status"""
+    args, rest = parse_args(argv)
+    return args.func(args, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
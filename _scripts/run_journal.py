@@ -0,0 +1,169 @@
+"""
+Checkpoint journal for resuming interrupted updater runs
+
+A rate-limit lockout or a CI job timeout partway through a run used to
+throw away everything fetched so far. RunJournal is an append-only JSON
+lines file that records each profile page as it is parsed and each
+publication's citation details as they are fetched. Every line is flushed
+as soon as it is written, so a killed process loses at most the line in
+flight (a torn last line is cut off when the journal is reopened).
+
+A rerun with the same Scholar IDs replays the journaled pages and details
+instead of requesting them again and continues with the first item that
+is missing, so several short scheduled runs can together enrich a whole
+profile. The run that completes deletes the journal; a journal older than
+JOURNAL_MAX_AGE, or written for other Scholar IDs, is discarded.
+
+File format (one JSON object per line):
+
+    {"type": "run", "version": 1, "key": {...}, "started": 1700000000.0}
+    {"type": "page", "scholar_id": "...", "pagesize": 100, "cstart": 0, "page": {...}}
+    {"type": "details", "id": "<article id>", "fields": {...}}
+
+Usage:
+    journal = RunJournal("journal.jsonl", key={'scholar_ids': ["ID"]})
+    pages = journal.take_pages("ID", 100)   # cstart -> parsed page, from the interrupted run
+    journal.record_page("ID", 100, 0, page)
+    fields = journal.take_details(article_id)
+    journal.record_details(article_id, fields)
+    journal.finish()                        # the run completed
+"""
+
+import json
+import os
+import threading
+import time
+
+JOURNAL_VERSION = 1
+JOURNAL_MAX_AGE = 7 * 24 * 3600  # seconds; older journals are stale and started over
+
+
+class RunJournal:
+    """Append-only record of the profile pages and details fetched by an unfinished run"""
+
+    def __init__(self, path, key, max_age=JOURNAL_MAX_AGE, resume=True):
+        """key: JSON-able description of the run (Scholar IDs) a journal must match to be resumed"""
+        self.path = path
+        self.key = key
+        self.started = None
+        # What the interrupted run journaled; each item is handed over once
+        self._pages = {}  # (scholar_id, pagesize) -> {cstart: page}
+        self._details = {}  # article ID -> detail fields
+        self._lock = threading.Lock()
+        self.stats = {'pages': 0, 'details': 0, 'resumed_pages': 0, 'resumed_details': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume and self._load(max_age):
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._pages.clear()
+            self._details.clear()
+            self.started = time.time()
+            self._file = open(path, 'w', encoding='utf-8')
+            self._append({'type': 'run', 'version': JOURNAL_VERSION, 'key': key, 'started': self.started})
+
+    def _load(self, max_age):
+        """Read an existing journal; returns True if it belongs to this run and can be resumed"""
+        try:
+            f = open(self.path, 'r+b')
+        except FileNotFoundError:
+            return False
+
+        with f:
+            header = {}
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                pass
+            if (not isinstance(header, dict) or header.get('type') != 'run'
+                    or header.get('version') != JOURNAL_VERSION or header.get('key') != self.key
+                    or time.time() - header.get('started', 0) > max_age):
+                return False
+
+            self.started = header['started']
+            end = f.tell()
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # torn by a killed process
+                end += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') == 'page':
+                    pages = self._pages.setdefault((record['scholar_id'], record['pagesize']), {})
+                    pages[record['cstart']] = record['page']
+                elif record.get('type') == 'details':
+                    self._details[record['id']] = record['fields']
+            # Cut off a torn last line so appends start on a fresh line
+            f.truncate(end)
+        return True
+
+    def _append(self, record, counter=None):
+        """Write and flush one line (and count it under stats[counter])"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self._file.flush()
+            if counter:
+                self.stats[counter] += 1
+
+    # -- profile pages --------------------------------------------------------
+
+    def take_pages(self, scholar_id, pagesize):
+        """The pages of a profile walk the interrupted run journaled (cstart -> parsed page)"""
+        return self._pages.pop((scholar_id, pagesize), {})
+
+    def record_page(self, scholar_id, pagesize, cstart, page):
+        """Journal a parsed profile page"""
+        self._append({'type': 'page', 'scholar_id': scholar_id, 'pagesize': pagesize,
+                      'cstart': cstart, 'page': page}, 'pages')
+
+    def resumed_page(self):
+        """Count a page answered from the journal"""
+        with self._lock:
+            self.stats['resumed_pages'] += 1
+
+    # -- citation details -----------------------------------------------------
+
+    def take_details(self, article_id):
+        """The detail fields the interrupted run journaled for a publication, or None"""
+        return self._details.pop(article_id, None)
+
+    def record_details(self, article_id, fields):
+        """Journal the detail fields of a publication"""
+        self._append({'type': 'details', 'id': article_id, 'fields': fields}, 'details')
+
+    def resumed_details(self):
+        """Count a publication whose details were taken from the journal"""
+        with self._lock:
+            self.stats['resumed_details'] += 1
+
+    # -- lifecycle ------------------------------------------------------------
+
+    @property
+    def resumable(self):
+        """Number of journaled pages and details not yet handed over"""
+        return sum(map(len, self._pages.values())), len(self._details)
+
+    def close(self):
+        """Close the journal, keeping it for the next run"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self):
+        """The run completed: close and delete the journal"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,173 @@
+"""
+Run metrics for the publications updater
+
+RunMetrics collects, for one run: HTTP request counts, bytes and a
+status-code histogram (via a requests response hook), retry counts, time
+spent sleeping (by reason) and wall/CPU time per pipeline stage. The result
+is written as a JSON report that a scheduler can graph. If a RunProfiler
+is attached as .profiler, every stage is profiled as well.
+
+Usage:
+    metrics = RunMetrics()
+    metrics.install(session)
+
+    @metrics.timed('parse')
+    def parse(...): ...
+
+    with metrics.stage('write'):
+        ...
+    metrics.sleep(5, 'profile_delay')
+    metrics.write_json("metrics.json")
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+REPORT_VERSION = 1
+
+
+class RunMetrics:
+    """Thread-safe counters, timers and sleep accounting for one updater run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.stages = {}
+        self.status_codes = Counter()
+        self.requests = 0
+        self.cached_responses = 0
+        self.bytes_downloaded = 0
+        self.retries = Counter()
+        self.sleeps = Counter()
+        self.counters = Counter()
+        self.info = {}
+        self.sleep_enabled = True
+        self.profiler = None  # optional run_profiler.RunProfiler
+
+    # -- stages ---------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall and CPU (thread) time of the block to a named stage"""
+        # The profiler's own bookkeeping stays outside the timed block
+        with self.profiler.stage(name) if self.profiler is not None else nullcontext():
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                yield
+            finally:
+                wall = time.perf_counter() - wall
+                cpu = time.thread_time() - cpu
+                with self._lock:
+                    stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                    stage['calls'] += 1
+                    stage['wall_seconds'] += wall
+                    stage['cpu_seconds'] += cpu
+
+    def timed(self, name):
+        """Decorator form of stage()"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # -- HTTP -----------------------------------------------------------------
+
+    def install(self, session):
+        """Count every response of a requests session"""
+        session.hooks['response'].append(self._response_hook)
+
+    def _response_hook(self, response, *args, **kwargs):
+        from_cache = getattr(response, 'from_cache', False)
+        size = 0 if from_cache else len(response.content or b'')
+        with self._lock:
+            self.status_codes[str(response.status_code)] += 1
+            if from_cache:
+                self.cached_responses += 1
+            else:
+                self.requests += 1
+                self.bytes_downloaded += size
+        return response
+
+    # -- retries, sleeps, counters --------------------------------------------
+
+    def retry(self, kind, count=1):
+        """Record retries of a given kind (e.g. 'profile', 'details')"""
+        with self._lock:
+            self.retries[kind] += count
+
+    def sleep(self, seconds, reason):
+        """time.sleep() that records the time slept under a reason
+
+        With sleep_enabled off (e.g. when replaying a cassette) nothing is
+        slept; the time is counted as skipped_sleep_seconds instead.
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            if not self.sleep_enabled:
+                self.counters['skipped_sleep_seconds'] += seconds
+                return
+            self.sleeps[reason] += seconds
+        time.sleep(seconds)
+
+    def sleeper(self, reason):
+        """A sleep(seconds) function that records under a fixed reason"""
+        return lambda seconds: self.sleep(seconds, reason)
+
+    def count(self, name, amount=1):
+        """Increment a free-form counter"""
+        with self._lock:
+            self.counters[name] += amount
+
+    # -- report ---------------------------------------------------------------
+
+    def to_dict(self):
+        """The report as a JSON-serialisable dict"""
+        with self._lock:
+            return {
+                'version': REPORT_VERSION,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'wall_seconds': round(time.perf_counter() - self._started, 3),
+                'info': dict(self.info),
+                'stages': {
+                    name: {
+                        'calls': stage['calls'],
+                        'wall_seconds': round(stage['wall_seconds'], 4),
+                        'cpu_seconds': round(stage['cpu_seconds'], 4),
+                    }
+                    for name, stage in self.stages.items()
+                },
+                'requests': {
+                    'network': self.requests,
+                    'from_cache': self.cached_responses,
+                    'bytes_downloaded': self.bytes_downloaded,
+                    'status_codes': dict(sorted(self.status_codes.items())),
+                },
+                'retries': dict(self.retries),
+                'sleep': {
+                    'total_seconds': round(sum(self.sleeps.values()), 3),
+                    'by_reason': {reason: round(seconds, 3) for reason, seconds in self.sleeps.items()},
+                },
+                'counters': dict(self.counters),
+            }
+
+    def write_json(self, path):
+        """Write the report to path (parent directories are created)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
@@ -0,0 +1,337 @@
+"""
+Optional profiling of updater and sorter runs (--profile DIR)
+
+Two modes:
+
+- sample (the default): a background thread samples the stack of every
+  thread every SAMPLE_INTERVAL seconds. Cheap enough to leave on in
+  scheduled runs.
+- full: sampling plus, for every pipeline stage on the main thread, a
+  cProfile profile and its peak and net traced memory, and a tracemalloc
+  snapshot as each top-level stage ends (stages nested in another one, such
+  as the detail fetches of a --workers 1 run, take none).
+
+Stages are the blocks the scripts already time (RunMetrics.stage in the
+updater). Work on other threads (detail fetches, profile parsing) shows
+up in the samples only. The report directory gets:
+
+    stacks.folded       sampled stacks, one "frame;frame;... count" line each
+                        (flamegraph.pl, inferno, speedscope)
+    run.pstats          full mode: every stage's profile merged (python -m pstats)
+    <stage>.pstats      full mode: one stage's profile
+    <stage>.tracemalloc full mode: snapshot at the end of a top-level stage's
+                        last call (tracemalloc.Snapshot.load)
+    summary.txt         stage times and memory, the top-N sampled hotspots,
+                        cProfile functions and live allocation sites
+
+Snapshots are written as soon as they are taken and memory peaks are reset
+afterwards, so the profiler's own bookkeeping stays out of the numbers.
+
+Both scripts take --profile DIR and --profile-mode (default: $SCHOLAR_PROFILE_DIR
+and $SCHOLAR_PROFILE_MODE, else sample).
+
+Usage:
+    profiler = RunProfiler("profile", mode='sample')
+    profiler.start()
+    with profiler.stage('write'):
+        ...
+    report_profile(profiler)
+"""
+
+import cProfile
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# pstats and tracemalloc are imported when a full-mode profile needs them,
+# so the scripts that take --profile do not pay for them on every start
+
+MODES = ('sample', 'full')
+PROFILE_DIR = os.getenv('SCHOLAR_PROFILE_DIR')
+PROFILE_MODE = os.getenv('SCHOLAR_PROFILE_MODE', 'sample')
+SAMPLE_INTERVAL = 0.01  # seconds between stack samples
+TOP_N = 15  # entries per section of summary.txt
+TRACE_FRAMES = 1  # tracemalloc frames kept per allocation
+# Leaf frames in these files are threads waiting on a lock or queue, not work
+IDLE_FILES = {'threading.py', 'queue.py'}
+
+
+def frame_label(code):
+    """Flame graph label of a code object: function (file:line)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def thread_label(name):
+    """Thread name without its pool/worker number, so samples of a pool merge"""
+    return re.sub(r'[-_]\d+$', '', name) or 'thread'
+
+
+def safe_name(stage):
+    """Stage name usable as a file name"""
+    return re.sub(r'[^\w.-]+', '_', stage)
+
+
+class RunProfiler:
+    """Stack sampler plus per-stage cProfile and tracemalloc data for one run"""
+
+    def __init__(self, directory, mode='sample', interval=SAMPLE_INTERVAL, top=TOP_N):
+        """directory: report directory (created on start); mode: 'sample' or 'full'"""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.stacks = Counter()
+        self.samples = 0
+        self.stages = {}
+        self.wall_seconds = 0.0
+        self._frames = []
+        self._root = cProfile.Profile() if mode == 'full' else None
+        self._main = threading.main_thread()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+        self._running = False
+
+    # -- lifecycle ------------------------------------------------------------
+
+    def start(self):
+        """Start sampling (and, in full mode, tracing and the run-level profile)"""
+        self._started = time.perf_counter()
+        self._running = True
+        os.makedirs(self.directory, exist_ok=True)
+        if self.mode == 'full':
+            import tracemalloc
+
+            tracemalloc.start(TRACE_FRAMES)
+            self._root.enable()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """Stop sampling and tracing"""
+        if not self._running:
+            return
+        self._running = False
+        self._stop.set()
+        self._sampler.join()
+        if self.mode == 'full':
+            import tracemalloc
+
+            self._root.disable()
+            tracemalloc.stop()
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- sampling -------------------------------------------------------------
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_label(names.get(ident, 'thread')))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def hotspots(self, limit=None):
+        """(function, samples) of the leaf frames seen most often
+
+        Idle waits and the profiler's own snapshot work are left out.
+        """
+        own = f"({os.path.basename(__file__)}:"
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            if leaf.rsplit(' (', 1)[-1].split(':')[0] in IDLE_FILES or own in stack:
+                continue
+            leaves[leaf] += count
+        return leaves.most_common(limit or self.top)
+
+    # -- stages ---------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name):
+        """Attribute the block's time, cProfile data and allocations to a named stage
+
+        Only stages on the main thread are recorded; nested stages are
+        excluded from the enclosing stage's profile.
+        """
+        if not self._running or threading.current_thread() is not self._main:
+            yield
+            return
+
+        record = self.stages.setdefault(name, {
+            'calls': 0, 'wall_seconds': 0.0, 'peak_bytes': 0, 'net_bytes': 0, 'allocations': [],
+            'profile': cProfile.Profile() if self.mode == 'full' else None,
+        })
+        frame = {'name': name, 'record': record, 'carried': 0, 'current': 0}
+        self._enter(frame)
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['calls'] += 1
+            record['wall_seconds'] += time.perf_counter() - wall
+            self._exit(frame)
+
+    def _current_profile(self):
+        """The profile collecting right now: the innermost stage's, else the run-level one"""
+        return self._frames[-1]['record']['profile'] if self._frames else self._root
+
+    def _carry_peak(self, peak):
+        """Keep the enclosing stage's peak so far before reset_peak() discards it"""
+        if self._frames:
+            outer = self._frames[-1]
+            outer['carried'] = max(outer['carried'], peak)
+
+    def _enter(self, frame):
+        if self.mode != 'full':
+            self._frames.append(frame)
+            return
+        import tracemalloc
+
+        self._current_profile().disable()
+        frame['current'], peak = tracemalloc.get_traced_memory()
+        self._carry_peak(peak)
+        tracemalloc.reset_peak()
+        self._frames.append(frame)
+        frame['record']['profile'].enable()
+
+    def _exit(self, frame):
+        self._frames.pop()
+        if self.mode != 'full':
+            return
+        import tracemalloc
+
+        record = frame['record']
+        record['profile'].disable()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, frame['carried'])
+        self._carry_peak(peak)
+        record['peak_bytes'] = max(record['peak_bytes'], peak)
+        record['net_bytes'] += current - frame['current']
+
+        # A snapshot walks every live allocation: only top-level stages take one
+        if not self._frames:
+            snapshot = tracemalloc.take_snapshot()
+            record['allocations'] = snapshot.statistics('lineno')[:self.top]
+            snapshot.dump(os.path.join(self.directory, f"{safe_name(frame['name'])}.tracemalloc"))
+            del snapshot
+        tracemalloc.reset_peak()
+        self._current_profile().enable()
+
+    # -- report ---------------------------------------------------------------
+
+    def write(self):
+        """Write the report files; returns a short summary (a few lines) for the console"""
+        with open(os.path.join(self.directory, "stacks.folded"), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        merged = None
+        if self.mode == 'full':
+            import pstats
+
+            for name, record in self.stages.items():
+                record['profile'].dump_stats(os.path.join(self.directory, f"{safe_name(name)}.pstats"))
+            merged = pstats.Stats(self._root)
+            for record in self.stages.values():
+                merged.add(record['profile'])
+            merged.dump_stats(os.path.join(self.directory, "run.pstats"))
+
+        with open(os.path.join(self.directory, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write(self.summary(merged))
+
+        lines = [f"{self.samples} samples over {self.wall_seconds:.1f}s; hottest functions:"]
+        total = sum(self.stacks.values()) or 1
+        for function, count in self.hotspots(5):
+            lines.append(f"  {count / total:6.1%}  {function}")
+        return '\n'.join(lines)
+
+    def summary(self, merged=None):
+        """Text of summary.txt"""
+        out = io.StringIO()
+        out.write(f"Profile: {self.mode} mode, {self.wall_seconds:.2f}s wall, "
+                  f"{self.samples} samples every {self.interval * 1000:g} ms\n\n")
+
+        out.write(f"Stages (main thread)\n  {'stage':<28} {'calls':>6} {'seconds':>9}")
+        if self.mode == 'full':
+            out.write(f" {'peak MiB':>9} {'net MiB':>8}")
+        out.write('\n')
+        for name, record in sorted(self.stages.items(), key=lambda item: -item[1]['wall_seconds']):
+            out.write(f"  {name:<28} {record['calls']:>6} {record['wall_seconds']:>9.3f}")
+            if self.mode == 'full':
+                out.write(f" {record['peak_bytes'] / 2**20:>9.1f} {record['net_bytes'] / 2**20:>8.1f}")
+            out.write('\n')
+
+        total = sum(self.stacks.values()) or 1
+        out.write("\nHottest functions (sampled, all threads, idle waits and profiler excluded)\n")
+        for function, count in self.hotspots():
+            out.write(f"  {count / total:6.1%} {count:>7}  {function}\n")
+
+        if merged is not None:
+            out.write(f"\nTop {self.top} functions by cumulative time (cProfile, main thread)\n")
+            merged.stream = out
+            merged.sort_stats('cumulative').print_stats(self.top)
+
+            out.write("Largest live allocation sites at the end of each top-level stage "
+                      "(tracemalloc, last call)\n")
+            for name, record in self.stages.items():
+                if not record['allocations']:
+                    continue
+                out.write(f"  {name}\n")
+                for stat in record['allocations'][:5]:
+                    out.write(f"    {stat}\n")
+        return out.getvalue()
+
+
+def add_profile_arguments(parser):
+    """Add --profile and --profile-mode to an argparse parser"""
+    parser.add_argument(
+        '--profile', metavar='DIR', default=PROFILE_DIR,
+        help="profile the run and write stacks.folded, pstats files and summary.txt to DIR",
+    )
+    parser.add_argument(
+        '--profile-mode', choices=MODES, default=PROFILE_MODE,
+        help="sample: low-overhead stack sampling only; full: also cProfile and tracemalloc "
+             f"per stage (default: {PROFILE_MODE})",
+    )
+
+
+def start_profiler(args):
+    """A started RunProfiler if --profile was given, else None"""
+    if not args.profile:
+        return None
+    profiler = RunProfiler(args.profile, mode=args.profile_mode)
+    profiler.start()
+    return profiler
+
+
+def report_profile(profiler):
+    """Stop a profiler, write its report and print the hottest functions"""
+    profiler.stop()
+    try:
+        summary = profiler.write()
+    except OSError as e:
+        print(f"⚠️  Could not write the profile to {profiler.directory}: {e}")
+        return
+    print(f"🔬 Profile ({profiler.mode}) written to {profiler.directory}: {summary}")
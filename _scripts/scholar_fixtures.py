@@ -0,0 +1,264 @@
+"""
+Synthetic Google Scholar pages for benchmarks and offline checks
+
+Generates profile tables and citation-detail pages with the markup the
+updater reads (table#gsc_a_t rows, table#gsc_oci_table, links), wrapped in
+the kind of noise a real page carries: scripts, styles, navigation links,
+HTML entities and non-ASCII names. Output is deterministic for a given seed.
+
+Usage:
+    from scholar_fixtures import profile_page, detail_page
+    html = profile_page(1000)           # 1000-row profile table (bytes)
+    html = detail_page(42)              # citation page for publication 42
+    text = bibtex_file(10000)           # papers.bib-style file (str)
+    pub = parsed_publication(42)        # the updater's dict for publication 42
+    line = snapshot_line(42)            # publication 42 as a Crossref/OpenAlex work
+"""
+
+import json
+import random
+from html import escape
+
+SCHOLAR_USER = "FIXTUREAAAAJ"
+
+WORDS = (
+    "density functional theory atoms molecules conceptual chemical reactivity "
+    "electron partitioning hirshfeld iterative quantum information basis grid "
+    "integration promolecular properties force field parameters proteins "
+    "machine learning kinetic energy fukui matrix bond polarizability"
+).split()
+
+JOURNALS = (
+    "The Journal of Chemical Physics",
+    "Journal of Chemical Theory and Computation",
+    "Physical Chemistry Chemical Physics",
+    "Journal of Computational Chemistry",
+    "Theoretical Chemistry Accounts",
+    "Proceedings of the National Academy of Sciences",
+    "International Conference on Machine Learning",
+    "Chemical Science",
+)
+
+SURNAMES = ("Heidar-Zadeh", "Ayers", "Geerlings", "De Proft", "Vöhringer-Martinez",
+            "Sánchez Díaz", "Richer", "Pujal", "van Zyl", "Castillo-Orellana", "Wang")
+INITIALS = ("F", "PW", "P", "F De", "E", "G", "M", "L", "MM", "C", "B")
+
+NOISE_HEAD = (
+    "<head><meta charset=\"utf-8\"><title>Google Scholar</title>"
+    "<style>" + ".gs_btn{display:inline-block}" * 40 + "</style>"
+    "<script>var gs_cfg = {" + ",".join(f"k{i}:{i}" for i in range(200)) + "};</script>"
+    "</head>"
+)
+NOISE_NAV = "<div id=\"gs_hdr\">" + "".join(
+    f"<a href=\"/scholar?q=topic{i}&amp;hl=en\" class=\"gs_nav\">Topic {i}</a>" for i in range(60)
+) + "</div>"
+
+
+def publication(i, seed=0):
+    """Deterministic fake publication number i: title, authors, venue, year, citations"""
+    rng = random.Random(seed * 1_000_003 + i)
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).capitalize()
+    authors = ", ".join(
+        f"{rng.choice(INITIALS)} {rng.choice(SURNAMES)}" for _ in range(rng.randint(1, 7))
+    )
+    if rng.random() < 0.2:
+        authors += ", ..."
+    journal = rng.choice(JOURNALS)
+    return {
+        'id': f"A{i:07d}_EC",
+        'title': title + (" & beyond" if i % 17 == 0 else ""),
+        'authors': authors,
+        'journal': journal,
+        'volume': str(rng.randint(1, 160)),
+        'number': str(rng.randint(1, 24)),
+        'pages': f"{rng.randint(1, 9000)}-{rng.randint(9001, 9999)}",
+        'year': None if i % 97 == 96 else 1995 + rng.randint(0, 30),
+        'citations': None if i % 5 == 4 else rng.randint(0, 900),
+        'doi': f"10.{1000 + i % 9000}/fixture.{i}",
+    }
+
+
+def parsed_publication(i, seed=0, enriched=True):
+    """Publication i as the updater holds it after parsing (and optionally enriching) it"""
+    pub = publication(i, seed)
+    data = {
+        'title': pub['title'],
+        'scholar_url': ("https://scholar.google.com/citations?view_op=view_citation&hl=en"
+                        f"&user={SCHOLAR_USER}&pagesize=100&citation_for_view={SCHOLAR_USER}:{pub['id']}"),
+        'authors_raw': pub['authors'],
+        'authors': pub['authors'],
+        'venue': f"{pub['journal']} {pub['volume']} ({pub['number']}), {pub['pages']}",
+    }
+    if pub['citations'] is not None:
+        data['citations'] = pub['citations']
+    if pub['year'] is not None:
+        data['year'] = pub['year']
+    if enriched:
+        data.update({
+            'journal': pub['journal'],
+            'volume': pub['volume'],
+            'number': pub['number'],
+            'pages': pub['pages'].replace('-', '--'),
+            'publisher': "AIP Publishing LLC",
+            'doi': pub['doi'],
+        })
+    return data
+
+
+def profile_row(pub):
+    """One <tr class="gsc_a_tr"> of the profile table"""
+    href = (f"/citations?view_op=view_citation&amp;hl=en&amp;user={SCHOLAR_USER}"
+            f"&amp;pagesize=100&amp;citation_for_view={SCHOLAR_USER}:{pub['id']}")
+    citations = "" if pub['citations'] is None else str(pub['citations'])
+    year = "" if pub['year'] is None else str(pub['year'])
+    venue = f"{pub['journal']} {pub['volume']} ({pub['number']}), {pub['pages']}"
+    return (
+        "<tr class=\"gsc_a_tr\">"
+        f"<td class=\"gsc_a_t\"><a href=\"{href}\" class=\"gsc_a_at\">{escape(pub['title'])}</a>"
+        f"<div class=\"gs_gray\">{escape(pub['authors'])}</div>"
+        f"<div class=\"gs_gray\">{escape(venue)}<span class=\"gs_oph\">, {year}</span></div></td>"
+        f"<td class=\"gsc_a_c\"><a href=\"/scholar?cites={pub['id']}\" class=\"gsc_a_ac gs_ibl\">{citations}</a></td>"
+        f"<td class=\"gsc_a_y\"><span class=\"gsc_a_h gsc_a_hc gs_ibl\">{year}</span></td>"
+        "</tr>"
+    )
+
+
+def profile_page(rows, start=0, seed=0, last_page=True):
+    """A profile page (bytes) listing publications start .. start + rows - 1"""
+    body = "".join(profile_row(publication(i, seed)) for i in range(start, start + rows))
+    disabled = " disabled" if last_page else ""
+    return (
+        "<!doctype html><html>" + NOISE_HEAD + "<body>" + NOISE_NAV +
+        "<div id=\"gsc_prf_in\">Farnaz Heidar-Zadeh</div>"
+        "<table id=\"gsc_a_t\"><thead><tr><th>Title</th><th>Cited by</th><th>Year</th></tr></thead>"
+        f"<tbody id=\"gsc_a_b\">{body}</tbody></table>"
+        f"<button type=\"button\" id=\"gsc_bpf_more\"{disabled}>Show more</button>"
+        "</body></html>"
+    ).encode('utf-8')
+
+
+def detail_page(i, seed=0):
+    """A citation-detail page (bytes) for publication i"""
+    pub = publication(i, seed)
+    rng = random.Random(seed * 7 + i)
+    abstract = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160)))
+    fields = [
+        ("Authors", pub['authors']),
+        ("Publication date", f"{pub['year'] or 2020}/{rng.randint(1, 12)}/{rng.randint(1, 28)}"),
+        ("Journal", pub['journal']),
+        ("Volume", pub['volume']),
+        ("Issue", pub['number']),
+        ("Pages", pub['pages']),
+        ("Publisher", "AIP Publishing LLC"),
+    ]
+    table = "".join(
+        f"<tr><td class=\"gsc_oci_field\">{name}</td><td class=\"gsc_oci_value\">{escape(value)}</td></tr>"
+        for name, value in fields
+    )
+    links = (
+        f"<a href=\"https://doi.org/{pub['doi']}\">[HTML]</a>"
+        + (f"<a href=\"https://arxiv.org/abs/2101.{i:05d}\">arXiv</a>" if i % 3 == 0 else "")
+        + (f"<a href=\"https://example.org/papers/{i}.pdf\">[PDF]</a>" if i % 4 == 0 else "")
+    )
+    return (
+        "<!doctype html><html>" + NOISE_HEAD + "<body>" + NOISE_NAV +
+        f"<div id=\"gsc_oci_title\">{escape(pub['title'])}</div>"
+        f"<div id=\"gsc_oci_title_gg\">{links}</div>"
+        f"<table id=\"gsc_oci_table\">{table}</table>"
+        f"<div id=\"gsc_oci_merged_snippet\"><div class=\"gsh_small\">{escape(abstract)}</div></div>"
+        "</body></html>"
+    ).encode('utf-8')
+
+
+def bibtex_entry(i, seed=0):
+    """One synthetic BibTeX entry; types, quoting and nesting vary with i"""
+    pub = publication(i, seed)
+    entry_type = ('article', 'article', 'inproceedings', 'misc', 'book', 'phdthesis')[i % 6]
+    title = pub['title'].replace(' & ', ' \\& ')
+    if i % 7 == 0:
+        title = "{DFT} " + title  # nested braces
+    lines = [
+        f"@{entry_type}{{fixture{pub['year'] or 2020}{i},",
+        "  bibtex_show={true},",
+        "",
+        f"  title={{{title}}},",
+        f"  author={{{pub['authors']}}},",
+        f"  journal = \"{pub['journal']} {{Part {i % 3}}}\"," if i % 5 == 0
+        else f"  journal={{{pub['journal']}}},",
+        f"  volume={{{pub['volume']}}},",
+        f"  pages={{{pub['pages'].replace('-', '--')}}},",
+        f"  year={{{pub['year'] or 2020}}},",
+        "",
+        f"  doi={{{pub['doi']}}},",
+    ]
+    if pub['citations']:
+        lines.append(f"  note={{Cited by {pub['citations']}}},")
+    lines.append(f"  google_scholar_id={{{pub['id']}}}")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def bibtex_file(entries, seed=0):
+    """A papers.bib-style file with front matter, comments and `entries` entries"""
+    parts = [
+        "---\n---\n\n@comment{\n  Synthetic bibliography for benchmarks {not real data}.\n}\n",
+        "@string{jcp = \"The Journal of Chemical Physics\"}\n",
+    ]
+    for i in range(entries):
+        parts.append(bibtex_entry(i, seed))
+        if i % 1000 == 999:
+            parts.append(f"@comment{{ section {i // 1000} }}")
+    return "\n\n".join(parts) + "\n"
+
+
+def abstract_words(i, seed=0):
+    """Deterministic abstract of publication i, as a list of words"""
+    rng = random.Random(seed * 7 + i)
+    return [rng.choice(WORDS) for _ in range(rng.randint(40, 160))]
+
+
+def crossref_work(i, seed=0):
+    """Publication i as a Crossref work; every 11th was online a year before its issue"""
+    pub = publication(i, seed)
+    year = pub['year'] and pub['year'] + (1 if i % 11 == 0 else 0)
+    return {
+        'DOI': pub['doi'].upper(),
+        'type': 'journal-article',
+        'title': [escape(pub['title'], quote=False)],
+        'container-title': [pub['journal']],
+        'volume': pub['volume'],
+        'issue': pub['number'],
+        'page': pub['pages'],
+        'publisher': "AIP Publishing",
+        'issued': {'date-parts': [[year, 3, 1] if year else [None]]},
+        'abstract': ("<jats:title>Abstract</jats:title><jats:p>"
+                     + " ".join(abstract_words(i, seed)) + "</jats:p>"),
+    }
+
+
+def openalex_work(i, seed=0):
+    """Publication i as an OpenAlex work"""
+    pub = publication(i, seed)
+    first_page, last_page = pub['pages'].split('-')
+    inverted = {}
+    for position, word in enumerate(abstract_words(i, seed)):
+        inverted.setdefault(word, []).append(position)
+    return {
+        'id': f"https://openalex.org/W{4000000000 + i}",
+        'doi': f"https://doi.org/{pub['doi']}",
+        'title': pub['title'],
+        'display_name': pub['title'],
+        'publication_year': pub['year'],
+        'primary_location': {
+            'source': {'display_name': pub['journal'], 'host_organization_name': "AIP Publishing"},
+        },
+        'biblio': {'volume': pub['volume'], 'issue': pub['number'],
+                   'first_page': first_page, 'last_page': last_page},
+        'abstract_inverted_index': inverted,
+    }
+
+
+def snapshot_line(i, seed=0):
+    """Publication i as one line of a snapshot: even ones from Crossref, odd ones from OpenAlex"""
+    work = crossref_work(i, seed) if i % 2 == 0 else openalex_work(i, seed)
+    return json.dumps(work, ensure_ascii=False)
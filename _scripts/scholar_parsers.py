@@ -0,0 +1,398 @@
+"""
+HTML parsing backends for Google Scholar profile and citation pages
+
+Every backend turns raw page bytes into the same plain-dict results:
+
+    parse_profile(html) -> {'author': str | None,
+                            'rows': [pub dict | None, ...] | None,
+                            'more_disabled': bool}
+    parse_details(html) -> {'abstract': str | None,
+                            'fields': [(label, value), ...],
+                            'links': [doi/arXiv/PDF href, ...]}
+
+Profile rows match parse_publication_row() in update_publications.py; detail
+fields and links are what fetch_publication_details() maps to BibTeX fields.
+
+Backends:
+    soup        BeautifulSoup + html.parser over the full page (reference)
+    strainer    BeautifulSoup + html.parser, building only the profile
+                nodes we read (detail pages are parsed like soup)
+    lxml        lxml.html tree (optional dependency)
+    selectolax  selectolax/lexbor tree (optional dependency)
+    auto        AUTO_PARSER
+
+The fast backends are only compared with soup on synthetic pages here; run
+`benchmark.py parsers --cassette DIR` on recorded Scholar pages before
+choosing one for production runs.
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import UnicodeDammit
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+    except ImportError:
+        SelectolaxHTMLParser = None
+
+# Backend behind 'auto': the reference, until lxml or selectolax has been
+# checked against recorded Scholar pages
+AUTO_PARSER = 'soup'
+
+# The only links fetch_publication_details() does anything with
+USEFUL_LINK_RE = re.compile(r'doi\.org|arxiv\.org|\.pdf\Z')
+
+
+def parse_soup_row(row):
+    """Parse a single publication row (a BeautifulSoup <tr>) from Google Scholar"""
+    pub_data = {}
+
+    # Get title and link
+    title_cell = row.find('td', class_='gsc_a_t')
+    if title_cell:
+        title_link = title_cell.find('a', class_='gsc_a_at')
+        if title_link:
+            pub_data['title'] = title_link.get_text().strip()
+            pub_data['scholar_url'] = "https://scholar.google.com" + title_link.get('href', '')
+
+        # Get authors and venue info
+        author_info = title_cell.find('div', class_='gs_gray')
+        if author_info:
+            author_text = author_info.get_text().strip()
+            pub_data['authors_raw'] = author_text
+
+            # Try to separate authors from venue
+            parts = author_text.split(' - ')
+            if len(parts) >= 2:
+                pub_data['authors'] = parts[0].strip()
+                pub_data['venue'] = parts[1].strip()
+            else:
+                pub_data['authors'] = author_text
+
+    # Get citation count
+    citation_cell = row.find('td', class_='gsc_a_c')
+    if citation_cell:
+        citation_link = citation_cell.find('a', class_='gsc_a_ac')
+        if citation_link:
+            citation_text = citation_link.get_text().strip()
+            if citation_text.isdigit():
+                pub_data['citations'] = int(citation_text)
+
+    # Get year
+    year_cell = row.find('td', class_='gsc_a_y')
+    if year_cell:
+        year_span = year_cell.find('span', class_='gsc_a_h')
+        if year_span:
+            year_text = year_span.get_text().strip()
+            if year_text.isdigit():
+                pub_data['year'] = int(year_text)
+
+    return pub_data if pub_data.get('title') else None
+
+
+def build_row(title, href, author_text, citation_text, year_text):
+    """Assemble a publication dict from the extracted text of a row, like parse_soup_row()"""
+    pub_data = {}
+
+    if title is not None:
+        pub_data['title'] = title
+        pub_data['scholar_url'] = "https://scholar.google.com" + href
+
+    if author_text is not None:
+        pub_data['authors_raw'] = author_text
+        parts = author_text.split(' - ')
+        if len(parts) >= 2:
+            pub_data['authors'] = parts[0].strip()
+            pub_data['venue'] = parts[1].strip()
+        else:
+            pub_data['authors'] = author_text
+
+    if citation_text is not None and citation_text.isdigit():
+        pub_data['citations'] = int(citation_text)
+
+    if year_text is not None and year_text.isdigit():
+        pub_data['year'] = int(year_text)
+
+    return pub_data if pub_data.get('title') else None
+
+
+def decode_html(html):
+    """Decode page bytes exactly the way BeautifulSoup does"""
+    if isinstance(html, str):
+        return html
+    return UnicodeDammit(html, is_html=True).unicode_markup
+
+
+class SoupParser:
+    """Reference backend: full BeautifulSoup tree with html.parser"""
+
+    name = 'soup'
+
+    def _profile_soup(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def _details_soups(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        return soup, soup
+
+    def parse_profile(self, html):
+        soup = self._profile_soup(html)
+
+        name_element = soup.find('div', {'id': 'gsc_prf_in'})
+        pub_table = soup.find('table', {'id': 'gsc_a_t'})
+        more_button = soup.find('button', {'id': 'gsc_bpf_more'})
+
+        rows = None
+        if pub_table:
+            rows = [parse_soup_row(row) for row in pub_table.find_all('tr', class_='gsc_a_tr')]
+
+        return {
+            'author': name_element.get_text().strip() if name_element else None,
+            'rows': rows,
+            'more_disabled': bool(more_button and more_button.has_attr('disabled')),
+        }
+
+    def parse_details(self, html):
+        soup, link_soup = self._details_soups(html)
+
+        abstract_div = soup.find('div', {'id': 'gsc_oci_merged_snippet'})
+
+        fields = []
+        citation_table = soup.find('table', {'id': 'gsc_oci_table'})
+        if citation_table:
+            for row in citation_table.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) >= 2:
+                    fields.append((cells[0].get_text().strip().lower(), cells[1].get_text().strip()))
+
+        return {
+            'abstract': abstract_div.get_text().strip() if abstract_div else None,
+            'fields': fields,
+            'links': [
+                link.get('href', '') for link in link_soup.find_all('a', href=True)
+                if USEFUL_LINK_RE.search(link.get('href', ''))
+            ],
+        }
+
+
+class StrainerParser(SoupParser):
+    """BeautifulSoup with a SoupStrainer on profile pages, so only the nodes we read are built
+
+    Detail pages are small and need two strained trees (fields, links),
+    which costs more than one full tree, so they are parsed like soup.
+    """
+
+    name = 'strainer'
+
+    PROFILE_STRAINER = SoupStrainer(
+        ['div', 'table', 'button'], attrs={'id': ['gsc_prf_in', 'gsc_a_t', 'gsc_bpf_more']}
+    )
+
+    def _profile_soup(self, html):
+        return BeautifulSoup(html, 'html.parser', parse_only=self.PROFILE_STRAINER)
+
+
+def _has_class(element, class_name):
+    """Check whether an lxml element carries a CSS class"""
+    return class_name in (element.get('class') or '').split()
+
+
+def _lxml_find(element, tag, class_name):
+    """First descendant with the given tag and class, like BeautifulSoup's find()"""
+    for child in element.iterdescendants(tag):
+        if _has_class(child, class_name):
+            return child
+    return None
+
+
+class LxmlParser:
+    """lxml.html tree walked with ElementTree iteration"""
+
+    name = 'lxml'
+
+    def _document(self, html):
+        return lxml.html.document_fromstring(decode_html(html))
+
+    def _by_id(self, document, tag, element_id):
+        for element in document.iter(tag):
+            if element.get('id') == element_id:
+                return element
+        return None
+
+    def _parse_row(self, row):
+        title = href = author_text = citation_text = year_text = None
+
+        title_cell = _lxml_find(row, 'td', 'gsc_a_t')
+        if title_cell is not None:
+            title_link = _lxml_find(title_cell, 'a', 'gsc_a_at')
+            if title_link is not None:
+                title = title_link.text_content().strip()
+                href = title_link.get('href', '')
+            author_info = _lxml_find(title_cell, 'div', 'gs_gray')
+            if author_info is not None:
+                author_text = author_info.text_content().strip()
+
+        citation_cell = _lxml_find(row, 'td', 'gsc_a_c')
+        if citation_cell is not None:
+            citation_link = _lxml_find(citation_cell, 'a', 'gsc_a_ac')
+            if citation_link is not None:
+                citation_text = citation_link.text_content().strip()
+
+        year_cell = _lxml_find(row, 'td', 'gsc_a_y')
+        if year_cell is not None:
+            year_span = _lxml_find(year_cell, 'span', 'gsc_a_h')
+            if year_span is not None:
+                year_text = year_span.text_content().strip()
+
+        return build_row(title, href, author_text, citation_text, year_text)
+
+    def parse_profile(self, html):
+        document = self._document(html)
+
+        name_element = self._by_id(document, 'div', 'gsc_prf_in')
+        pub_table = self._by_id(document, 'table', 'gsc_a_t')
+        more_button = self._by_id(document, 'button', 'gsc_bpf_more')
+
+        rows = None
+        if pub_table is not None:
+            rows = [
+                self._parse_row(row) for row in pub_table.iterdescendants('tr')
+                if _has_class(row, 'gsc_a_tr')
+            ]
+
+        return {
+            'author': name_element.text_content().strip() if name_element is not None else None,
+            'rows': rows,
+            'more_disabled': more_button is not None and 'disabled' in more_button.attrib,
+        }
+
+    def parse_details(self, html):
+        document = self._document(html)
+
+        abstract_div = self._by_id(document, 'div', 'gsc_oci_merged_snippet')
+
+        fields = []
+        citation_table = self._by_id(document, 'table', 'gsc_oci_table')
+        if citation_table is not None:
+            for row in citation_table.iterdescendants('tr'):
+                cells = list(row.iterdescendants('td'))
+                if len(cells) >= 2:
+                    fields.append((cells[0].text_content().strip().lower(), cells[1].text_content().strip()))
+
+        return {
+            'abstract': abstract_div.text_content().strip() if abstract_div is not None else None,
+            'fields': fields,
+            'links': [
+                link.get('href') for link in document.iter('a')
+                if link.get('href') is not None and USEFUL_LINK_RE.search(link.get('href'))
+            ],
+        }
+
+
+class SelectolaxParser:
+    """selectolax (lexbor) tree queried with CSS selectors"""
+
+    name = 'selectolax'
+
+    def _text(self, node):
+        return node.text(deep=True).strip()
+
+    def _parse_row(self, row):
+        title = href = author_text = citation_text = year_text = None
+
+        title_cell = row.css_first('td.gsc_a_t')
+        if title_cell is not None:
+            title_link = title_cell.css_first('a.gsc_a_at')
+            if title_link is not None:
+                title = self._text(title_link)
+                href = title_link.attributes.get('href') or ''
+            author_info = title_cell.css_first('div.gs_gray')
+            if author_info is not None:
+                author_text = self._text(author_info)
+
+        citation_link = row.css_first('td.gsc_a_c a.gsc_a_ac')
+        if citation_link is not None:
+            citation_text = self._text(citation_link)
+
+        year_span = row.css_first('td.gsc_a_y span.gsc_a_h')
+        if year_span is not None:
+            year_text = self._text(year_span)
+
+        return build_row(title, href, author_text, citation_text, year_text)
+
+    def parse_profile(self, html):
+        tree = SelectolaxHTMLParser(decode_html(html))
+
+        name_element = tree.css_first('div#gsc_prf_in')
+        pub_table = tree.css_first('table#gsc_a_t')
+        more_button = tree.css_first('button#gsc_bpf_more')
+
+        rows = None
+        if pub_table is not None:
+            rows = [self._parse_row(row) for row in pub_table.css('tr.gsc_a_tr')]
+
+        return {
+            'author': self._text(name_element) if name_element is not None else None,
+            'rows': rows,
+            'more_disabled': more_button is not None and 'disabled' in more_button.attributes,
+        }
+
+    def parse_details(self, html):
+        tree = SelectolaxHTMLParser(decode_html(html))
+
+        abstract_div = tree.css_first('div#gsc_oci_merged_snippet')
+
+        fields = []
+        citation_table = tree.css_first('table#gsc_oci_table')
+        if citation_table is not None:
+            for row in citation_table.css('tr'):
+                cells = row.css('td')
+                if len(cells) >= 2:
+                    fields.append((self._text(cells[0]).lower(), self._text(cells[1])))
+
+        return {
+            'abstract': self._text(abstract_div) if abstract_div is not None else None,
+            'fields': fields,
+            'links': [
+                link.attributes.get('href') for link in tree.css('a[href]')
+                if link.attributes.get('href') and USEFUL_LINK_RE.search(link.attributes.get('href'))
+            ],
+        }
+
+
+PARSERS = {
+    'soup': SoupParser,
+    'strainer': StrainerParser,
+    'lxml': LxmlParser,
+    'selectolax': SelectolaxParser,
+}
+
+
+def available_parsers():
+    """Names of the backends that can run with the installed packages, slowest first"""
+    names = ['soup', 'strainer']
+    if lxml is not None:
+        names.append('lxml')
+    if SelectolaxHTMLParser is not None:
+        names.append('selectolax')
+    return names
+
+
+def get_parser(name='auto'):
+    """Return a parser backend instance by name ('auto' is AUTO_PARSER)"""
+    if name == 'auto':
+        name = AUTO_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser backend '{name}' (choose from {', '.join(PARSERS)})")
+    if name not in available_parsers():
+        raise ValueError(f"Parser backend '{name}' is not installed")
+    return PARSERS[name]()
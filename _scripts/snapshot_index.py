@@ -0,0 +1,381 @@
+"""
+Offline citation details from a local Crossref or OpenAlex snapshot
+
+Crossref and OpenAlex publish their catalogues as JSON-lines dumps (one
+work per line, optionally gzipped). Given such a snapshot, or an extract
+of it, the updater fills journal, volume, number, pages, publisher, DOI
+and abstract for the whole bibliography in one lookup pass, instead of
+fetching a Scholar citation page per publication.
+
+The snapshot is read once into a compact index file:
+
+    header   magic, the snapshot's size and mtime, record and key counts
+    records  the fields above for every work, one JSON line each
+    keys     (key hash, record offset) pairs sorted by hash, 16 bytes each
+
+Every work is keyed by its DOI and by its normalized title plus year (as in
+dedup.py). The index is memory-mapped: a batch of publications is looked up
+by sorting their key hashes and walking the key table once, with binary
+searches that only move forward, then reading just the matching records.
+A publication is matched by DOI first, then by title and year, then by
+title and a neighbouring year (online-first vs. issue year). Hash
+collisions are ruled out against the record's own keys, and of several
+works with the same key the one listed first in the snapshot wins.
+
+The index is rebuilt whenever the snapshot's size or mtime changes.
+
+Usage:
+    index, built = open_snapshot_index("crossref-works.jsonl.gz", ".scholar_cache/snapshots")
+    with index:
+        for pub, record, matched_by in index.match(publications):
+            ...
+"""
+
+import gzip
+import hashlib
+import html
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from operator import itemgetter
+
+from dedup import normalize_doi, normalize_title
+from pipeline import external_sort
+
+MAGIC = b'SCHSNAP1'
+# magic, snapshot size, snapshot mtime (ns), records, keys, offset of the key table
+HEADER = struct.Struct('<8sQqQQQ')
+KEY = struct.Struct('<QQ')  # key hash, record offset
+KEY_SORT_CHUNK = 200000  # keys sorted in memory before a run is spilled to disk
+LOOKUP_BATCH = 1000  # publications looked up per pass over the key table
+MIN_TITLE_WORDS = 3  # shorter titles ("Editorial", "Erratum") are matched by DOI only
+YEAR_TOLERANCE = 1  # years a title match may be off by, exact year first
+
+# JATS/HTML markup in Crossref titles and abstracts
+BLOCK_TAG_RE = re.compile(r'</?(?:jats:)?(?:p|sec|list|list-item)\b[^>]*>')
+TITLE_ELEMENT_RE = re.compile(r'<(jats:)?title\b[^>]*>.*?</(?:jats:)?title>', re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def clean_text(text, block_tags=False):
+    """Plain text of a snapshot string: markup and entities removed, whitespace collapsed"""
+    if not isinstance(text, str):
+        return ''
+    if block_tags:
+        text = BLOCK_TAG_RE.sub(' ', text)
+    return ' '.join(html.unescape(TAG_RE.sub('', text)).split())
+
+
+def first(value):
+    """First item of a Crossref list field (or the value itself)"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def crossref_year(work):
+    """Publication year of a Crossref work (issued, else print or online date)"""
+    for field in ('issued', 'published-print', 'published-online', 'published'):
+        parts = first((work.get(field) or {}).get('date-parts'))
+        if parts and parts[0]:
+            return int(parts[0])
+    return None
+
+
+def crossref_record(work):
+    """Record fields of a Crossref work"""
+    abstract = work.get('abstract')
+    if isinstance(abstract, str):
+        abstract = TITLE_ELEMENT_RE.sub(' ', abstract)
+    return {
+        'title': clean_text(first(work.get('title'))),
+        'year': crossref_year(work),
+        'doi': normalize_doi(work.get('DOI')),
+        'journal': clean_text(first(work.get('container-title'))),
+        'volume': work.get('volume'),
+        'number': work.get('issue'),
+        'pages': work.get('page'),
+        'publisher': clean_text(work.get('publisher')),
+        'abstract': clean_text(abstract, block_tags=True),
+    }
+
+
+def inverted_abstract(index):
+    """Abstract text from an OpenAlex abstract_inverted_index (word -> positions)"""
+    if not index:
+        return ''
+    words = {}
+    for word, positions in index.items():
+        for position in positions:
+            words[position] = word
+    return ' '.join(words[position] for position in sorted(words))
+
+
+def openalex_record(work):
+    """Record fields of an OpenAlex work"""
+    source = (work.get('primary_location') or {}).get('source') or work.get('host_venue') or {}
+    biblio = work.get('biblio') or {}
+    pages = biblio.get('first_page')
+    if pages and biblio.get('last_page') and biblio['last_page'] != pages:
+        pages = f"{pages}-{biblio['last_page']}"
+    return {
+        'title': clean_text(work.get('title') or work.get('display_name')),
+        'year': work.get('publication_year'),
+        'doi': normalize_doi(work.get('doi')),
+        'journal': clean_text(source.get('display_name')),
+        'volume': biblio.get('volume'),
+        'number': biblio.get('issue'),
+        'pages': pages,
+        'publisher': clean_text(source.get('host_organization_name') or source.get('publisher')),
+        'abstract': inverted_abstract(work.get('abstract_inverted_index')),
+    }
+
+
+def snapshot_record(work):
+    """Compact record of a Crossref or OpenAlex work, or None if it is neither"""
+    if 'DOI' in work or 'container-title' in work:
+        record = crossref_record(work)
+    elif str(work.get('id', '')).startswith('https://openalex.org/') or 'publication_year' in work:
+        record = openalex_record(work)
+    else:
+        return None
+    try:
+        year = int(record.pop('year') or 0)
+    except (TypeError, ValueError):
+        year = 0
+    compact = {field: str(value) for field, value in record.items() if value}
+    if year:
+        compact['year'] = year
+    return compact
+
+
+def iter_works(path, stats):
+    """Yield the works of a JSON-lines snapshot (plain or .gz); unreadable lines count as skipped
+
+    A line may also hold a Crossref API response ({"message": ...}) or a
+    page of works ({"items": [...]}).
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                work = json.loads(line)
+            except ValueError:
+                stats['skipped'] += 1
+                continue
+            if not isinstance(work, dict):
+                stats['skipped'] += 1
+                continue
+            work = work.get('message', work) if isinstance(work.get('message'), dict) else work
+            for item in work['items'] if isinstance(work.get('items'), list) else [work]:
+                if isinstance(item, dict):
+                    yield item
+                else:
+                    stats['skipped'] += 1
+
+
+def record_keys(record):
+    """Index keys of a record: its DOI and its normalized title with year"""
+    keys = []
+    if record.get('doi'):
+        keys.append(f"doi:{record['doi']}")
+    title = normalize_title(record.get('title'))
+    if record.get('year') and len(title.split()) >= MIN_TITLE_WORDS:
+        keys.append(f"title:{record['year']}:{title}")
+    return keys
+
+
+def lookup_keys(pub):
+    """(key, matched_by) pairs to try for a publication, best first"""
+    keys = []
+    doi = normalize_doi(pub.get('doi'))
+    if doi:
+        keys.append((f"doi:{doi}", 'doi'))
+    title = normalize_title(pub.get('title'))
+    try:
+        year = int(pub.get('year'))
+    except (TypeError, ValueError):
+        year = None
+    if year and len(title.split()) >= MIN_TITLE_WORDS:
+        for offset in sorted(range(-YEAR_TOLERANCE, YEAR_TOLERANCE + 1), key=abs):
+            keys.append((f"title:{year + offset}:{title}", 'title'))
+    return keys
+
+
+def key_hash(key):
+    """64-bit hash of an index key"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def index_path_for(snapshot_path, directory):
+    """Index file of a snapshot inside directory"""
+    return os.path.join(directory, f"{os.path.basename(snapshot_path)}.idx")
+
+
+def build_index(snapshot_path, index_path):
+    """Index a snapshot into index_path (replaced atomically); returns works/records/keys/skipped counts"""
+    stat = os.stat(snapshot_path)
+    directory = os.path.dirname(index_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    stats = {'works': 0, 'records': 0, 'keys': 0, 'skipped': 0}
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(bytes(HEADER.size))
+
+            def keyed_records():
+                for work in iter_works(snapshot_path, stats):
+                    stats['works'] += 1
+                    record = snapshot_record(work)
+                    keys = record_keys(record) if record is not None else []
+                    if not keys:
+                        stats['skipped'] += 1
+                        continue
+                    offset = out.tell()
+                    out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                    out.write(b'\n')
+                    stats['records'] += 1
+                    for key in keys:
+                        yield [key_hash(key), offset]
+
+            # Stable: entries with the same hash stay in snapshot order
+            with external_sort(keyed_records(), key=itemgetter(0), chunk_size=KEY_SORT_CHUNK,
+                               directory=directory) as keys:
+                keys_offset = out.tell()
+                for entry in keys:
+                    out.write(KEY.pack(*entry))
+                stats['keys'] = len(keys)
+
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns,
+                                  stats['records'], stats['keys'], keys_offset))
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return stats
+
+
+class SnapshotIndex:
+    """Memory-mapped index file written by build_index()"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = {'doi': 0, 'title': 0, 'unmatched': 0}
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, self.source_size, self.source_mtime_ns,
+             self.records, self.keys, self._keys_offset) = HEADER.unpack_from(self._map)
+        except (OSError, ValueError, struct.error):
+            self._file.close()
+            raise ValueError(f"{path} is not a snapshot index")
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot index")
+
+    def __len__(self):
+        return self.records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap and close the index file"""
+        self._map.close()
+        self._file.close()
+
+    def is_current(self, snapshot_path):
+        """Check whether the index was built from the snapshot as it is now"""
+        stat = os.stat(snapshot_path)
+        return (stat.st_size, stat.st_mtime_ns) == (self.source_size, self.source_mtime_ns)
+
+    def _entry(self, position):
+        return KEY.unpack_from(self._map, self._keys_offset + position * KEY.size)
+
+    def _offsets(self, hashes):
+        """Map of key hash -> record offsets (snapshot order), in one forward pass over the key table"""
+        found = {}
+        low = 0
+        for wanted in sorted(hashes):
+            high = self.keys
+            while low < high:
+                middle = (low + high) // 2
+                if self._entry(middle)[0] < wanted:
+                    low = middle + 1
+                else:
+                    high = middle
+            position = low
+            while position < self.keys:
+                hashed, offset = self._entry(position)
+                if hashed != wanted:
+                    break
+                found.setdefault(wanted, []).append(offset)
+                position += 1
+        return found
+
+    def _record(self, offset):
+        end = self._map.find(b'\n', offset)
+        return json.loads(self._map[offset:end])
+
+    def match(self, publications, batch_size=LOOKUP_BATCH):
+        """Yield (pub, record, matched_by) for every publication, in order
+
+        record is None if the snapshot has no match, else matched_by is
+        'doi' or 'title'. Publications are read batch_size at a time.
+        """
+        iterator = iter(publications)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                return
+            wanted = [[(key, key_hash(key), matched_by) for key, matched_by in lookup_keys(pub)]
+                      for pub in batch]
+            found = self._offsets({hashed for keys in wanted for _, hashed, _ in keys})
+            records = {}
+            for pub, keys in zip(batch, wanted):
+                record, matched_by = self._best(keys, found, records)
+                self.stats[matched_by or 'unmatched'] += 1
+                yield pub, record, matched_by
+
+    def _best(self, keys, found, records):
+        """The first record (and how it matched) whose own keys include one of keys, tried in order"""
+        for key, hashed, matched_by in keys:
+            for offset in found.get(hashed, ()):
+                if offset not in records:
+                    records[offset] = self._record(offset)
+                if key in record_keys(records[offset]):
+                    return records[offset], matched_by
+        return None, None
+
+
+def open_snapshot_index(snapshot_path, directory):
+    """Open a snapshot's index in directory, building it first if it is missing or stale
+
+    Returns (index, stats): stats are build_index()'s, or None if the
+    existing index was current.
+    """
+    path = index_path_for(snapshot_path, directory)
+    if os.path.exists(path):
+        try:
+            index = SnapshotIndex(path)
+        except ValueError:
+            index = None
+        if index is not None:
+            if index.is_current(snapshot_path):
+                return index, None
+            index.close()
+    stats = build_index(snapshot_path, path)
+    return SnapshotIndex(path), stats
@@ -1,81 +1,137 @@
 #!/usr/bin/env python3
 """
 Sort BibTeX entries by year (newest first) and citation count (highest first)
+
+With per-year shards (papers.shards.json next to the shards), each shard is
+sorted on its own and only shards whose order changed are rewritten.
+
+The file to sort is _bibliography/papers.bib unless a path is given:
+
+    python _scripts/sort_bibtex.py [path/to/papers.bib]
+
+--profile DIR profiles the run (see run_profiler.py); the read, parse, sort
+and write steps of every file are its stages.
 """
 
-import re
+import argparse
 import os
+from contextlib import nullcontext
+
+from bib_shards import load_shard_index, shard_paths
+from bib_writer import atomic_write
+from bibtex_index import BibIndex
+from run_profiler import add_profile_arguments, report_profile, start_profiler
+
+BIB_FILE_PATH = "_bibliography/papers.bib"  # sorted when no path is given
+PROFILER = None  # RunProfiler of this run, set by --profile
+
+def stage(name):
+    """Profile a block as a named stage when --profile is given"""
+    return PROFILER.stage(name) if PROFILER is not None else nullcontext()
 
 def parse_bibtex_entries(content):
-    """Parse BibTeX content and extract entries with their metadata"""
-    entries = []
-    
-    # Split content into header and entries
-    lines = content.split('\n')
-    header_lines = []
-    entry_lines = []
-    in_header = True
-    
-    for line in lines:
-        if line.strip().startswith('@') and not line.strip().startswith('@comment'):
-            in_header = False
-        
-        if in_header:
-            header_lines.append(line)
-        else:
-            entry_lines.append(line)
-    
-    # Join entry lines and split by @article or @inproceedings
-    entry_content = '\n'.join(entry_lines)
-    entry_blocks = re.split(r'\n(?=@(?:article|inproceedings))', entry_content)
-    
-    for block in entry_blocks:
-        if not block.strip():
-            continue
-            
-        # Extract year and citation count
-        year_match = re.search(r'year=\{(\d+)\}', block)
-        citation_match = re.search(r'note=\{Cited by (\d+)\}', block)
-        
-        year = int(year_match.group(1)) if year_match else 0
-        citations = int(citation_match.group(1)) if citation_match else 0
-        
-        entries.append({
-            'content': block.strip(),
-            'year': year,
-            'citations': citations
-        })
-    
-    return '\n'.join(header_lines), entries
+    """Parse BibTeX content and extract entries with their metadata
+
+    Every entry type is recognised (@article, @misc, @book, @phdthesis, ...);
+    @comment/@string/@preamble blocks stay with the header.
+    """
+    index = BibIndex(content)
+
+    header = index.header
+    # Special blocks between entries (e.g. a late @string) move to the header
+    for block in index.blocks:
+        if block.is_special and index.entries and block.start > index.entries[0].start:
+            header = header.rstrip() + '\n\n' + block.text + '\n'
+
+    entries = [
+        {
+            'content': entry.text,
+            'key': entry.key,
+            'year': entry.year,
+            'citations': entry.citations,
+        }
+        for entry in index.entries
+    ]
+
+    return header.rstrip('\n'), entries
 
 def sort_bibtex_file(file_path):
-    """Sort BibTeX file by year (newest first) and citations (highest first)"""
+    """Sort BibTeX file by year (newest first) and citations (highest first)
+
+    Returns True if the file was rewritten (an already sorted file is left untouched).
+    """
     
     # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    with stage('read'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
     
     # Parse entries
-    header, entries = parse_bibtex_entries(content)
+    with stage('parse_bibtex_entries'):
+        header, entries = parse_bibtex_entries(content)
     
     # Sort entries by year (descending) then by citations (descending)
-    entries.sort(key=lambda x: (x['year'], x['citations']), reverse=True)
+    with stage('sort'):
+        entries.sort(key=lambda x: (x['year'], x['citations']), reverse=True)
     
-    # Reconstruct the file
-    sorted_content = header + '\n\n' + '\n\n'.join(entry['content'] for entry in entries) + '\n'
+        # Reconstruct the file
+        sorted_content = header + '\n\n\n' + '\n\n'.join(entry['content'] for entry in entries) + '\n'
     
-    # Write back to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(sorted_content)
+    if sorted_content == content:
+        print(f"✓ {file_path} already sorted ({len(entries)} publications)")
+        return False
+
+    # Write back to file (a temporary file renamed over it, so an interrupted
+    # sort never leaves a truncated bibliography)
+    with stage('write'):
+        atomic_write(file_path, [sorted_content])
     
     print(f"✅ Sorted {len(entries)} publications by year (newest first)")
-    print(f"📅 Year range: {entries[0]['year']} - {entries[-1]['year']}")
+    if entries:
+        print(f"📅 Year range: {entries[0]['year']} - {entries[-1]['year']}")
+    return True
+
+def sort_bibtex_shards(directory):
+    """Sort every per-year shard listed in a directory's shard index; returns the number rewritten"""
+    rewritten = 0
+    for path in shard_paths(directory):
+        if os.path.exists(path):
+            rewritten += sort_bibtex_file(path)
+    print(f"✅ {rewritten} shard(s) re-sorted")
+    return rewritten
+
+def parse_args(argv=None, prog=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        'path', nargs='?', default=BIB_FILE_PATH,
+        help=f"BibTeX file to sort; its directory's shards if it has a shard index (default: {BIB_FILE_PATH})",
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None, prog=None):
+    """Sort papers.bib (or its shards); returns the exit code"""
+    global PROFILER
+    args = parse_args(argv, prog=prog)
+    bibtex_file = args.path
+
+    PROFILER = start_profiler(args)
+    try:
+        directory = os.path.dirname(bibtex_file) or '.'
+        if load_shard_index(directory) is not None:
+            sort_bibtex_shards(directory)
+            return 0
+
+        if not os.path.exists(bibtex_file):
+            print(f"❌ File not found: {bibtex_file}")
+            return 1
+
+        sort_bibtex_file(bibtex_file)
+        return 0
+    finally:
+        if PROFILER is not None:
+            report_profile(PROFILER)
 
 if __name__ == "__main__":
-    bibtex_file = "_bibliography/papers.bib"
-    
-    if not os.path.exists(bibtex_file):
-        print(f"❌ File not found: {bibtex_file}")
-        exit(1)
-    
-    sort_bibtex_file(bibtex_file)
+    exit(main())
@@ -8,6 +8,40 @@ and updates the papers.bib file for the Jekyll website.
 Usage:
     python update_publications.py
 
+    # Fetch citation details for every publication (rate-limited, concurrent):
+    python update_publications.py --details --rate 0.5 --workers 4
+
+    # Only fetch details for publications that are new or changed:
+    python update_publications.py --incremental
+
+    # Fetch several group members at once (merged papers.bib, or one file each):
+    python update_publications.py --scholar-id ID1 --scholar-id ID2 [--per-member]
+
+    # Fill citation details from a local Crossref/OpenAlex snapshot (no per-paper requests),
+    # and fetch Scholar pages only for the publications it does not have:
+    python update_publications.py --snapshot crossref-works.jsonl.gz --incremental
+
+    # Only refresh citation counts (and selected flags) in the existing file:
+    python update_publications.py --citations-only
+
+    # Find out where a slow run spends its time (see summary.txt):
+    python update_publications.py --details --profile .scholar_cache/profile
+
+    # Fit a scheduled job: stop fetching details after 10 minutes, most valuable first:
+    python update_publications.py --incremental --budget 10m
+
+    # An interrupted run (timeout, rate-limit lockout) is resumed by the next one;
+    # to discard its progress and start over:
+    python update_publications.py --incremental --restart
+
+    # Record a run, then re-run it offline with no sleeps:
+    python update_publications.py --details --record cassettes/run
+    python update_publications.py --details --replay cassettes/run
+
+    # Rewrite papers.bib from the publication store alone, without network
+    # access or requests/bs4 (see publications.py for the other subcommands):
+    python publications.py render
+
     # To disable automatic updates (useful for local development):
     DISABLE_AUTO_UPDATE=true python update_publications.py
 
@@ -18,40 +52,159 @@ Environment Variables:
     DISABLE_AUTO_UPDATE: Set to 'true' to disable automatic updates
                         (ignored in GitHub Actions - updates always run)
     GITHUB_ACTIONS: Automatically set by GitHub Actions workflow
+    SCHOLAR_IDS: Comma-separated Scholar IDs to fetch (default: SCHOLAR_ID)
+    SCHOLAR_PARSER: HTML parser backend (auto, soup, strainer, lxml, selectolax)
+    SCHOLAR_CACHE: Set to 'off' to bypass the on-disk response cache
+    SCHOLAR_CACHE_DIR: Directory of the response cache (default: .scholar_cache)
+    SCHOLAR_LTWA_FILE: Full LTWA CSV for journal abbreviations (default: data/ltwa.csv;
+                       the bundled data/ltwa-subset.csv is used if it is missing)
+    SCHOLAR_SNAPSHOT: Crossref/OpenAlex JSON-lines snapshot for citation details (like --snapshot)
+    SCHOLAR_JOURNAL: Set to 'off' to neither write nor resume from the checkpoint journal
+    SCHOLAR_BUDGET: Wall-clock budget for detail fetching, e.g. 10m (like --budget)
+    SCHOLAR_METRICS_JSON: Write a JSON metrics report to this path (like --metrics-json)
+    SCHOLAR_PROFILE_DIR: Profile the run into this directory (like --profile)
+    SCHOLAR_PROFILE_MODE: Profile mode, sample or full (like --profile-mode)
 
 Requirements:
     pip install requests beautifulsoup4
 
+    # Optional, for faster HTML parsing (--parser lxml or selectolax):
+    pip install lxml selectolax
+
 Author: Heidar-Zadeh Group Website Automation
 """
 
+import argparse
+import hashlib
 import os
 import sys
 import json
 import time
 import re
+import sqlite3
 from datetime import datetime
+from operator import itemgetter
 from urllib.parse import quote, unquote
 
-try:
-    import requests
-    from bs4 import BeautifulSoup
-    import json
-except ImportError:
-    print("Required packages not installed. Please run:")
-    print("pip install requests beautifulsoup4")
-    sys.exit(1)
+# requests, bs4, the modules built on them (http_cache, fetch_engine,
+# scholar_parsers, cassette), the thread pools and the fetch-only modules
+# (run_profiler, run_journal, snapshot_index, ltwa) are imported by the
+# functions that use them, so rendering from the publication store works
+# without them and starts quickly
+from bib_writer import atomic_write
+from bib_manifest import (add_entry_hash, content_hash, diff_entry_hashes, manifest_path_for,
+                          previous_entry_hashes, write_manifest)
+from bib_patch import patch_citations
+from citations_data import build_citations_data, load_citations_data, write_citations_data
+from bib_shards import (index_path_for, iter_year_groups, load_shard_index, remove_stale_shards,
+                        shard_path, shard_paths, shard_summary, write_shard_index)
+from bibtex_index import BibIndex
+from run_metrics import RunMetrics
+from dedup import MergedVersions, merge_duplicates, plan_versions
+from pub_store import PublicationStore
+from pipeline import buffered, external_sort
 
 # Configuration
 SCHOLAR_ID = "JlIWcccAAAAJ"  # Prof. Farnaz Heidar-Zadeh's Google Scholar ID
+# Group members to fetch together (comma-separated Scholar IDs); defaults to SCHOLAR_ID
+SCHOLAR_IDS = [sid.strip() for sid in os.getenv('SCHOLAR_IDS', '').split(',') if sid.strip()] or [SCHOLAR_ID]
+PROFILE_WORKERS = 3  # profiles fetched concurrently in group mode
 BIBLIOGRAPHY_DIR = "_bibliography"
 BIBTEX_FILE = "papers.bib"
 BIB_FILE_PATH = os.path.join(BIBLIOGRAPHY_DIR, BIBTEX_FILE)
 BACKUP_FILE_PATH = os.path.join(BIBLIOGRAPHY_DIR, f"{BIBTEX_FILE}.backup")
+BACKUP_KEEP = 1  # rotated backups: papers.bib.backup, papers.bib.backup.1, ...
+EXIT_UNCHANGED = 3  # exit status when the bibliography did not change
+MEMBER_BIB_PATH = os.path.join(BIBLIOGRAPHY_DIR, "members", "{scholar_id}.bib")  # --per-member output
+SELECTED_CITATIONS = 50  # entries cited more often than this get selected={true}
+# Citation counts read by _plugins/google-scholar-citations.rb at site build time
+CITATIONS_DATA_PATH = os.path.join("_data", "citations.json")
+
+# Profile table pagination: Scholar serves at most 100 rows per request
+PROFILE_URL = "https://scholar.google.com/citations?user={scholar_id}&hl=en&cstart={cstart}&pagesize={pagesize}"
+PROFILE_PAGE_SIZE = 100
+PROFILE_MAX_ROWS = 10000  # safety stop for the cstart walk
+
+# HTML parser backend (see scholar_parsers.py): auto (soup), soup, strainer, lxml, selectolax
+PARSER_BACKEND = os.getenv('SCHOLAR_PARSER', 'auto')
+
+# Persistent HTTP response cache (see http_cache.py)
+CACHE_ENABLED = os.getenv('SCHOLAR_CACHE', '').lower() != 'off'
+CACHE_DIR = os.getenv('SCHOLAR_CACHE_DIR', '.scholar_cache')
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "responses.sqlite")
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Seconds a cached page is served without asking Scholar again; after that it
+# is revalidated with a conditional request. Citation detail pages rarely
+# change, the profile table carries the live citation counts.
+CACHE_TTLS = [
+    ("view_op=view_citation", 30 * 24 * 3600),
+    ("citations?user=", 12 * 3600),
+]
+
+# Local publication store (see pub_store.py): papers.bib is generated from it,
+# and citation details fetched once are kept for later runs
+STORE_ENABLED = os.getenv('SCHOLAR_STORE', '').lower() != 'off'
+STORE_PATH = os.path.join(CACHE_DIR, "publications.sqlite")
+
+# Citation details from a local Crossref/OpenAlex JSON-lines snapshot (see
+# snapshot_index.py); its index is built once and rebuilt when the file changes
+SNAPSHOT_PATH = os.getenv('SCHOLAR_SNAPSHOT')
+SNAPSHOT_INDEX_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+# Checkpoint journal (see run_journal.py): profile pages and citation details
+# fetched by a run that did not finish are reused by the next run
+JOURNAL_ENABLED = os.getenv('SCHOLAR_JOURNAL', '').lower() != 'off'
+JOURNAL_PATH = os.path.join(CACHE_DIR, "journal.jsonl")
+
+# Detail page fetching (see fetch_engine.py): sustained requests per second,
+# back-to-back requests allowed, worker threads, concurrent requests per host
+DETAIL_RATE = 0.5
+DETAIL_BURST = 2
+DETAIL_WORKERS = 4
+DETAIL_PER_HOST = 2
+
+# Wall-clock budget of a run (--budget, e.g. 10m): once it is spent no more
+# detail requests are sent and the bibliography is written with what was
+# fetched. Details are fetched for new papers first, then papers of the last
+# RECENT_YEARS years, then highly cited ones (SELECTED_CITATIONS), then the rest;
+# within each group, the longest-unrefreshed details first
+RUN_BUDGET = os.getenv('SCHOLAR_BUDGET') or None
+RECENT_YEARS = 2
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)([smh]?)')
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+# Retries shared by the profile walk and detail fetches (see RetryScheduler):
+# attempts per page, and consecutive failed attempts before giving up on the run
+PROFILE_ATTEMPTS = 5
+DETAIL_ATTEMPTS = 3
+RETRY_FAILURE_THRESHOLD = 8
+
+# Per-run metrics (requests, retries, sleeps, stage timings; see run_metrics.py)
+METRICS = RunMetrics()
+METRICS_JSON_PATH = os.getenv('SCHOLAR_METRICS_JSON')
+
+# Fields filled in by fetch_publication_details() that an incremental update
+# carries over from the existing papers.bib for unchanged publications
+ENRICHED_FIELDS = (
+    'journal', 'abbr', 'volume', 'number', 'pages', 'publisher',
+    'doi', 'arxiv', 'pdf', 'abstract',
+)
+# The ones only the citation page provides (journal and abbr also come with the profile row)
+DETAIL_ONLY_FIELDS = tuple(field for field in ENRICHED_FIELDS if field not in ('journal', 'abbr'))
 
 # Journal abbreviation cache
 JOURNAL_ABBR_CACHE = {}
 
+# ISO 4 List of Title Word Abbreviations (see ltwa.py). The complete LTWA CSV
+# from issn.org is read from SCHOLAR_LTWA_FILE, else data/ltwa.csv. Without
+# it, the bundled data/ltwa-subset.csv (about 140 words common in
+# chemistry/physics venue names) is used as a fallback.
+LTWA_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LTWA_FILE_PATH = os.getenv('SCHOLAR_LTWA_FILE', os.path.join(LTWA_DATA_DIR, "ltwa.csv"))
+LTWA_SUBSET_PATH = os.path.join(LTWA_DATA_DIR, "ltwa-subset.csv")
+ABBR_CACHE_PATH = os.path.join(CACHE_DIR, "abbreviations.json")
+_LTWA = None
+
 # Common journal abbreviations (manually curated for chemistry/physics journals)
 COMMON_JOURNAL_ABBR = {
     "Journal of Chemical Physics": "J. Chem. Phys.",
@@ -105,69 +258,59 @@ def get_journal_abbreviation(journal_name):
     return abbr
 
 def apply_ltwa_rules(journal_name):
-    """Apply basic LTWA (List of Title Word Abbreviations) rules"""
-    # Common word abbreviations based on LTWA
-    word_abbr = {
-        'journal': 'J.',
-        'american': 'Am.',
-        'chemical': 'Chem.',
-        'chemistry': 'Chem.',
-        'physical': 'Phys.',
-        'physics': 'Phys.',
-        'society': 'Soc.',
-        'international': 'Int.',
-        'science': 'Sci.',
-        'letters': 'Lett.',
-        'communications': 'Commun.',
-        'proceedings': 'Proc.',
-        'national': 'Natl.',
-        'academy': 'Acad.',
-        'molecular': 'Mol.',
-        'theoretical': 'Theor.',
-        'computational': 'Comput.',
-        'accounts': 'Acc.',
-        'research': 'Res.',
-        'materials': 'Mater.',
-        'applied': 'Appl.',
-        'organic': 'Org.',
-        'inorganic': 'Inorg.',
-        'analytical': 'Anal.',
-        'biological': 'Biol.',
-        'biochemical': 'Biochem.',
-        'medicinal': 'Med.',
-        'pharmaceutical': 'Pharm.',
-        'european': 'Eur.',
-        'review': 'Rev.',
-        'reviews': 'Rev.',
-        'annual': 'Annu.',
-        'quarterly': 'Q.',
-        'monthly': 'Mon.',
-        'weekly': 'Wkly.',
-    }
+    """Apply ISO 4 LTWA (List of Title Word Abbreviations) rules"""
+    return get_ltwa().abbreviate(journal_name)
+
+def get_ltwa():
+    """The compiled LTWA, loaded on first use (and pickled in the cache directory)"""
+    global _LTWA
+    if _LTWA is None:
+        from ltwa import load_ltwa
+
+        path = LTWA_FILE_PATH
+        if not os.path.exists(path):
+            print(f"ℹ️  Full LTWA not found at {path}; abbreviating journals with the bundled subset")
+            path = LTWA_SUBSET_PATH
+        _LTWA = load_ltwa(path, cache_dir=CACHE_DIR if CACHE_ENABLED else None)
+    return _LTWA
+
+def abbreviation_fingerprint():
+    """Identify the rules behind cached abbreviations (LTWA file + curated list)"""
+    curated = json.dumps(COMMON_JOURNAL_ABBR, sort_keys=True).encode('utf-8')
+    return f"{get_ltwa().fingerprint}:{hashlib.sha1(curated).hexdigest()}"
+
+def load_abbreviations():
+    """Seed JOURNAL_ABBR_CACHE with the abbreviations resolved by earlier runs"""
+    if not CACHE_ENABLED:
+        return
+    from ltwa import load_abbreviation_cache
 
-    words = journal_name.split()
-    abbreviated_words = []
+    cached = load_abbreviation_cache(ABBR_CACHE_PATH, abbreviation_fingerprint())
+    JOURNAL_ABBR_CACHE.update(cached)
+    if cached:
+        print(f"🗄️  Loaded {len(cached)} cached journal abbreviations")
 
-    for word in words:
-        word_lower = word.lower().rstrip('.,;:')
-        if word_lower in word_abbr:
-            abbreviated_words.append(word_abbr[word_lower])
-        elif len(word) > 4:  # Abbreviate longer words
-            abbreviated_words.append(word[:4] + '.')
-        else:
-            abbreviated_words.append(word)
+def save_abbreviations():
+    """Persist JOURNAL_ABBR_CACHE for the next run"""
+    if not CACHE_ENABLED or not JOURNAL_ABBR_CACHE:
+        return
+    from ltwa import save_abbreviation_cache
 
-    return ' '.join(abbreviated_words)
+    try:
+        save_abbreviation_cache(ABBR_CACHE_PATH, abbreviation_fingerprint(), dict(JOURNAL_ABBR_CACHE))
+    except OSError as e:
+        print(f"⚠️  Could not save journal abbreviations: {e}")
 
-def fetch_publication_details(pub_data, session):
+@METRICS.timed('fetch_publication_details')
+def fetch_publication_details(pub_data, session, engine=None):
     """Fetch additional details for a publication from its Google Scholar page"""
     if not pub_data.get('scholar_url'):
         return pub_data
 
-    try:
-        # Add longer delay and retry logic to handle anti-bot measures
-        time.sleep(3)
+    if engine is None:
+        engine = get_fetch_engine(session)
 
+    try:
         # Use more realistic headers
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -178,65 +321,45 @@ def fetch_publication_details(pub_data, session):
             'Upgrade-Insecure-Requests': '1',
         }
 
-        # Retry logic for failed requests
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = session.get(pub_data['scholar_url'], headers=headers, timeout=30)
-                if response.status_code == 200:
-                    break
-                elif response.status_code == 429:  # Rate limited
-                    print(f"  ⚠️  Rate limited, waiting {(attempt + 1) * 5} seconds...")
-                    time.sleep((attempt + 1) * 5)
-                    continue
-                else:
-                    print(f"  ⚠️  HTTP {response.status_code} for {pub_data.get('title', 'Unknown')}")
-                    if attempt == max_retries - 1:
-                        return pub_data
-                    time.sleep(2)
-                    continue
-            except requests.RequestException as e:
-                print(f"  ⚠️  Request failed (attempt {attempt + 1}): {e}")
-                if attempt == max_retries - 1:
-                    return pub_data
-                time.sleep(2)
-                continue
-
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Rate limiting and retries are handled by the shared fetch engine
+        response = engine.get(
+            pub_data['scholar_url'],
+            label=pub_data.get('title', 'Unknown'),
+            headers=headers,
+            timeout=30,
+        )
+        if response is None:
+            return pub_data
+        if response.status_code != 200:
+            print(f"  ⚠️  HTTP {response.status_code} for {pub_data.get('title', 'Unknown')}")
+            return pub_data
+
+        with METRICS.stage('parse_details'):
+            details = get_html_parser(session).parse_details(response.content)
+        pub_data['details_fetched_at'] = time.time()
 
         # Try to extract abstract
-        abstract_div = soup.find('div', {'id': 'gsc_oci_merged_snippet'})
-        if abstract_div:
-            pub_data['abstract'] = clean_bibtex_string(abstract_div.get_text().strip())
+        if details['abstract'] is not None:
+            pub_data['abstract'] = clean_bibtex_string(details['abstract'])
 
         # Try to extract DOI and other metadata from citation details
-        citation_table = soup.find('table', {'id': 'gsc_oci_table'})
-        if citation_table:
-            rows = citation_table.find_all('tr')
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 2:
-                    field = cells[0].get_text().strip().lower()
-                    value = cells[1].get_text().strip()
-
-                    if 'journal' in field:
-                        pub_data['journal'] = clean_bibtex_string(value)
-                        pub_data['abbr'] = get_journal_abbreviation(value)
-                    elif 'volume' in field:
-                        pub_data['volume'] = value
-                    elif 'issue' in field or 'number' in field:
-                        pub_data['number'] = value
-                    elif 'pages' in field:
-                        pub_data['pages'] = value.replace('-', '--')  # BibTeX style
-                    elif 'publisher' in field:
-                        pub_data['publisher'] = clean_bibtex_string(value)
-                    elif 'doi' in field:
-                        pub_data['doi'] = value
+        for field, value in details['fields']:
+            if 'journal' in field:
+                pub_data['journal'] = clean_bibtex_string(value)
+                pub_data['abbr'] = get_journal_abbreviation(value)
+            elif 'volume' in field:
+                pub_data['volume'] = value
+            elif 'issue' in field or 'number' in field:
+                pub_data['number'] = value
+            elif 'pages' in field:
+                pub_data['pages'] = value.replace('-', '--')  # BibTeX style
+            elif 'publisher' in field:
+                pub_data['publisher'] = clean_bibtex_string(value)
+            elif 'doi' in field:
+                pub_data['doi'] = value
 
         # Try to find external links
-        links = soup.find_all('a', href=True)
-        for link in links:
-            href = link.get('href', '')
+        for href in details['links']:
             if 'doi.org' in href:
                 pub_data['doi'] = href.split('doi.org/')[-1]
             elif 'arxiv.org' in href:
@@ -249,16 +372,17 @@ def fetch_publication_details(pub_data, session):
 
     return pub_data
 
-def backup_existing_bib():
-    """Create a backup of the existing papers.bib file"""
-    if os.path.exists(BIB_FILE_PATH):
-        import shutil
-        shutil.copy2(BIB_FILE_PATH, BACKUP_FILE_PATH)
-        print(f"✓ Backup created: {BACKUP_FILE_PATH}")
+def make_session(parser=PARSER_BACKEND, record=None, replay=None):
+    """Create a requests session with browser-like headers, the response cache and an HTML parser
 
-def get_scholar_publications():
-    """Fetch publications from Google Scholar using direct scraping"""
-    print(f"🔍 Fetching publications for Scholar ID: {SCHOLAR_ID}")
+    record / replay: cassette directory to save every response to, or to
+    answer every request from (no network, no sleeps). Either one bypasses
+    the response cache so the cassette sees every request.
+    """
+    import requests
+    from cassette import Cassette, install_cassette
+    from http_cache import ResponseCache, install_cache
+    from scholar_parsers import get_parser
 
     # Set up session with headers to mimic a real browser
     session = requests.Session()
@@ -271,108 +395,384 @@ def get_scholar_publications():
         'Upgrade-Insecure-Requests': '1',
     })
 
+    if record or replay:
+        mode = 'record' if record else 'replay'
+        cassette = Cassette(record or replay)
+        install_cassette(session, cassette, mode)
+        session.cassette = cassette
+        if replay:
+            METRICS.sleep_enabled = False
+        print(f"📼 Cassette {mode}: {cassette.directory}")
+    elif CACHE_ENABLED:
+        cache = ResponseCache(CACHE_DB_PATH, max_bytes=CACHE_MAX_BYTES, ttl_rules=CACHE_TTLS)
+        install_cache(session, cache)
+        session.response_cache = cache
+        print(f"🗄️  Using response cache: {CACHE_DB_PATH}")
+
+    session.html_parser = get_parser(parser)
+    session.retry_scheduler = make_retry_scheduler()
+    METRICS.install(session)
+
+    return session
+
+def make_retry_scheduler():
+    """Retry scheduler for one run; waits and retries are recorded in METRICS"""
+    from fetch_engine import RetryScheduler
+
+    return RetryScheduler(
+        max_attempts=PROFILE_ATTEMPTS,
+        failure_threshold=RETRY_FAILURE_THRESHOLD,
+        sleep=METRICS.sleep,
+        on_retry=METRICS.retry,
+    )
+
+def get_retry_scheduler(session):
+    """Return the session's retry scheduler, attaching a new one if needed"""
+    scheduler = getattr(session, 'retry_scheduler', None)
+    if scheduler is None:
+        scheduler = session.retry_scheduler = make_retry_scheduler()
+    return scheduler
+
+def get_html_parser(session):
+    """Return the session's HTML parser backend, falling back to the default one"""
+    parser = getattr(session, 'html_parser', None)
+    if parser is None:
+        from scholar_parsers import get_parser
+        parser = get_parser(PARSER_BACKEND)
+    return parser
+
+def is_cached_fresh(session, url):
+    """Check whether a URL will be answered from the cache without a request"""
+    cache = getattr(session, 'response_cache', None)
+    if cache is None:
+        return False
+    entry = cache.get(url)
+    return entry is not None and cache.is_fresh(entry)
+
+def make_fetch_engine(session, rate=DETAIL_RATE, workers=DETAIL_WORKERS, deadline=None):
+    """Attach a rate-limited fetch engine for detail pages to a session
+
+    deadline: time.monotonic() value after which no detail request is sent
+    """
+    from fetch_engine import FetchEngine
+
+    session.fetch_engine = FetchEngine(
+        session,
+        rate=rate,
+        burst=DETAIL_BURST,
+        max_workers=workers,
+        per_host=DETAIL_PER_HOST,
+        retry=get_retry_scheduler(session),
+        max_attempts=DETAIL_ATTEMPTS,
+        exempt=lambda url: is_cached_fresh(session, url),
+        throttle_sleep=METRICS.sleeper('details_rate_limit'),
+        deadline=deadline,
+    )
+    return session.fetch_engine
+
+def get_fetch_engine(session):
+    """Return the session's fetch engine, creating one with the defaults if needed"""
+    engine = getattr(session, 'fetch_engine', None)
+    return engine if engine is not None else make_fetch_engine(session)
+
+def iter_enriched(publications, session, existing=None, to_fetch=None, skip_detailed=False, fallback=None):
+    """Yield publications in order with their citation details, fetched concurrently within the rate budget
+
+    A publication whose entry in existing (google_scholar_id -> fields, see
+    load_existing_entries) is still current reuses that entry's enriched
+    fields instead; with skip_detailed, one that already got its details
+    this run (from the snapshot) is passed through. Once the fetch engine's
+    deadline has passed, publications are passed through unfetched, keeping
+    the enriched fields of their entry in fallback. The input is consumed
+    lazily: the fetch engine keeps only a bounded window of publications
+    in flight. Fetched details are written to the session's checkpoint
+    journal as they arrive; details an interrupted run journaled are
+    reused without a request.
+    """
+    engine = get_fetch_engine(session)
+    existing = existing or {}
+    journal = getattr(session, 'journal', None)
+
+    def enrich(pub):
+        article_id = get_scholar_article_id(pub)
+        entry = existing.get(article_id)
+        if entry is not None and entry_is_current(pub, entry):
+            reuse_enriched_fields(pub, entry)
+            pub['details_fetched_at'] = time.time()  # details carried over from the existing entry
+            return pub
+        if skip_detailed and pub.get('details_fetched_at'):
+            return pub
+
+        journaled = journal.take_details(article_id) if journal is not None and article_id else None
+        if journaled is not None:
+            pub.update(journaled)
+            journal.resumed_details()
+            return pub
+        if engine.expired:
+            METRICS.count('details_deferred')
+            # Matched by Scholar ID alone: the paper keeps the details it had even
+            # if its profile row changed since, or has no year (the entry got one
+            # from the writer)
+            entry = (fallback or {}).get(article_id)
+            if entry is not None:
+                reuse_enriched_fields(pub, entry)
+            return pub
+
+        pub = fetch_publication_details(pub, session, engine)
+        if journal is not None and article_id and pub.get('details_fetched_at'):
+            journal.record_details(article_id, journal_fields(pub))
+        return pub
+
+    count = len(publications) if to_fetch is None else to_fetch
+    print(f"📥 Fetching details for {count} publications "
+          f"({engine.bucket.rate:g} req/s, {engine.max_workers} workers)...")
+    start = time.monotonic()
+
+    yield from engine.imap(enrich, publications)
+
+    elapsed = time.monotonic() - start
+    stats = engine.stats
+    print(f"  ✓ Details fetched in {elapsed:.1f}s: {stats['requests']} requests, "
+          f"{stats['retries']} retries, {stats['failures']} failures")
+    if journal is not None and journal.stats['resumed_details']:
+        print(f"  ♻️  {journal.stats['resumed_details']} taken from the checkpoint journal")
+    if METRICS.counters['details_deferred']:
+        print(f"  ⏱️  Time budget spent: details of {METRICS.counters['details_deferred']} "
+              "publications left for a later run")
+
+def journal_fields(pub):
+    """The detail fields of a publication that the checkpoint journal keeps"""
+    fields = {field: pub[field] for field in ENRICHED_FIELDS if pub.get(field)}
+    fields['details_fetched_at'] = pub['details_fetched_at']
+    return fields
+
+def open_journal(args):
+    """Open the checkpoint journal for this run, or None if it is disabled
+
+    A journal left by an interrupted run with the same Scholar IDs is
+    resumed unless --restart is given. Recorded and replayed runs do not
+    use it, so a cassette always holds every request of the run.
+    """
+    if not JOURNAL_ENABLED or args.record or args.replay:
+        return None
+    from run_journal import RunJournal
+
     try:
-        # Construct the Google Scholar URL
-        base_url = f"https://scholar.google.com/citations?user={SCHOLAR_ID}&hl=en&cstart=0&pagesize=100"
-
-        print(f"📡 Requesting: {base_url}")
-
-        # Use much more aggressive retry strategy with longer delays
-        max_retries = 5
-        response = None
-
-        for attempt in range(max_retries):
-            try:
-                print(f"  Attempt {attempt + 1}/{max_retries}...")
-
-                # Progressive delay: 5s, 15s, 30s, 60s, 120s
-                delay = min(5 * (2 ** attempt), 120)
-                print(f"  Waiting {delay} seconds to avoid rate limiting...")
-                time.sleep(delay)
-
-                # Rotate User-Agent strings to appear more natural
-                user_agents = [
-                    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15'
-                ]
-                session.headers.update({'User-Agent': user_agents[attempt % len(user_agents)]})
-
-                response = session.get(base_url, timeout=45)
-
-                if response.status_code == 200:
-                    print(f"  ✅ Success on attempt {attempt + 1}")
-                    break
-                elif response.status_code == 429:  # Rate limited
-                    wait_time = (attempt + 1) * 30
-                    print(f"  ⚠️  Rate limited, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                elif response.status_code == 503:  # Service unavailable
-                    wait_time = (attempt + 1) * 20
-                    print(f"  ⚠️  Service unavailable, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"  ⚠️  HTTP {response.status_code}, retrying...")
-                    if attempt == max_retries - 1:
-                        print(f"  ❌ Failed after {max_retries} attempts with status {response.status_code}")
-                        raise requests.RequestException(f"Failed after {max_retries} attempts")
-                    continue
-
-            except requests.RequestException as e:
-                print(f"  ⚠️  Request failed (attempt {attempt + 1}): {e}")
-                if attempt == max_retries - 1:
-                    print(f"  ❌ All {max_retries} attempts failed")
-                    raise
-                continue
-
-        if not response or response.status_code != 200:
-            raise requests.RequestException("Failed to get valid response from Google Scholar")
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Find author name
-        author_name = "Unknown Author"
-        name_element = soup.find('div', {'id': 'gsc_prf_in'})
-        if name_element:
-            author_name = name_element.get_text().strip()
-            print(f"✓ Found author: {author_name}")
-
-        # Find publication entries
-        publications = []
-        pub_table = soup.find('table', {'id': 'gsc_a_t'})
-
-        if not pub_table:
-            print("❌ Could not find publications table")
-            return []
-
-        rows = pub_table.find_all('tr', class_='gsc_a_tr')
-        print(f"✓ Found {len(rows)} publications")
-
-        for i, row in enumerate(rows):
-            try:
-                pub_data = parse_publication_row(row, session)
-                if pub_data:
-                    print(f"  📄 {i+1}/{len(rows)}: {pub_data.get('title', 'Unknown title')}")
-                    publications.append(pub_data)
-
-            except Exception as e:
-                print(f"  ⚠️  Error parsing publication {i+1}: {e}")
-                continue
-
-        print(f"📊 Processing {len(publications)} publications with basic metadata...")
-        print("  ⚠️  Skipping detailed metadata fetching to avoid rate limiting")
-        print("  ✓ Using citation counts and basic info from main page")
+        journal = RunJournal(JOURNAL_PATH, key={'scholar_ids': args.scholar_ids}, resume=not args.restart)
+    except OSError as e:
+        print(f"⚠️  Checkpoint journal {JOURNAL_PATH} unavailable ({e}); this run cannot be resumed")
+        return None
+    pages, details = journal.resumable
+    if pages or details:
+        started = datetime.fromtimestamp(journal.started).strftime('%Y-%m-%d %H:%M')
+        print(f"♻️  Resuming the run started {started}: {pages} profile pages and "
+              f"{details} publication details in {JOURNAL_PATH}")
+    return journal
+
+def finish_journal(session):
+    """The run completed: delete its checkpoint journal"""
+    journal = getattr(session, 'journal', None)
+    if journal is None:
+        return
+    METRICS.info['journal'] = dict(journal.stats)
+    journal.finish()
+
+def report_cache_stats(session):
+    """Print how many requests the response cache saved"""
+    cache = getattr(session, 'response_cache', None)
+    if cache is None:
+        return
+    stats = cache.stats
+    print(f"🗄️  Cache: {stats['hits']} hits, {stats['revalidated']} revalidated (304), "
+          f"{stats['misses']} downloaded, {stats['evicted']} evicted")
+
+def report_cassette_stats(session):
+    """Print how many exchanges were recorded to / replayed from the cassette"""
+    cassette = getattr(session, 'cassette', None)
+    if cassette is None:
+        return
+    stats = cassette.stats
+    print(f"📼 Cassette: {stats['recorded']} recorded, {stats['replayed']} replayed, "
+          f"{stats['missing']} missing")
+
+def open_store(path=STORE_PATH):
+    """Open the publication store, or None if it is disabled or unusable"""
+    if not STORE_ENABLED:
+        return None
+    try:
+        return PublicationStore(path)
+    except sqlite3.Error as e:
+        print(f"⚠️  Publication store {path} unavailable ({e}); generating from this run only")
+        return None
 
+def store_entries(publications):
+    """Yield (article ID, publication) pairs for the publications that have a Scholar article ID"""
+    for pub in publications:
+        article_id = get_scholar_article_id(pub)
+        if article_id:
+            yield article_id, pub
+
+def record_profile(store, publications, scholar_ids):
+    """Upsert a profile fetch (consumed as a stream) into the store; returns the number recorded"""
+    count = store.record_profile(store_entries(publications), scholar_ids)
+    stats = store.stats
+    print(f"🗄️  Publication store: {stats['inserted']} new, {stats['updated']} updated, "
+          f"{stats['unchanged']} unchanged")
+    return count
+
+def record_details(store, publications):
+    """Store the details of publications whose citation page was fetched (or reused) this run"""
+    fetched = (pub for pub in publications if pub.get('details_fetched_at'))
+    count = store.record_details(store_entries(fetched))
+    if count:
+        print(f"🗄️  Stored details for {count} publications")
+    return count
+
+def fetch_profile_page(session, cstart=0, pagesize=PROFILE_PAGE_SIZE, scholar_id=SCHOLAR_ID):
+    """Fetch one page of the Google Scholar profile table, retrying on failure"""
+    import requests
+
+    url = PROFILE_URL.format(scholar_id=scholar_id, cstart=cstart, pagesize=pagesize)
+
+    print(f"📡 Requesting: {url}")
+
+    # Rotate User-Agent strings between attempts to appear more natural
+    user_agents = [
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15'
+    ]
+
+    def send(attempt):
+        print(f"  Attempt {attempt + 1}/{PROFILE_ATTEMPTS}...")
+        return session.get(url, timeout=45, headers={'User-Agent': user_agents[attempt % len(user_agents)]})
+
+    # No wait before the first attempt: the scheduler only backs off after a
+    # failure (honoring Retry-After) and gives up early on repeated failures
+    response = get_retry_scheduler(session).request(send, label=url, kind='profile', attempts=PROFILE_ATTEMPTS)
+
+    if response is None or response.status_code != 200:
+        status = f"status {response.status_code}" if response is not None else "no response"
+        print(f"  ❌ Failed to fetch profile page ({status})")
+        raise requests.RequestException("Failed to get valid response from Google Scholar")
+
+    source = "cache" if getattr(response, 'from_cache', False) else "network"
+    print(f"  ✅ Success ({source})")
+    return response
+
+def iter_profile_pages(session, pagesize=PROFILE_PAGE_SIZE, scholar_id=SCHOLAR_ID):
+    """Walk the profile table page by page via cstart
+
+    Yields (cstart, page) for each page, where page is the parser backend's
+    parse_profile() result. The next page is downloaded in the background
+    while the caller processes the current one. Pages are written to the
+    session's checkpoint journal, and pages an interrupted run journaled
+    are taken from it instead of being downloaded again.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = get_html_parser(session)
+    journal = getattr(session, 'journal', None)
+    journaled = journal.take_pages(scholar_id, pagesize) if journal is not None else {}
+
+    def fetch(cstart):
+        if cstart in journaled:
+            return None
+        return fetch_profile_page(session, cstart, pagesize, scholar_id)
+
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        cstart = 0
+        pending = prefetcher.submit(fetch, cstart)
+
+        while True:
+            response = pending.result()
+            if response is None:
+                print(f"♻️  Profile page from #{cstart + 1} taken from the checkpoint journal")
+                page = journaled.pop(cstart)
+                journal.resumed_page()
+            else:
+                with METRICS.stage('parse_profile'):
+                    page = parser.parse_profile(response.content)
+                if journal is not None and page['rows'] is not None:
+                    journal.record_page(scholar_id, pagesize, cstart, page)
+            rows = page['rows']
+
+            # A short page or a disabled "Show more" button means the profile is exhausted
+            has_more = (
+                bool(rows)
+                and len(rows) >= pagesize
+                and not page['more_disabled']
+                and cstart + pagesize < PROFILE_MAX_ROWS
+            )
+            if has_more:
+                pending = prefetcher.submit(fetch, cstart + pagesize)
+
+            yield cstart, page
+
+            if not has_more:
+                break
+            cstart += pagesize
+
+def publication_sort_key(pub):
+    """Sort key putting the newest year first, then the most cited (ties keep their order)"""
+    return -(pub.get('year') or 0), -(pub.get('citations') or 0)
+
+def iter_scholar_publications(session, scholar_id=SCHOLAR_ID):
+    """Yield publications parsed from each profile page as soon as it arrives"""
+    count = 0
+    for cstart, page in iter_profile_pages(session, scholar_id=scholar_id):
+        if cstart == 0 and page['author']:
+            print(f"✓ Found author: {page['author']}")
+
+        rows = page['rows']
+        if rows is None:
+            if cstart == 0:
+                print("❌ Could not find publications table")
+            return
+
+        print(f"✓ Found {len(rows)} publications (from #{cstart + 1})")
+
+        for pub_data in rows:
+            count += 1
+            if pub_data:
+                print(f"  📄 {count}: {pub_data.get('title', 'Unknown title')}")
+                yield pub_data
+
+def iter_basic_publications(session, scholar_id=SCHOLAR_ID, members=None):
+    """Yield profile publications with the basic metadata of the main page, in profile order"""
+    for pub in iter_scholar_publications(session, scholar_id):
         # Just add basic journal abbreviations for known journals
-        for i, pub in enumerate(publications):
-            if pub.get('venue'):
-                pub['abbr'] = get_journal_abbreviation(pub['venue'])
-                pub['journal'] = pub['venue']
+        if pub.get('venue'):
+            pub['abbr'] = get_journal_abbreviation(pub['venue'])
+            pub['journal'] = pub['venue']
+        if members is not None:
+            pub['members'] = list(members)
+        yield pub
+
+def report_basic_metadata(count):
+    """Print what a profile fetch without details provides"""
+    print(f"📊 Processing {count} publications with basic metadata...")
+    print("  ✓ Using citation counts and basic info from main page")
+    print("  ℹ️  Detailed metadata is fetched with --details or --incremental")
+
+@METRICS.timed('get_scholar_publications')
+def get_scholar_publications(session=None, scholar_id=SCHOLAR_ID):
+    """Fetch publications from Google Scholar using direct scraping"""
+    import requests
+
+    print(f"🔍 Fetching publications for Scholar ID: {scholar_id}")
+
+    if session is None:
+        session = make_session()
+
+    try:
+        publications = list(iter_basic_publications(session, scholar_id))
+        report_basic_metadata(len(publications))
 
         # Sort publications by year (newest first), then by citation count (highest first)
-        publications.sort(key=lambda x: (x.get('year', 0), x.get('citations', 0)), reverse=True)
+        publications.sort(key=publication_sort_key)
+
+        report_cache_stats(session)
 
         return publications
 
@@ -383,51 +783,105 @@ def get_scholar_publications():
         print(f"❌ Error fetching from Google Scholar: {e}")
         return []
 
+@METRICS.timed('get_group_publications')
+def get_group_publications(session, scholar_ids, workers=PROFILE_WORKERS):
+    """Fetch several profiles concurrently over one session and merge shared publications
+
+    Every publication records the profiles it was found on in 'members'.
+    Duplicates (same DOI, or same normalized title and year) are merged
+    before any detail fetching, so each paper is enriched only once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    print(f"👥 Fetching {len(scholar_ids)} profiles ({min(workers, len(scholar_ids))} at a time)...")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(scholar_ids)))) as pool:
+        results = list(pool.map(lambda scholar_id: get_scholar_publications(session, scholar_id), scholar_ids))
+
+    missing = [scholar_id for scholar_id, member_publications in zip(scholar_ids, results) if not member_publications]
+    if missing:
+        # A partial merge would drop every paper of the missing members
+        print(f"❌ No publications fetched for: {', '.join(missing)}")
+        return []
+
+    publications = []
+    for scholar_id, member_publications in zip(scholar_ids, results):
+        print(f"  ✓ {scholar_id}: {len(member_publications)} publications")
+        for pub in member_publications:
+            pub['members'] = [scholar_id]
+        publications.extend(member_publications)
+
+    publications, duplicates = merge_duplicates(publications)
+    print(f"🔗 Merged {duplicates} duplicate publications; {len(publications)} unique")
+
+    publications.sort(key=publication_sort_key)
+    return publications
+
+@METRICS.timed('collect_publications')
+def collect_publications(session, scholar_ids, store=None, workers=PROFILE_WORKERS):
+    """Fetch the profile(s) into a sized, re-iterable source of publications in output order
+
+    A single profile is streamed page by page (parsed on a producer thread
+    behind a bounded queue) straight into the store, whose view is
+    returned, or into an external sort that spills to disk. A group is
+    fetched and merged in memory first, since merging needs every profile.
+    Returns None if nothing was fetched; a failed fetch leaves the store
+    as it was.
+    """
+    import requests
+
+    if len(scholar_ids) > 1:
+        publications = get_group_publications(session, scholar_ids, workers=workers)
+        if not publications:
+            return None
+        if store is None:
+            return publications
+    else:
+        print(f"🔍 Fetching publications for Scholar ID: {scholar_ids[0]}")
+        publications = buffered(iter_basic_publications(session, scholar_ids[0], members=scholar_ids))
+
+    try:
+        if store is not None:
+            if not record_profile(store, publications, scholar_ids):
+                return None
+            publications = store.publications(scholar_ids)
+        else:
+            publications = external_sort(publications, key=publication_sort_key)
+    except requests.RequestException as e:
+        print(f"❌ Network error fetching from Google Scholar: {e}")
+        return None
+    except sqlite3.Error:
+        raise
+    except Exception as e:
+        print(f"❌ Error fetching from Google Scholar: {e}")
+        return None
+
+    if len(scholar_ids) == 1:
+        report_basic_metadata(len(publications))
+        report_cache_stats(session)
+    return publications or None
+
+@METRICS.timed('merge_versions')
+def merge_publication_versions(publications):
+    """Merge preprint and published versions listed as separate rows, and make BibTeX keys unique
+
+    Returns a view of publications (see dedup.MergedVersions), or
+    publications itself if there is nothing to merge or rename.
+    """
+    plan = plan_versions(publications, get_scholar_article_id, bibtex_key=bibtex_key_for)
+    if not plan:
+        return publications
+    if plan.groups:
+        print(f"🔗 Merged {plan.merged} preprint/duplicate rows into {len(plan.groups)} publications")
+    if plan.keys:
+        print(f"🔑 Disambiguated {len(plan.keys)} BibTeX keys shared by different publications")
+    METRICS.info['versions'] = {'groups': len(plan.groups), 'merged': plan.merged, 'keys': len(plan.keys)}
+    return MergedVersions(publications, plan, get_scholar_article_id, publication_sort_key)
+
 def parse_publication_row(row, session):
-    """Parse a single publication row from Google Scholar"""
-    pub_data = {}
-
-    # Get title and link
-    title_cell = row.find('td', class_='gsc_a_t')
-    if title_cell:
-        title_link = title_cell.find('a', class_='gsc_a_at')
-        if title_link:
-            pub_data['title'] = title_link.get_text().strip()
-            pub_data['scholar_url'] = "https://scholar.google.com" + title_link.get('href', '')
-
-        # Get authors and venue info
-        author_info = title_cell.find('div', class_='gs_gray')
-        if author_info:
-            author_text = author_info.get_text().strip()
-            pub_data['authors_raw'] = author_text
-
-            # Try to separate authors from venue
-            parts = author_text.split(' - ')
-            if len(parts) >= 2:
-                pub_data['authors'] = parts[0].strip()
-                pub_data['venue'] = parts[1].strip()
-            else:
-                pub_data['authors'] = author_text
-
-    # Get citation count
-    citation_cell = row.find('td', class_='gsc_a_c')
-    if citation_cell:
-        citation_link = citation_cell.find('a', class_='gsc_a_ac')
-        if citation_link:
-            citation_text = citation_link.get_text().strip()
-            if citation_text.isdigit():
-                pub_data['citations'] = int(citation_text)
-
-    # Get year
-    year_cell = row.find('td', class_='gsc_a_y')
-    if year_cell:
-        year_span = year_cell.find('span', class_='gsc_a_h')
-        if year_span:
-            year_text = year_span.get_text().strip()
-            if year_text.isdigit():
-                pub_data['year'] = int(year_text)
-
-    return pub_data if pub_data.get('title') else None
+    """Parse a single publication row (a BeautifulSoup <tr>) from Google Scholar"""
+    from scholar_parsers import parse_soup_row
+
+    return parse_soup_row(row)
 
 def format_author_name(author_name):
     """Format author name for BibTeX"""
@@ -443,13 +897,20 @@ def format_author_name(author_name):
     return name
 
 def generate_bibtex_key(title, year):
-    """Generate a unique BibTeX key"""
+    """Generate a BibTeX key (papers sharing year and first title words are disambiguated by merge_publication_versions)"""
     # Clean title and take first few words
     clean_title = ''.join(c for c in title if c.isalnum() or c.isspace())
     words = clean_title.split()[:3]
     key_base = ''.join(words).lower()
     return f"heidarzadeh{year}{key_base}"
 
+def bibtex_key_for(pub):
+    """A publication's BibTeX key: the disambiguated one if it has one, else the generated one"""
+    if pub.get('bibtex_key'):
+        return pub['bibtex_key']
+    return generate_bibtex_key(clean_bibtex_string(pub.get('title', 'Unknown Title')),
+                               pub.get('year', datetime.now().year))
+
 def publication_to_bibtex(pub):
     """Convert a scraped publication to comprehensive BibTeX format"""
 
@@ -463,7 +924,7 @@ def publication_to_bibtex(pub):
     title = clean_bibtex_string(title)
 
     # Generate BibTeX key
-    bib_key = generate_bibtex_key(title, year)
+    bib_key = bibtex_key_for(pub)
 
     # Format authors
     authors_str = format_authors_for_bibtex(authors_raw)
@@ -491,7 +952,7 @@ def publication_to_bibtex(pub):
     bibtex_lines.append(f"  bibtex_show={{true}},")
 
     # Mark highly cited papers as selected
-    if pub.get('citations', 0) > 50:
+    if pub.get('citations', 0) > SELECTED_CITATIONS:
         bibtex_lines.append(f"  selected={{true}},")
 
     bibtex_lines.append("")
@@ -558,11 +1019,9 @@ def publication_to_bibtex(pub):
         bibtex_lines.append(f"  note={{Cited by {pub['citations']}}},")
 
     # Google Scholar ID (extract from URL)
-    if pub.get('scholar_url'):
-        scholar_match = re.search(r'citation_for_view=([^&]+)', pub['scholar_url'])
-        if scholar_match:
-            scholar_id = scholar_match.group(1).split(':')[-1]
-            bibtex_lines.append(f"  google_scholar_id={{{scholar_id}}},")
+    scholar_id = get_scholar_article_id(pub)
+    if scholar_id:
+        bibtex_lines.append(f"  google_scholar_id={{{scholar_id}}},")
 
     # Remove trailing comma from last entry and close
     if bibtex_lines[-1].endswith(','):
@@ -572,6 +1031,15 @@ def publication_to_bibtex(pub):
 
     return "\n".join(bibtex_lines)
 
+def get_scholar_article_id(pub):
+    """Extract the Google Scholar article ID from a publication's Scholar URL"""
+    if not pub.get('scholar_url'):
+        return None
+    scholar_match = re.search(r'citation_for_view=([^&]+)', pub['scholar_url'])
+    if scholar_match:
+        return scholar_match.group(1).split(':')[-1]
+    return None
+
 def clean_bibtex_string(text):
     """Clean a string for use in BibTeX"""
     if not text:
@@ -612,19 +1080,17 @@ def format_authors_for_bibtex(authors_raw):
 
     return " and ".join(formatted_authors)
 
-def update_papers_bib(publications):
-    """Update the papers.bib file with new publications"""
-
-    print(f"📝 Updating {BIB_FILE_PATH}")
-
-    # Create BibTeX header
-    header = f"""---
+def bibtex_header(scholar_ids=None):
+    """Build the generated-file header of papers.bib"""
+    scholar_ids = scholar_ids or [SCHOLAR_ID]
+    label = "Scholar ID" if len(scholar_ids) == 1 else "Scholar IDs"
+    return f"""---
 ---
 
 @comment{{
   This file is automatically generated from Google Scholar.
   Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-  Scholar ID: {SCHOLAR_ID}
+  {label}: {', '.join(scholar_ids)}
 
   DO NOT EDIT MANUALLY - Changes will be overwritten on next update.
   To update: run python _scripts/update_publications.py
@@ -632,25 +1098,602 @@ def update_papers_bib(publications):
 
 """
 
-    # Generate BibTeX entries
-    bibtex_entries = []
+def iter_bibtex_chunks(publications, counts, scholar_ids=None, hashes=None):
+    """Yield the header and each BibTeX entry as soon as it is generated
+
+    If a hashes dict is given, each entry's content hash is recorded in it.
+    """
+    yield bibtex_header(scholar_ids)
+
     for pub in publications:
         try:
             entry = publication_to_bibtex(pub)
-            bibtex_entries.append(entry)
         except Exception as e:
             print(f"  ⚠️  Error converting publication to BibTeX: {e}")
             continue
 
-    # Write to file
-    with open(BIB_FILE_PATH, 'w', encoding='utf-8') as f:
-        f.write(header)
-        f.write("\n\n".join(bibtex_entries))
+        if hashes is not None:
+            add_entry_hash(hashes, entry)
+        if counts['entries']:
+            yield "\n\n"
+        yield entry
+        counts['entries'] += 1
+
+@METRICS.timed('update_papers_bib')
+def update_papers_bib(publications, backup=True, file_path=BIB_FILE_PATH, scholar_ids=None):
+    """Update the papers.bib file with new publications
+
+    Entries are streamed to a temporary file that atomically replaces
+    papers.bib once complete; the previous file is kept as a rotated backup.
+    If every entry hashes the same as in the current file, the new file is
+    discarded and papers.bib is left untouched. Returns True if it changed.
+    """
+    backup_path = f"{file_path}.backup" if backup else None
+
+    print(f"📝 Updating {file_path}")
+
+    previous = previous_entry_hashes(file_path)
+    hashes = {}
+    counts = {'entries': 0}
+    written = atomic_write(
+        file_path,
+        iter_bibtex_chunks(publications, counts, scholar_ids, hashes),
+        backup_path=backup_path,
+        keep_backups=BACKUP_KEEP,
+        replace_if=lambda: hashes != previous or not os.path.exists(file_path),
+    )
+
+    added, removed, modified = diff_entry_hashes(previous, hashes)
+    METRICS.info.setdefault('bibliography', {})[file_path] = {
+        'changed': written is not None,
+        'entries': counts['entries'],
+        'added': len(added),
+        'removed': len(removed),
+        'modified': len(modified),
+    }
+
+    if written is None:
+        print(f"✓ {file_path} unchanged ({counts['entries']} publications); not rewritten")
+        if write_manifest(file_path, hashes):
+            print(f"✓ Manifest refreshed: {manifest_path_for(file_path)}")
+        return False
+
+    write_manifest(file_path, hashes)
+    if backup_path and os.path.exists(backup_path):
+        print(f"✓ Backup kept: {backup_path}")
+    print(f"✓ Updated {file_path} with {counts['entries']} publications")
+    report_entry_changes(added, removed, modified)
+    return True
+
+def report_entry_changes(added, removed, modified, limit=10):
+    """Print the keys of added, removed and modified entries"""
+    for label, keys in (("Added", added), ("Removed", removed), ("Modified", modified)):
+        if not keys:
+            continue
+        shown = ', '.join(keys[:limit])
+        more = f" (+{len(keys) - limit} more)" if len(keys) > limit else ""
+        print(f"  {label} {len(keys)}: {shown}{more}")
+
+def update_member_bibs(publications, scholar_ids, backup=True):
+    """Write one bibliography per group member (MEMBER_BIB_PATH); returns True if any changed"""
+    changed = False
+    for scholar_id in scholar_ids:
+        file_path = MEMBER_BIB_PATH.format(scholar_id=scholar_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        member_publications = (pub for pub in publications if scholar_id in pub.get('members', []))
+        changed |= update_papers_bib(member_publications, backup=backup, file_path=file_path,
+                                     scholar_ids=[scholar_id])
+    return changed
+
+def update_sharded_bibs(publications, backup=True, directory=BIBLIOGRAPHY_DIR, scholar_ids=None):
+    """Write one papers-YYYY.bib per year plus the shard index; returns True if anything changed
+
+    Shards whose entries did not change are not rewritten and keep their mtime.
+    publications must be in output order (newest year first); each shard is
+    written straight from the stream.
+    """
+    years = []
+    changed = False
+    for year, year_publications in iter_year_groups(publications):
+        years.append(year)
+        changed |= update_papers_bib(year_publications, backup=backup,
+                                     file_path=shard_path(directory, year), scholar_ids=scholar_ids)
+
+    for path in remove_stale_shards(directory, years, backup=backup):
+        print(f"🗑️  Removed {path} (no publications left for that year)")
+        changed = True
+
+    if write_shard_index(directory, [shard_summary(directory, year) for year in years]):
+        print(f"✓ Shard index updated: {index_path_for(directory)}")
+        changed = True
+    return changed
+
+def citation_counts(publications):
+    """Map of Scholar article ID -> citation count for publications that have an ID"""
+    counts = {}
+    for pub in publications:
+        article_id = get_scholar_article_id(pub)
+        if article_id:
+            counts[article_id] = pub.get('citations', 0)
+    return counts
+
+def patch_bib_citations(citations, file_path=BIB_FILE_PATH, backup=True):
+    """Rewrite only the citation notes and selected flags of an existing .bib file
+
+    Returns the patch stats, or None if the file does not exist. The file
+    and its manifest are only rewritten if a count actually changed.
+    """
+    if not os.path.exists(file_path):
+        print(f"⚠️  {file_path} does not exist; run a full update first")
+        return None
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    patched, stats, entries = patch_citations(text, citations, SELECTED_CITATIONS, timestamp)
+    stats['changed'] = patched != text
+    METRICS.info.setdefault('bibliography', {})[file_path] = dict(stats)
+
+    if not stats['changed']:
+        print(f"✓ {file_path}: citation counts unchanged ({stats['matched']} entries checked)")
+        return stats
+
+    # Only the patched entries need new hashes; the rest carry over from the manifest
+    hashes = previous_entry_hashes(file_path)
+    for key, entry in entries.items():
+        hashes[key] = content_hash(entry)
+
+    backup_path = f"{file_path}.backup" if backup else None
+    atomic_write(file_path, [patched], backup_path=backup_path, keep_backups=BACKUP_KEEP)
+    write_manifest(file_path, hashes)
+    flags = ""
+    if stats['selected_added'] or stats['selected_removed']:
+        flags = f" (selected: +{stats['selected_added']} -{stats['selected_removed']})"
+    print(f"✓ {file_path}: patched {stats['updated']} of {stats['matched']} entries{flags}")
+    return stats
+
+@METRICS.timed('patch_citations')
+def refresh_citations(publications, args):
+    """Patch citation counts into the existing bibliography file(s); returns True if any changed"""
+    backup = not args.no_backup
+    print("🔢 Refreshing citation counts in place")
+    if args.per_member:
+        jobs = [
+            (MEMBER_BIB_PATH.format(scholar_id=scholar_id),
+             citation_counts(pub for pub in publications if scholar_id in pub.get('members', [])))
+            for scholar_id in args.scholar_ids
+        ]
+        expected = sum(len(citations) for _, citations in jobs)
+    else:
+        # Every ID is in at most one shard, so all shards are offered the full map
+        citations = citation_counts(publications)
+        paths = shard_paths(BIBLIOGRAPHY_DIR) if args.shard_by_year else [BIB_FILE_PATH]
+        jobs = [(path, citations) for path in paths]
+        expected = len(citations)
+
+    changed = False
+    matched = 0
+    for path, citations in jobs:
+        stats = patch_bib_citations(citations, path, backup=backup)
+        if stats is not None:
+            changed |= stats['changed']
+            matched += stats['matched']
+
+    if args.shard_by_year and changed:
+        index = load_shard_index(BIBLIOGRAPHY_DIR)
+        years = [shard['year'] for shard in index['shards']]
+        if write_shard_index(BIBLIOGRAPHY_DIR, [shard_summary(BIBLIOGRAPHY_DIR, year) for year in years]):
+            print(f"✓ Shard index updated: {index_path_for(BIBLIOGRAPHY_DIR)}")
+
+    if expected > matched:
+        print(f"⚠️  {expected - matched} profile publications are not in the bibliography; "
+              "run a full update to add them")
+    return changed
+
+def update_citations_data(publications, scholar_ids, file_path=CITATIONS_DATA_PATH):
+    """Write the citation counts used by the site's citation badges; returns True if they changed"""
+    data = build_citations_data(citation_counts(publications), scholar_ids,
+                                previous=load_citations_data(file_path))
+    if not write_citations_data(file_path, data):
+        print(f"✓ {file_path} unchanged ({len(data['articles'])} articles)")
+        return False
+    print(f"✓ Citation counts for the site build written to {file_path} ({len(data['articles'])} articles)")
+    return True
+
+def load_existing_entries(file_path=BIB_FILE_PATH):
+    """Index the entries of an existing BibTeX file by google_scholar_id"""
+    if not os.path.exists(file_path):
+        return {}
+
+    index = BibIndex.from_file(file_path)
+    return {scholar_id: entry.fields for scholar_id, entry in index.by_scholar_id.items()}
+
+def venue_matches(venue, existing):
+    """Check whether a profile venue still matches the journal/booktitle of an entry"""
+    if not venue:
+        return True
+    known = existing.get('journal') or existing.get('booktitle') or ''
+    venue = clean_bibtex_string(venue).lower()
+    known = known.lower()
+    # Detail enrichment replaces "Journal 12 (3), 45-67" with just "Journal"
+    return bool(known) and (venue == known or venue.startswith(known))
+
+def entry_is_current(pub, entry):
+    """Check whether an existing entry still describes a profile publication (same title, year and venue)
+
+    An entry without any citation-page details (written before they were
+    fetched, or when fetching them failed or ran out of time) is never current.
+    """
+    # A profile row without a year has no year to compare: its entry got the
+    # year it was written in
+    return (
+        clean_bibtex_string(pub.get('title', '')) == entry.get('title', '')
+        and (not pub.get('year') or str(pub['year']) == entry.get('year', ''))
+        and venue_matches(pub.get('venue'), entry)
+        and any(entry.get(field) for field in DETAIL_ONLY_FIELDS)
+    )
+
+def reuse_enriched_fields(pub, entry):
+    """Copy the enriched fields of an existing entry onto a publication"""
+    for field in ENRICHED_FIELDS:
+        if entry.get(field):
+            pub[field] = entry[field]
+    # Conference entries keep their venue in booktitle
+    if entry.get('booktitle') and not entry.get('journal'):
+        pub['journal'] = entry['booktitle']
+
+def count_to_fetch(publications, existing):
+    """Number of publications that are new or whose title, venue or year changed since their entry
+
+    Publications that already got their details this run (from the snapshot) are not counted.
+    """
+    count = 0
+    for pub in publications:
+        if pub.get('details_fetched_at'):
+            continue
+        entry = existing.get(get_scholar_article_id(pub))
+        if entry is None or not entry_is_current(pub, entry):
+            count += 1
+    return count
+
+def enrichment_priority(pub, known=None):
+    """Sort key of detail fetches under --budget: new papers, then recent ones, then highly cited ones, then the rest
+
+    A paper is new if neither it, its stored details nor its entry in known
+    (see load_existing_entries) have citation-page details. Within each
+    group the details fetched longest ago come first, then the newest and
+    most cited papers.
+    """
+    year = pub.get('year') or 0
+    citations = pub.get('citations') or 0
+    fetched_at = pub.get('details_stored_at') or 0
+    entry = (known or {}).get(get_scholar_article_id(pub)) or {}
+    if not (fetched_at or any(pub.get(field) or entry.get(field) for field in DETAIL_ONLY_FIELDS)):
+        group = 0
+    elif year > datetime.now().year - RECENT_YEARS:
+        group = 1
+    elif citations > SELECTED_CITATIONS:
+        group = 2
+    else:
+        group = 3
+    return group, fetched_at, -year, -citations
+
+def incremental_bib_paths(args):
+    """The bibliography files an incremental run diffs against"""
+    if args.per_member:
+        return [MEMBER_BIB_PATH.format(scholar_id=scholar_id) for scholar_id in args.scholar_ids]
+    if args.shard_by_year:
+        return shard_paths(BIBLIOGRAPHY_DIR)
+    return [BIB_FILE_PATH]
+
+def enrich_publications(publications, session, args, store=None):
+    """Fetch citation details: for every publication, or with --incremental only new or changed ones
+
+    The details are streamed back into the store (whose view is returned)
+    or into a fresh external sort. With a store, an incremental run skips
+    publications whose stored details are current without reading any
+    BibTeX; the rest are diffed against the existing entries, so a new
+    store starts from what papers.bib already has.
+
+    With --budget, details are fetched in enrichment_priority() order until
+    the deadline; the publications left over keep the details they had
+    (from the store or, without one, from their current entry).
+    """
+    targets = publications
+    existing = {}
+    to_fetch = None
+    if args.incremental:
+        if store is not None:
+            targets = store.publications(args.scholar_ids, needs_details=True)
+            pending = len(targets)
+            print(f"🔁 Incremental update: {len(publications) - pending} publications have current "
+                  "details in the store")
+        else:
+            pending = len(publications)
+        if pending:
+            for file_path in incremental_bib_paths(args):
+                existing.update(load_existing_entries(file_path))
+        to_fetch = count_to_fetch(targets, existing) if pending else 0
+
+        if store is None:
+            print(f"🔁 Incremental update: {len(existing)} existing entries indexed")
+        elif pending:
+            print(f"  ✓ {len(existing)} existing entries indexed for the other {pending}")
+        print(f"  ✓ Reusing enriched metadata for {len(publications) - to_fetch} unchanged publications")
+        print(f"  📥 Fetching details for {to_fetch} new or changed publications")
+        if not pending:
+            return publications
+
+    # Without a store, papers left over when the budget runs out keep the
+    # details of their entry in the current bibliography
+    fallback = None
+    if args.budget is not None and store is None:
+        fallback = existing if args.incremental else {}
+        if not args.incremental:
+            for file_path in incremental_bib_paths(args):
+                fallback.update(load_existing_entries(file_path))
+
+    positions = None
+    if args.budget is not None:
+        to_fetch = len(targets) if to_fetch is None else to_fetch
+        known = fallback or existing
+        order = external_sort(enumerate(targets), key=lambda item: enrichment_priority(item[1], known))
+        targets = (pub for _, pub in order)
+        positions = (position for position, _ in order)
+        print(f"⏱️  Time budget {args.budget:g}s: details of new, then recent, then highly cited "
+              "publications first")
+
+    enriched = iter_enriched(targets, session, existing, to_fetch, skip_detailed=args.incremental,
+                             fallback=fallback)
+    with METRICS.stage('enrich_publications'):
+        if store is not None:
+            record_details(store, enriched)
+            return publications
+        if positions is not None:
+            # Back to the output order, which the priority order replaced
+            return external_sort(zip(enriched, positions), key=itemgetter(1), value=itemgetter(0))
+        return external_sort(enriched, key=publication_sort_key)
+
+def apply_snapshot_record(pub, record):
+    """Copy a snapshot record's journal, volume, number, pages, publisher and DOI onto a publication
+
+    The abstract is only filled in if the publication has none.
+    """
+    if record.get('journal'):
+        pub['journal'] = clean_bibtex_string(record['journal'])
+        pub['abbr'] = get_journal_abbreviation(record['journal'])
+    for field in ('volume', 'number', 'publisher', 'doi'):
+        if record.get(field):
+            pub[field] = clean_bibtex_string(record[field])
+    if record.get('pages'):
+        pub['pages'] = record['pages'].replace('--', '-').replace('-', '--')  # BibTeX style
+    if record.get('abstract') and not pub.get('abstract'):
+        pub['abstract'] = clean_bibtex_string(record['abstract'])
+    pub['details_fetched_at'] = time.time()
+
+def iter_snapshot_enriched(publications, index):
+    """Yield publications in order, with the details of their snapshot record (if any) filled in"""
+    for pub, record, _ in index.match(publications):
+        if record is not None:
+            apply_snapshot_record(pub, record)
+        yield pub
+
+@METRICS.timed('snapshot_details')
+def enrich_from_snapshot(publications, args, store=None):
+    """Fill citation details from the local snapshot in one batched lookup pass (no requests)
+
+    With a store, only publications whose stored details are missing or
+    stale are looked up, and the matches are stored as current details
+    (whose view is returned); otherwise the stream goes into a fresh
+    external sort.
+    """
+    from snapshot_index import open_snapshot_index
 
-    print(f"✓ Updated {BIB_FILE_PATH} with {len(bibtex_entries)} publications")
+    try:
+        index, built = open_snapshot_index(args.snapshot, SNAPSHOT_INDEX_DIR)
+    except (OSError, ValueError, EOFError) as e:
+        print(f"⚠️  Could not read snapshot {args.snapshot}: {e}")
+        return publications
+    if built is not None:
+        print(f"🗂️  Indexed snapshot {args.snapshot}: {built['records']} works "
+              f"({built['skipped']} skipped) -> {index.path}")
+    else:
+        print(f"🗂️  Using snapshot index {index.path} ({len(index)} works)")
 
-def main():
+    with index:
+        if store is not None:
+            targets = store.publications(args.scholar_ids, needs_details=True)
+            record_details(store, iter_snapshot_enriched(targets, index))
+        else:
+            publications = external_sort(iter_snapshot_enriched(publications, index),
+                                         key=publication_sort_key)
+    stats = index.stats
+    print(f"  ✓ Snapshot matched {stats['doi'] + stats['title']} of {sum(stats.values())} publications "
+          f"({stats['doi']} by DOI, {stats['title']} by title and year)")
+    METRICS.info['snapshot'] = dict(stats, path=args.snapshot)
+    return publications
+
+def parse_duration(text):
+    """Seconds in a duration such as 90, 90s, 10m or 1h30m (the argparse type of --budget)"""
+    text = text.strip().lower()
+    parts = DURATION_RE.findall(text)
+    if (not parts or ''.join(number + unit for number, unit in parts) != text
+            or (len(parts) > 1 and not all(unit for _, unit in parts))):
+        raise argparse.ArgumentTypeError(f"invalid duration {text!r} (e.g. 90s, 10m, 1h30m)")
+    seconds = sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"duration {text!r} must be positive")
+    return seconds
+
+def parse_args(argv=None, prog=None):
+    """Parse command line options"""
+    from run_profiler import add_profile_arguments
+    from scholar_parsers import PARSERS, available_parsers
+
+    parser = argparse.ArgumentParser(prog=prog, description="Update papers.bib from Google Scholar")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="diff against the existing papers.bib by google_scholar_id and fetch "
+             "details only for new or changed publications",
+    )
+    parser.add_argument(
+        '--details', action='store_true',
+        help="fetch citation details (journal, volume, pages, DOI, abstract) for every publication",
+    )
+    parser.add_argument(
+        '--citations-only', action='store_true',
+        help="only refresh citation counts: patch the note and selected fields of the existing "
+             "bibliography in place instead of regenerating it",
+    )
+    parser.add_argument(
+        '--snapshot', metavar='PATH', default=SNAPSHOT_PATH,
+        help="fill citation details from a local Crossref/OpenAlex JSON-lines snapshot "
+             "(.jsonl or .jsonl.gz) without per-paper requests; with --incremental, Scholar "
+             "pages are only fetched for publications it does not match",
+    )
+    parser.add_argument(
+        '--budget', metavar='DURATION', type=parse_duration, default=RUN_BUDGET,
+        help="wall-clock budget of the run (e.g. 10m, 1h30m): details are fetched new papers first, "
+             "then recent, then highly cited ones, and the bibliography is written with what was "
+             "fetched when the budget runs out",
+    )
+    parser.add_argument(
+        '--restart', action='store_true',
+        help=f"discard the checkpoint journal of an interrupted run ({JOURNAL_PATH}) instead of "
+             "resuming from it",
+    )
+    parser.add_argument(
+        '--rate', type=float, default=DETAIL_RATE,
+        help=f"detail requests per second (default: {DETAIL_RATE})",
+    )
+    parser.add_argument(
+        '--workers', type=int, default=DETAIL_WORKERS,
+        help=f"concurrent detail fetch workers (default: {DETAIL_WORKERS})",
+    )
+    parser.add_argument(
+        '--scholar-id', action='append', dest='scholar_ids', metavar='ID',
+        help="Google Scholar ID to fetch; repeat for several group members "
+             f"(default: $SCHOLAR_IDS or {SCHOLAR_ID})",
+    )
+    parser.add_argument(
+        '--per-member', action='store_true',
+        help=f"write one bibliography per member ({MEMBER_BIB_PATH}) instead of a merged papers.bib",
+    )
+    parser.add_argument(
+        '--shard-by-year', action='store_true',
+        help=f"write {BIBLIOGRAPHY_DIR}/papers-YYYY.bib shards and papers.shards.json instead of papers.bib",
+    )
+    parser.add_argument(
+        '--profile-workers', type=int, default=PROFILE_WORKERS,
+        help=f"profiles fetched concurrently (default: {PROFILE_WORKERS})",
+    )
+    parser.add_argument(
+        '--no-backup', action='store_true',
+        help=f"do not keep the previous papers.bib as {BACKUP_FILE_PATH}",
+    )
+    parser.add_argument(
+        '--parser', choices=['auto', *PARSERS], default=PARSER_BACKEND,
+        help=f"HTML parser backend (default: {PARSER_BACKEND})",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        '--record', metavar='DIR',
+        help="save every HTTP response to a cassette directory",
+    )
+    cassette.add_argument(
+        '--replay', metavar='DIR',
+        help="answer every request from a recorded cassette (offline, no sleeps)",
+    )
+    parser.add_argument(
+        '--metrics-json', metavar='PATH', default=METRICS_JSON_PATH,
+        help="write a JSON report of requests, retries, sleeps and stage timings to PATH",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.per_member and args.shard_by_year:
+        parser.error("--per-member and --shard-by-year cannot be combined")
+    if args.citations_only and (args.details or args.incremental):
+        parser.error("--citations-only cannot be combined with --details or --incremental")
+    # choices does not cover SCHOLAR_PARSER, nor backends whose package is missing
+    if args.parser != 'auto' and args.parser not in available_parsers():
+        installed = ", ".join(['auto', *available_parsers()])
+        reason = "is not installed" if args.parser in PARSERS else "is unknown"
+        parser.error(f"parser backend '{args.parser}' {reason} (available: {installed})")
+    args.scholar_ids = args.scholar_ids or SCHOLAR_IDS
+    return args
+
+def check_requirements():
+    """Exit with install instructions if the packages needed for fetching are missing"""
+    try:
+        import requests  # noqa: F401
+        import bs4  # noqa: F401
+    except ImportError:
+        print("Required packages not installed. Please run:")
+        print("pip install requests beautifulsoup4")
+        sys.exit(1)
+
+def main(argv=None, prog=None):
     """Main function"""
+    check_requirements()
+    args = parse_args(argv, prog=prog)
+    from run_profiler import report_profile, start_profiler
+
+    # Profiles every METRICS stage
+    METRICS.profiler = start_profiler(args)
+    try:
+        return run_update(args)
+    finally:
+        if METRICS.profiler is not None:
+            report_profile(METRICS.profiler)
+        if args.metrics_json:
+            write_metrics_report(args.metrics_json)
+
+def write_bibliography(publications, args):
+    """Write the BibTeX file(s) and the citation counts; returns True if anything changed"""
+    # The previous version of every file is kept as a backup
+    if args.per_member:
+        changed = update_member_bibs(publications, args.scholar_ids, backup=not args.no_backup)
+    elif args.shard_by_year:
+        changed = update_sharded_bibs(publications, backup=not args.no_backup, scholar_ids=args.scholar_ids)
+    else:
+        changed = update_papers_bib(publications, backup=not args.no_backup, scholar_ids=args.scholar_ids)
+    changed |= update_citations_data(publications, args.scholar_ids)
+    return changed
+
+def render_from_store(args):
+    """Write the bibliography from the publication store alone, without any requests
+
+    args: scholar_ids, per_member, shard_by_year and no_backup, as for a
+    fetch. Returns the exit status (EXIT_UNCHANGED if nothing changed).
+    """
+    if not STORE_ENABLED or not os.path.exists(STORE_PATH):
+        print(f"❌ No publication store at {STORE_PATH}; run a fetch first")
+        return 1
+    store = open_store()
+    if store is None:
+        return 1
+    publications = store.publications(args.scholar_ids)
+    if not len(publications):
+        print(f"❌ No stored publications for {', '.join(args.scholar_ids)}")
+        return 1
+    print(f"🗄️  Rendering {len(publications)} stored publications from {STORE_PATH}")
+    publications = merge_publication_versions(publications)
+    if not write_bibliography(publications, args):
+        print("✅ Publications are up to date; nothing to commit.")
+        return EXIT_UNCHANGED
+    print("✅ Bibliography rendered from the publication store.")
+    return 0
+
+def write_metrics_report(path):
+    """Write the run metrics JSON report"""
+    try:
+        METRICS.write_json(path)
+        print(f"📊 Metrics written to {path}")
+    except OSError as e:
+        print(f"⚠️  Could not write metrics to {path}: {e}")
+
+def run_update(args):
+    """Fetch, enrich and write publications"""
     print("🚀 Starting automated publications update...")
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
@@ -664,20 +1707,62 @@ def main():
         print("   3. Updates are always enabled in GitHub Actions workflow")
         return
 
-    # Create backup
-    backup_existing_bib()
+    # The budget covers the whole run; only detail fetching is cut short by it
+    deadline = time.monotonic() + args.budget if args.budget is not None else None
 
     # Fetch publications
-    publications = get_scholar_publications()
+    session = make_session(parser=args.parser, record=args.record, replay=args.replay)
+    session.journal = open_journal(args)
+    scholar_ids = args.scholar_ids
+    METRICS.info.update({'scholar_ids': scholar_ids, 'parser': get_html_parser(session).name})
+    load_abbreviations()
+    store = open_store()
+    publications = collect_publications(session, scholar_ids, store, workers=args.profile_workers)
+    METRICS.info['publications'] = len(publications or [])
 
     if not publications:
         print("❌ No publications found. Keeping existing file.")
         return
+    publications = merge_publication_versions(publications)
+
+    if args.citations_only:
+        changed = refresh_citations(publications, args)
+        changed |= update_citations_data(publications, scholar_ids)
+        report_cassette_stats(session)
+        finish_journal(session)
+        print()
+        if not changed:
+            print("✅ Citation counts are up to date; nothing to commit.")
+            return EXIT_UNCHANGED
+        print("✅ Citation counts refreshed.")
+        return
+
+    if args.snapshot:
+        publications = enrich_from_snapshot(publications, args, store=store)
+
+    make_fetch_engine(session, rate=args.rate, workers=args.workers, deadline=deadline)
+    if args.incremental or args.details:
+        publications = enrich_publications(publications, session, args, store=store)
+        report_cache_stats(session)
 
-    # Update BibTeX file
-    update_papers_bib(publications)
+    if store is not None:
+        # publications is the store's view: details fetched by earlier runs are kept
+        METRICS.info['store'] = dict(store.stats, **store.summary())
+
+    changed = write_bibliography(publications, args)
+    cache = getattr(session, 'response_cache', None)
+    if cache is not None:
+        METRICS.info['cache'] = dict(cache.stats)
+    report_cassette_stats(session)
+    save_abbreviations()
+    finish_journal(session)
 
     print()
+    if not changed:
+        print("✅ Publications are up to date; nothing to commit.")
+        print(f"📊 Total publications processed: {len(publications)}")
+        return EXIT_UNCHANGED
+
     print("✅ Publications update completed successfully!")
     print(f"📊 Total publications processed: {len(publications)}")
     print()
@@ -687,4 +1772,4 @@ def main():
     print("3. The website will automatically rebuild with new publications")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -39,12 +39,23 @@ pip3 install requests beautifulsoup4 --quiet
 echo ""
 echo "🔄 Updating publications from Google Scholar..."
 python3 _scripts/update_publications.py
+status=$?
+
+# Exit status 3 means papers.bib and _data/citations.json were already up to date
+if [ $status -eq 3 ]; then
+    echo ""
+    echo "✅ No publication changes; nothing to commit."
+    exit 0
+elif [ $status -ne 0 ]; then
+    echo "❌ Publications update failed (exit status $status)"
+    exit $status
+fi
 
 echo ""
 echo "✅ Publications update completed!"
 echo ""
 echo "Next steps:"
-echo "1. Review the updated _bibliography/papers.bib file"
+echo "1. Review the updated _bibliography/papers.bib and _data/citations.json files"
 echo "2. Test the website locally: bundle exec jekyll serve"
 echo "3. Commit and push changes to deploy"
 echo ""